@@ -3,11 +3,20 @@ JYE Barcode System - Sistema de Generación e Impresión de Códigos de Barras
 Didácticos Jugando y Educando
 """
 
+import os
+import time
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timedelta
 import database as db
 import barcode_generator as bg
 import epl_generator as epl
+import printer_transport as pt
+import exporter
+import session_store as ss
+import search_index as si
+import lot_jobs as lj
+import lot_archive as la
+import quantity_policy as qp
 
 # Configuración de página
 st.set_page_config(
@@ -30,26 +39,278 @@ with st.sidebar:
     st.markdown("---")
     st.info("💡 Los archivos .epl se envían a la impresora usando Zebra Setup Utilities")
 
+
+def mostrar_error_bd(error: db.ErrorBaseDatos) -> None:
+    """
+    Muestra un error de la capa de datos según su tipo
+
+    Args:
+        error: Error tipado lanzado por database
+    """
+    if isinstance(error, db.CircuitoAbierto):
+        st.error(f"🔌 {str(error)}")
+        st.info("💡 Se detectaron varias fallas seguidas de conexión con Supabase. Espera unos segundos y vuelve a intentar")
+    elif isinstance(error, db.ErrorTransitorio):
+        st.error(f"📡 {str(error)}")
+        st.info("💡 Parece un problema temporal de conexión. Verifica tu acceso a internet y vuelve a intentar")
+    else:
+        st.error(f"❌ {str(error)}")
+
+
+# Intervalo de refresco de las estadísticas (segundos)
+INTERVALO_ESTADISTICAS = 300
+
+# Trabajos de lote mostrados en TAB 2
+LIMITE_TRABAJOS = 10
+
+# Lotes archivados listados en TAB 3
+LIMITE_HISTORIAL = 50
+
+# Reimpresiones de lotes archivados ya descomprimidas que se conservan en memoria
+MAX_REIMPRESIONES_CACHE = 8
+
+# Etiquetas de los tipos de evento de impresión
+TIPOS_EVENTO = {
+    db.LOTE: "📦 Lote",
+    db.REIMPRESION: "🔁 Reimpresión",
+    db.INDIVIDUAL: "🔢 Generación individual",
+}
+
+# Etiquetas de estado de los trabajos de lote
+ESTADOS_TRABAJO = {
+    lj.EN_COLA: "⏳ En cola",
+    lj.EN_PROCESO: "⚙️ En proceso",
+    lj.COMPLETADO: "✅ Completado",
+    lj.CANCELADO: "⏹️ Cancelado",
+    lj.ERROR: "❌ Error",
+    lj.INTERRUMPIDO: "⚠️ Interrumpido",
+}
+
+
+@st.cache_data(ttl=INTERVALO_ESTADISTICAS, show_spinner=False)
+def obtener_estadisticas_cache(dias: int) -> dict:
+    """
+    Estadísticas agregadas compartidas por todas las sesiones durante el intervalo de refresco
+
+    Args:
+        dias: Días hacia atrás para las creaciones por día
+
+    Returns:
+        dict: Resultado de db.obtener_estadisticas
+    """
+    return db.obtener_estadisticas(dias)
+
+
+@st.cache_resource
+def obtener_almacen_compartido() -> ss.AlmacenCompartido:
+    """Almacén de resultados filtrados compartido por todas las sesiones"""
+    return ss.AlmacenCompartido()
+
+
+@st.cache_resource
+def obtener_archivo_lotes() -> la.ArchivoLotes:
+    """Archivo de lotes generados compartido por todas las sesiones"""
+    return la.ArchivoLotes(st.secrets.get("archivo", {}).get("directorio", la.DIRECTORIO_DEFAULT))
+
+
+@st.cache_data(max_entries=MAX_REIMPRESIONES_CACHE, show_spinner=False)
+def preparar_reimpresion(lote_id: str, codigo_barras: str) -> tuple:
+    """
+    Descomprime un lote archivado y extrae la parte de un código
+
+    Los lotes archivados no cambian, así que el resultado se comparte entre
+    sesiones y reruns por (lote_id, codigo_barras).
+
+    Args:
+        lote_id: Id del lote archivado
+        codigo_barras: Código a extraer ("" para solo el lote completo)
+
+    Returns:
+        tuple: (EPL del lote o None, EPL de la parte del código o None)
+
+    Raises:
+        ValueError: Si el registro del lote está dañado
+    """
+    archivo = obtener_archivo_lotes()
+    contenido = archivo.leer_lote(lote_id)
+    parte = archivo.leer_parte_codigo(lote_id, codigo_barras, contenido) if codigo_barras and contenido else None
+    return contenido, parte
+
+
+@st.cache_resource
+def obtener_gestor_trabajos() -> lj.GestorTrabajos:
+    """Cola de trabajos de lote compartida por todas las sesiones (sobrevive a la sesión)"""
+    archivo = obtener_archivo_lotes()
+
+    def archivar(trabajo: lj.TrabajoLote, contenido: str) -> None:
+        archivo.archivar(contenido, trabajo.nombre, trabajo.etiquetas, trabajo.columnas, trabajo.id)
+
+    def registrar(bloque, trabajo_id: str) -> None:
+        db.registrar_impresion(bloque, db.LOTE, trabajo_id)
+
+    return lj.GestorTrabajos(
+        db.actualizar_estado_impreso,
+        archivar=archivar,
+        registrar_impresion=registrar,
+        politica=qp.PoliticaCantidades.desde_config(st.secrets.get("limites", {}))
+    )
+
+
+def nombre_lote(momento: datetime, numero: int = 1, total: int = 1) -> str:
+    """
+    Nombre del archivo de un lote
+
+    Args:
+        momento: Fecha de generación
+        numero: Parte del lote (si la selección se dividió)
+        total: Partes en que se dividió la selección
+
+    Returns:
+        str: lote_YYYYMMDD_HHMMSS.epl o lote_YYYYMMDD_HHMMSS_parteNdeM.epl
+    """
+    sufijo = f"_parte{numero}de{total}" if total > 1 else ""
+    return f"lote_{momento.strftime('%Y%m%d_%H%M%S')}{sufijo}.epl"
+
+
+@st.cache_resource
+def indice_busqueda_compartido() -> si.IndicePrefijos:
+    """Índice de prefijos compartido por todas las sesiones (vacío hasta la primera búsqueda)"""
+    return si.IndicePrefijos()
+
+
+def indice_busqueda_existente():
+    """
+    Devuelve el índice de búsqueda solo si ya fue construido (sin consultar la base)
+
+    Returns:
+        IndicePrefijos: Índice construido
+        None: Si ninguna búsqueda lo ha construido todavía
+    """
+    indice = indice_busqueda_compartido()
+    return indice if indice.construido else None
+
+
+def obtener_indice_busqueda():
+    """
+    Devuelve el índice de búsqueda sincronizado con los códigos nuevos
+
+    La primera llamada del proceso recorre la tabla completa para construirlo.
+
+    Returns:
+        IndicePrefijos: Índice listo para consultar
+        None: Si no se pudo construir (la búsqueda exacta sigue disponible)
+    """
+    try:
+        indice = indice_busqueda_compartido()
+        if not indice.construido:
+            with st.spinner("Construyendo índice de búsqueda..."):
+                indice.construir(exporter.iterar_codigos(columnas=si.COLUMNAS_INDICE))
+
+        indice.sincronizar(
+            lambda marca: db.obtener_codigos_creados_desde(marca, ",".join(si.COLUMNAS_INDICE))
+        )
+        return indice
+    except db.ErrorBaseDatos:
+        return None
+
+
 # Título principal
 st.title("Sistema de Códigos de Barras JYE")
 st.markdown("Genera e imprime códigos de barras para inventario y facturación")
 st.markdown("---")
 
-# Inicializar cliente Supabase (verificar conexión)
+# Inicializar backend de datos (verificar conexión)
 try:
-    supabase_client = db.get_supabase_client()
+    backend = db.obtener_backend()
     # st.success("✅ Conectado a base de datos")
 except Exception as e:
     st.error(f"❌ Error al conectar con la base de datos")
     st.error(f"**Detalles:** {str(e)}")
     st.info("💡 Verifica que las credenciales en `.streamlit/secrets.toml` sean correctas y que tengas acceso a internet")
     st.stop()
+def leer_archivo_diferido(ruta: str):
+    """
+    Crea la función que st.download_button ejecuta solo al hacer clic
+
+    Args:
+        ruta: Archivo a descargar
+
+    Returns:
+        callable: Función sin argumentos que devuelve el contenido del archivo
+    """
+    def leer() -> bytes:
+        with open(ruta, "rb") as archivo:
+            return archivo.read()
+
+    return leer
+
+
+# Exportación de la tabla completa (streaming a archivo temporal)
+with st.sidebar:
+    st.markdown("---")
+    st.markdown("### 📤 Exportar códigos")
+    formato_exportacion = st.selectbox(
+        "Formato de exportación",
+        options=list(exporter.FORMATOS),
+        format_func=str.upper,
+        help="Exporta toda la tabla de códigos. Parquet requiere pyarrow"
+    )
+
+    if st.button("📤 Generar exportación", use_container_width=True):
+        with st.spinner("Exportando códigos..."):
+            try:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                nombre_exportacion = f"codigos_{timestamp}.{formato_exportacion}"
+                os.makedirs(exporter.DIRECTORIO_EXPORTACIONES, exist_ok=True)
+                ruta_exportacion = os.path.join(exporter.DIRECTORIO_EXPORTACIONES, f"{time.time_ns()}_{nombre_exportacion}")
+
+                total_exportados = exporter.exportar(ruta_exportacion, formato_exportacion)
+
+                # La exportación anterior de esta sesión ya no se puede descargar
+                anterior = st.session_state.get("exportacion")
+                if anterior and os.path.exists(anterior["ruta"]):
+                    os.remove(anterior["ruta"])
+                exporter.limpiar_exportaciones()
+
+                st.session_state.exportacion = {
+                    "ruta": ruta_exportacion,
+                    "nombre": nombre_exportacion,
+                    "total": total_exportados
+                }
+            except db.ErrorBaseDatos as e:
+                mostrar_error_bd(e)
+            except ImportError as e:
+                st.error(f"❌ {str(e)}")
+
+    exportacion = st.session_state.get("exportacion")
+    if exportacion and os.path.exists(exportacion["ruta"]):
+        # Descarga diferida: el archivo solo se lee al hacer clic, no en cada rerun
+        st.download_button(
+            label=f"📥 {exportacion['nombre']} ({exportacion['total']} códigos)",
+            data=leer_archivo_diferido(exportacion["ruta"]),
+            file_name=exportacion["nombre"],
+            mime="application/octet-stream",
+            use_container_width=True
+        )
+
+# Métricas del caché compartido
+with st.sidebar:
+    estadisticas_cache = db.cache.estadisticas()
+    st.caption(
+        f"🗄️ Caché compartido: {estadisticas_cache['tasa_aciertos']:.0%} de aciertos "
+        f"({estadisticas_cache['aciertos']}/{estadisticas_cache['aciertos'] + estadisticas_cache['fallos']} lecturas, "
+        f"{estadisticas_cache['entradas']} entradas)"
+    )
+
+# Límites de copias configurados en [limites] (por código, comodín, lote y rollo)
+politica = qp.PoliticaCantidades.desde_config(st.secrets.get("limites", {}))
 
 # Crear tabs principales
-tab1, tab2, tab3 = st.tabs([
+tab1, tab2, tab3, tab4 = st.tabs([
     "🔢 Generación Individual",
     "📦 Impresión Masiva",
-    "🔍 Búsqueda y Consulta"
+    "🔍 Búsqueda y Consulta",
+    "📊 Estadísticas"
 ])
 
 # ============================================================================
@@ -101,10 +362,10 @@ with tab1:
             cantidad_input = st.number_input(
                 "Cantidad de copias *",
                 min_value=1,
-                max_value=100,
+                max_value=politica.max_por_impresion,
                 value=1,
                 step=1,
-                help="Número de etiquetas a imprimir (1-100)"
+                help=f"Número de etiquetas a imprimir (1-{politica.max_por_impresion})"
             )
             if cantidad_input > 50:
                 st.caption("⚠️ Cantidad grande, verifica material de impresora")
@@ -121,7 +382,7 @@ with tab1:
             st.error(f"❌ Error de validación: {mensaje_error}")
         else:
             # Validar cantidad
-            es_valido_cant, mensaje_error_cant = epl.validar_cantidad(cantidad_input)
+            es_valido_cant, mensaje_error_cant = politica.validar_cantidad(cantidad_input)
 
             if not es_valido_cant:
                 st.error(f"❌ Error en cantidad: {mensaje_error_cant}")
@@ -140,8 +401,15 @@ with tab1:
                             registro = db.crear_codigo_barras(comodin_input, sku_input)
 
                             if registro:
+                                # Incorporar al índice de TAB 3 si ya existe (construirlo
+                                # aquí recorrería toda la tabla dentro de la creación)
+                                indice = indice_busqueda_existente()
+                                if indice is not None:
+                                    indice.agregar(registro)
+
                                 # Generar archivo EPL
                                 contenido_epl = epl.generar_epl_individual(codigo_barras, cantidad_input)
+                                db.registrar_impresion([(registro.id, codigo_barras, cantidad_input)], db.INDIVIDUAL)
 
                                 # Mostrar éxito
                                 st.success(f"✅ ¡Código de barras generado exitosamente!")
@@ -175,6 +443,8 @@ with tab1:
 
                     except ValueError as ve:
                         st.error(f"❌ Error de validación: {str(ve)}")
+                    except db.ErrorBaseDatos as e:
+                        mostrar_error_bd(e)
                     except Exception as e:
                         st.error(f"❌ Error inesperado: {str(e)}")
 
@@ -186,9 +456,13 @@ with tab2:
     st.markdown("Filtra y selecciona múltiples códigos para imprimir en lote.")
     st.markdown("---")
 
-    # Inicializar session_state para resultados filtrados
+    # Inicializar session_state para resultados filtrados (almacenamiento columnar)
     if "codigos_filtrados" not in st.session_state:
-        st.session_state.codigos_filtrados = []
+        st.session_state.codigos_filtrados = ss.ResultadoColumnar([])
+
+    if "resultados_sesion" not in st.session_state:
+        limite_mb = st.secrets.get("limites", {}).get("memoria_sesion_mb", ss.MAX_MEMORIA_SESION_MB)
+        st.session_state.resultados_sesion = ss.ResultadosSesion(int(limite_mb * 1024 * 1024))
 
     # Sección de filtros
     st.subheader("🔍 Filtros")
@@ -197,7 +471,13 @@ with tab2:
 
     with col_filtro1:
         # Obtener comodines únicos de la base de datos
-        comodines_disponibles = db.obtener_comodines_unicos()
+        error_comodines = False
+        try:
+            comodines_disponibles = db.obtener_comodines_unicos()
+        except db.ErrorBaseDatos as e:
+            mostrar_error_bd(e)
+            comodines_disponibles = []
+            error_comodines = True
 
         if comodines_disponibles:
             opciones_comodin = ["Todos"] + comodines_disponibles
@@ -210,7 +490,7 @@ with tab2:
             help="Filtra códigos por comodín específico"
         )
 
-        if not comodines_disponibles:
+        if not comodines_disponibles and not error_comodines:
             st.caption("⚠️ No hay códigos en la base de datos")
 
     with col_filtro2:
@@ -271,8 +551,20 @@ with tab2:
                     if fecha_hasta:
                         filtros["fecha_hasta"] = datetime.combine(fecha_hasta, datetime.max.time())
 
-                # Obtener códigos filtrados
-                st.session_state.codigos_filtrados = db.obtener_codigos(filtros)
+                # Obtener códigos filtrados (si falla se conservan los resultados anteriores)
+                # Solo se piden las columnas de la grilla y el resultado se comparte
+                # con otras sesiones que apliquen el mismo filtro
+                try:
+                    clave = ss.clave_filtros(filtros)
+                    resultado = obtener_almacen_compartido().obtener_o_cargar(
+                        clave,
+                        lambda: db.obtener_codigos(filtros, columnas=ss.COLUMNAS_GRID),
+                        version=db.cache.version("codigos")
+                    )
+                    st.session_state.resultados_sesion.agregar(clave, resultado)
+                    st.session_state.codigos_filtrados = resultado
+                except db.ErrorBaseDatos as e:
+                    mostrar_error_bd(e)
 
     st.markdown("---")
 
@@ -314,13 +606,13 @@ with tab2:
         st.markdown("---")
 
         # Iterar sobre códigos filtrados (con límite)
-        codigos_a_mostrar = st.session_state.codigos_filtrados[:LIMITE_VISUALIZACION]
+        codigos_a_mostrar = list(st.session_state.codigos_filtrados.filas(LIMITE_VISUALIZACION))
 
         for idx, codigo in enumerate(codigos_a_mostrar):
-            codigo_id = codigo['id']
-            codigo_barras = codigo['codigo_barras']
-            tbc_sku = codigo['tbc_sku']
-            comodin = codigo['comodin_proveedor']
+            codigo_id = codigo.id
+            codigo_barras = codigo.codigo_barras
+            tbc_sku = codigo.tbc_sku
+            comodin = codigo.comodin_proveedor
 
             # Crear columnas para cada fila
             col1, col2, col3, col4, col5 = st.columns([1, 2, 2, 2, 2])
@@ -348,20 +640,15 @@ with tab2:
                     cantidad = st.number_input(
                         "Cantidad",
                         min_value=1,
-                        max_value=100,
-                        value=st.session_state.seleccion_batch.get(codigo_id, {}).get("cantidad", 1),
+                        max_value=politica.max_por_item,
+                        value=st.session_state.seleccion_batch.get(codigo_id, (codigo_barras, 1))[1],
                         step=1,
                         key=f"cantidad_{codigo_id}",
                         label_visibility="collapsed"
                     )
 
-                    # Guardar selección en session_state
-                    st.session_state.seleccion_batch[codigo_id] = {
-                        "codigo_barras": codigo_barras,
-                        "cantidad": cantidad,
-                        "comodin": comodin,
-                        "tbc_sku": tbc_sku
-                    }
+                    # Guardar selección en session_state: (codigo_barras, cantidad)
+                    st.session_state.seleccion_batch[codigo_id] = (codigo_barras, cantidad)
                 else:
                     # Si el checkbox no está activo, remover de selección
                     if codigo_id in st.session_state.seleccion_batch:
@@ -376,7 +663,7 @@ with tab2:
 
         # Footer con preview del total
         codigos_seleccionados = len(st.session_state.seleccion_batch)
-        etiquetas_totales = sum(item["cantidad"] for item in st.session_state.seleccion_batch.values())
+        etiquetas_totales = sum(cantidad for _, cantidad in st.session_state.seleccion_batch.values())
 
         if codigos_seleccionados > 0:
             col_preview1, col_preview2 = st.columns(2)
@@ -401,9 +688,35 @@ with tab2:
             if etiquetas_totales > 50:
                 st.warning(f"⚠️ Vas a imprimir {etiquetas_totales} etiquetas. Verifica que tengas suficiente material en la impresora.")
 
+            # Layout del rollo: etiquetas por fila (el límite por rollo cuenta filas completas)
+            etiquetas_por_fila = st.selectbox(
+                "Etiquetas por fila del rollo",
+                options=list(epl.COLUMNAS_ADMITIDAS),
+                format_func=lambda n: "1 (rollo sencillo)" if n == 1 else f"{n} etiquetas por fila",
+                help="En rollos multi-columna cada pasada imprime varias etiquetas"
+            )
+
+            # Límites de copias: si el lote los excede se divide en lotes que los cumplen
+            evaluacion, lotes = qp.dividir_seleccion(st.session_state.seleccion_batch, politica, etiquetas_por_fila)
+
+            if not evaluacion.dentro_de_limites:
+                st.warning(
+                    "⚠️ **La selección excede los límites de impresión:**\n"
+                    + "\n".join(f"- {infraccion.descripcion()}" for infraccion in evaluacion.infracciones)
+                )
+                st.info(
+                    f"✂️ **Se generarán {len(lotes)} lotes:** "
+                    + " · ".join(
+                        f"Lote {numero}: {sum(cantidad for _, cantidad in lote.values())} etiquetas"
+                        for numero, lote in enumerate(lotes, start=1)
+                    )
+                )
+
             # Checkbox de confirmación para operación masiva
             confirmar_batch = st.checkbox(
-                f"Confirmo que deseo generar {etiquetas_totales} etiquetas y actualizar el estado de {codigos_seleccionados} código(s) en la base de datos",
+                f"Confirmo que deseo generar {etiquetas_totales} etiquetas"
+                + (f" en {len(lotes)} lotes" if len(lotes) > 1 else "")
+                + f" y actualizar el estado de {codigos_seleccionados} código(s) en la base de datos",
                 value=False,
                 help="Esta acción actualizará el estado de impresión de los códigos seleccionados"
             )
@@ -419,36 +732,69 @@ with tab2:
             ):
                 with st.spinner("Generando lote EPL..."):
                     try:
-                        # Recopilar códigos seleccionados con cantidades
-                        codigos_y_cantidades = [
-                            (item["codigo_barras"], item["cantidad"])
-                            for item in st.session_state.seleccion_batch.values()
+                        # Generar EPL de cada lote (multi-columna si el rollo lo permite)
+                        contenidos = [
+                            epl.generar_epl_multiple(list(lote.values()), columnas=etiquetas_por_fila, politica=politica)
+                            for lote in lotes
                         ]
 
-                        # Generar EPL batch
-                        contenido_epl_batch = epl.generar_epl_batch(codigos_y_cantidades)
-
                         # Actualizar estado impreso en DB
                         codigo_ids = list(st.session_state.seleccion_batch.keys())
-                        actualizacion_exitosa = db.actualizar_estado_impreso(codigo_ids)
+                        try:
+                            actualizacion_exitosa = db.actualizar_estado_impreso(codigo_ids)
+                        except db.ErrorBaseDatos as e:
+                            mostrar_error_bd(e)
+                            actualizacion_exitosa = False
 
                         if actualizacion_exitosa:
-                            # Generar timestamp para nombre de archivo
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            nombre_archivo = f"lote_{timestamp}.epl"
+                            ahora = datetime.now()
+                            generados = []
+
+                            for numero, (lote, contenido_epl_batch) in enumerate(zip(lotes, contenidos), start=1):
+                                nombre_archivo = nombre_lote(ahora, numero, len(lotes))
+                                etiquetas_lote = sum(cantidad for _, cantidad in lote.values())
+
+                                generados.append({
+                                    "nombre": nombre_archivo,
+                                    "contenido": contenido_epl_batch,
+                                    "etiquetas": etiquetas_lote
+                                })
+
+                                # Archivar el lote para reimprimirlo después sin la base de datos
+                                lote_id = None
+                                try:
+                                    lote_id = obtener_archivo_lotes().archivar(
+                                        contenido_epl_batch,
+                                        nombre_archivo,
+                                        etiquetas_lote,
+                                        etiquetas_por_fila
+                                    ).id
+                                except OSError as e:
+                                    st.warning(f"⚠️ El lote no se pudo archivar para reimpresión: {str(e)}")
+
+                                # Historial de impresión (se escribe en segundo plano)
+                                db.registrar_impresion(
+                                    [(codigo_id, codigo_barras, cantidad) for codigo_id, (codigo_barras, cantidad) in lote.items()],
+                                    db.LOTE,
+                                    lote_id
+                                )
+
+                            # Guardar lotes para envío directo a impresora
+                            st.session_state.ultimos_lotes = generados
 
                             # Mostrar éxito
-                            st.success("✅ ¡Lote generado exitosamente!")
-
-                            # Botón de descarga
-                            st.download_button(
-                                label=f"📥 Descargar {nombre_archivo} ({etiquetas_totales} etiquetas)",
-                                data=contenido_epl_batch,
-                                file_name=nombre_archivo,
-                                mime="application/octet-stream",
-                                use_container_width=True,
-                                type="primary"
-                            )
+                            st.success("✅ ¡Lote generado exitosamente!" if len(generados) == 1 else f"✅ ¡{len(generados)} lotes generados exitosamente!")
+
+                            # Botones de descarga
+                            for generado in generados:
+                                st.download_button(
+                                    label=f"📥 Descargar {generado['nombre']} ({generado['etiquetas']} etiquetas)",
+                                    data=generado["contenido"],
+                                    file_name=generado["nombre"],
+                                    mime="application/octet-stream",
+                                    use_container_width=True,
+                                    type="primary"
+                                )
 
                             st.info("💡 El estado de impresión de los códigos seleccionados ha sido actualizado en la base de datos")
 
@@ -464,6 +810,29 @@ with tab2:
                     except Exception as e:
                         st.error(f"❌ Error al generar lote: {str(e)}")
 
+            # Lotes grandes: generar y marcar en segundo plano sin bloquear la sesión
+            if st.button(
+                "⏳ Generar en segundo plano",
+                use_container_width=True,
+                disabled=not confirmar_batch,
+                help="El lote se procesa aunque cierres la pestaña; descárgalo luego desde 'Trabajos de lote'"
+            ):
+                ahora = datetime.now()
+                try:
+                    encolados = [
+                        obtener_gestor_trabajos().encolar(
+                            lote,
+                            columnas=etiquetas_por_fila,
+                            nombre=nombre_lote(ahora, numero, len(lotes))
+                        )
+                        for numero, lote in enumerate(lotes, start=1)
+                    ]
+                except ValueError as e:
+                    st.error(f"❌ No se pudo encolar el lote: {str(e)}")
+                else:
+                    nombres = ", ".join(trabajo.nombre for trabajo in encolados)
+                    st.success(f"✅ {nombres} en cola ({etiquetas_totales} etiquetas). Puedes seguir trabajando mientras se genera")
+
         else:
             st.info("💡 Selecciona al menos un código para generar el lote")
 
@@ -472,6 +841,96 @@ with tab2:
     else:
         st.info("💡 Aplica filtros para ver los códigos disponibles")
 
+    # Trabajos de lote en segundo plano
+    trabajos = obtener_gestor_trabajos().listar()[:LIMITE_TRABAJOS]
+
+    if trabajos:
+        st.markdown("---")
+        col_titulo, col_actualizar = st.columns([4, 1])
+        with col_titulo:
+            st.subheader("📋 Trabajos de lote")
+        with col_actualizar:
+            st.button("🔄 Actualizar progreso", key="actualizar_trabajos", use_container_width=True)
+
+        for trabajo in trabajos:
+            col_info, col_accion = st.columns([4, 1])
+
+            with col_info:
+                st.markdown(f"**{trabajo.nombre}** · {trabajo.etiquetas} etiquetas · {ESTADOS_TRABAJO[trabajo.estado]}")
+                st.progress(
+                    min(trabajo.progreso, 1.0),
+                    text=f"{trabajo.marcados}/{len(trabajo.seleccion)} códigos marcados como impresos"
+                )
+                if trabajo.error:
+                    st.caption(f"❌ {trabajo.error}")
+
+            with col_accion:
+                if trabajo.activo:
+                    if st.button("⏹️ Cancelar", key=f"cancelar_{trabajo.id}", use_container_width=True):
+                        obtener_gestor_trabajos().cancelar(trabajo.id)
+                        st.rerun()
+                elif trabajo.estado in lj.REANUDABLES:
+                    if st.button("▶️ Reanudar", key=f"reanudar_{trabajo.id}", use_container_width=True):
+                        obtener_gestor_trabajos().reanudar(trabajo.id)
+                        st.rerun()
+                elif trabajo.estado == lj.COMPLETADO:
+                    ruta_artefacto = obtener_gestor_trabajos().ruta_artefacto(trabajo.id)
+                    if ruta_artefacto:
+                        # El artefacto se lee solo al hacer clic, no en cada rerun
+                        st.download_button(
+                            label="📥 Descargar",
+                            data=leer_archivo_diferido(ruta_artefacto),
+                            file_name=trabajo.nombre,
+                            mime="application/octet-stream",
+                            key=f"descargar_{trabajo.id}",
+                            use_container_width=True
+                        )
+
+    # Envío directo a impresora de red (opcional, requiere [impresora] en secrets)
+    config_impresora = st.secrets.get("impresora")
+
+    if config_impresora and st.session_state.get("ultimos_lotes"):
+        st.markdown("---")
+        st.subheader("🖨️ Envío Directo a Impresora")
+
+        if len(st.session_state.ultimos_lotes) > 1:
+            lote = st.selectbox(
+                "Lote a enviar",
+                options=st.session_state.ultimos_lotes,
+                format_func=lambda lote: f"{lote['nombre']} ({lote['etiquetas']} etiquetas)",
+                help="La selección se dividió por los límites de impresión; envía las partes de a una (p.ej. cambiando el rollo entre partes)"
+            )
+        else:
+            lote = st.session_state.ultimos_lotes[0]
+            st.markdown(f"Último lote generado: **{lote['nombre']}** ({lote['etiquetas']} etiquetas)")
+
+        if st.button("🖨️ Enviar lote a la impresora", use_container_width=True):
+            estado_placeholder = st.empty()
+            progreso_bar = st.progress(0.0)
+
+            def mostrar_estado(estado: pt.EstadoImpresora):
+                if estado.operativa and not estado.buffer_lleno:
+                    estado_placeholder.info(f"🖨️ {estado.descripcion()}")
+                else:
+                    estado_placeholder.warning(f"⏸️ {estado.descripcion()} - el envío se reanudará automáticamente")
+
+            def mostrar_progreso(enviados: int, total: int):
+                progreso_bar.progress(enviados / total, text=f"{enviados}/{total} formatos enviados")
+
+            try:
+                with pt.TransporteImpresora(
+                    config_impresora["host"],
+                    int(config_impresora.get("puerto", pt.PUERTO_RAW)),
+                    max_formatos_buffer=int(config_impresora.get("formatos_buffer", pt.MAX_FORMATOS_BUFFER)),
+                    on_estado=mostrar_estado
+                ) as impresora:
+                    enviados = impresora.enviar_trabajo(lote["contenido"], on_progreso=mostrar_progreso)
+
+                st.success(f"✅ Se enviaron {enviados} formatos a la impresora")
+
+            except pt.ErrorImpresora as e:
+                st.error(f"❌ Error de impresora: {str(e)}")
+
 # ============================================================================
 # TAB 3: BÚSQUEDA Y CONSULTA
 # ============================================================================
@@ -500,6 +959,35 @@ with tab3:
         st.markdown("")  # Espaciado para alinear el botón
         buscar_clicked = st.button("🔎 Buscar", use_container_width=True, type="primary")
 
+    error_busqueda = False
+
+    # Sugerencias por prefijo servidas desde el índice local (sin ir a la red)
+    prefijo_busqueda = query_busqueda.strip() if query_busqueda else ""
+    if prefijo_busqueda.isdigit() and len(prefijo_busqueda) <= 8:
+        indice = obtener_indice_busqueda()
+
+        if indice is not None:
+            inicio_busqueda = time.perf_counter()
+            sugerencias = indice.buscar(prefijo_busqueda)
+            duracion_ms = (time.perf_counter() - inicio_busqueda) * 1000
+
+            if sugerencias:
+                st.caption(f"⚡ {len(sugerencias)} coincidencia(s) en {duracion_ms:.1f} ms. Selecciona un código:")
+                col_sugerencias = st.columns(5)
+
+                for idx, sugerencia in enumerate(sugerencias):
+                    with col_sugerencias[idx % 5]:
+                        if st.button(
+                            f"{sugerencia.codigo_barras} · SKU {sugerencia.tbc_sku}",
+                            key=f"sugerencia_{sugerencia.codigo_barras}",
+                            use_container_width=True
+                        ):
+                            try:
+                                st.session_state.resultado_busqueda = db.buscar_codigo(sugerencia.codigo_barras)
+                            except db.ErrorBaseDatos as e:
+                                mostrar_error_bd(e)
+                                error_busqueda = True
+
     # Realizar búsqueda
     if buscar_clicked:
         if not query_busqueda or not query_busqueda.strip():
@@ -515,8 +1003,12 @@ with tab3:
                 st.error("❌ El código no puede tener más de 8 dígitos")
             else:
                 with st.spinner("Buscando código..."):
-                    resultado = db.buscar_codigo(query_limpia)
-                    st.session_state.resultado_busqueda = resultado
+                    try:
+                        resultado = db.buscar_codigo(query_limpia)
+                        st.session_state.resultado_busqueda = resultado
+                    except db.ErrorBaseDatos as e:
+                        mostrar_error_bd(e)
+                        error_busqueda = True
 
     st.markdown("---")
 
@@ -537,23 +1029,23 @@ with tab3:
             with col_det1:
                 st.metric(
                     label="Código de Barras",
-                    value=codigo['codigo_barras']
+                    value=codigo.codigo_barras
                 )
 
             with col_det2:
                 st.metric(
                     label="Comodín",
-                    value=codigo['comodin_proveedor']
+                    value=codigo.comodin_proveedor
                 )
 
             with col_det3:
                 st.metric(
                     label="TBC SKU",
-                    value=codigo['tbc_sku']
+                    value=codigo.tbc_sku
                 )
 
             with col_det4:
-                estado_impreso = "✅ Impreso" if codigo['impreso'] else "⚠️ No Impreso"
+                estado_impreso = "✅ Impreso" if codigo.impreso else "⚠️ No Impreso"
                 st.metric(
                     label="Estado",
                     value=estado_impreso
@@ -565,16 +1057,51 @@ with tab3:
             col_info1, col_info2 = st.columns(2)
 
             with col_info1:
-                fecha_creacion = datetime.fromisoformat(codigo['fecha_creacion'].replace('Z', '+00:00'))
-                st.info(f"📅 **Fecha de Creación:** {fecha_creacion.strftime('%d/%m/%Y %H:%M:%S')}")
+                st.info(f"📅 **Fecha de Creación:** {codigo.fecha_creacion.strftime('%d/%m/%Y %H:%M:%S')}")
 
             with col_info2:
-                if codigo['impreso'] and codigo['fecha_impresion']:
-                    fecha_impresion = datetime.fromisoformat(codigo['fecha_impresion'].replace('Z', '+00:00'))
-                    st.info(f"🖨️ **Última Impresión:** {fecha_impresion.strftime('%d/%m/%Y %H:%M:%S')}")
+                if codigo.impreso and codigo.fecha_impresion:
+                    st.info(f"🖨️ **Última Impresión:** {codigo.fecha_impresion.strftime('%d/%m/%Y %H:%M:%S')}")
                 else:
                     st.info("🖨️ **Última Impresión:** Nunca impreso")
 
+        # Historial de impresión del código
+        with st.expander("📜 Historial de impresión"):
+            try:
+                historial = db.obtener_historial_impresion(codigo.id)
+            except db.ErrorBaseDatos as e:
+                mostrar_error_bd(e)
+                historial = []
+
+            if historial:
+                col_hist_met1, col_hist_met2, col_hist_met3 = st.columns(3)
+                with col_hist_met1:
+                    st.metric("Etiquetas consumidas", sum(evento.cantidad for evento in historial))
+                with col_hist_met2:
+                    st.metric("En lotes", sum(evento.cantidad for evento in historial if evento.tipo == db.LOTE))
+                with col_hist_met3:
+                    st.metric("Reimpresiones", sum(evento.cantidad for evento in historial if evento.tipo == db.REIMPRESION))
+
+                st.dataframe(
+                    [
+                        {
+                            "fecha": evento.fecha.astimezone().strftime('%d/%m/%Y %H:%M:%S'),
+                            "tipo": TIPOS_EVENTO.get(evento.tipo, evento.tipo),
+                            "cantidad": evento.cantidad,
+                        }
+                        for evento in historial
+                    ],
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "fecha": "Fecha",
+                        "tipo": "Tipo",
+                        "cantidad": "Etiquetas"
+                    }
+                )
+            else:
+                st.info("💡 Este código no tiene impresiones registradas")
+
         st.markdown("---")
 
         # Sección de reimpresión
@@ -588,7 +1115,7 @@ with tab3:
             cantidad_reimp = st.number_input(
                 "Cantidad de copias",
                 min_value=1,
-                max_value=100,
+                max_value=politica.max_por_impresion,
                 value=1,
                 step=1,
                 help="Número de etiquetas a reimprimir"
@@ -601,18 +1128,19 @@ with tab3:
                     try:
                         # Generar EPL sin cambiar estado en DB
                         contenido_epl_reimp = epl.generar_epl_individual(
-                            codigo['codigo_barras'],
+                            codigo.codigo_barras,
                             cantidad_reimp
                         )
+                        db.registrar_impresion([(codigo.id, codigo.codigo_barras, cantidad_reimp)], db.REIMPRESION)
 
                         # Mostrar éxito
                         st.success("✅ ¡Archivo EPL generado exitosamente!")
 
                         # Botón de descarga
                         st.download_button(
-                            label=f"📥 Descargar {codigo['codigo_barras']}.epl ({cantidad_reimp} {'copia' if cantidad_reimp == 1 else 'copias'})",
+                            label=f"📥 Descargar {codigo.codigo_barras}.epl ({cantidad_reimp} {'copia' if cantidad_reimp == 1 else 'copias'})",
                             data=contenido_epl_reimp,
-                            file_name=f"{codigo['codigo_barras']}.epl",
+                            file_name=f"{codigo.codigo_barras}.epl",
                             mime="application/octet-stream",
                             use_container_width=True,
                             type="primary"
@@ -623,12 +1151,171 @@ with tab3:
                     except Exception as e:
                         st.error(f"❌ Error al generar archivo: {str(e)}")
 
-    elif st.session_state.resultado_busqueda is None and buscar_clicked:
+    elif st.session_state.resultado_busqueda is None and buscar_clicked and not error_busqueda:
         st.warning("⚠️ No se encontró ningún código con ese valor")
         st.info("💡 Verifica que el código de barras o SKU sea correcto")
     else:
         st.info("💡 Ingresa un código de barras o TBC SKU y presiona 'Buscar' para consultar")
 
+    st.markdown("---")
+
+    # Historial de lotes archivados (reimpresión sin base de datos)
+    st.subheader("🗂️ Historial de Lotes")
+    st.markdown("Reimprime un lote generado anteriormente, o solo la parte de un código, sin consultar la base de datos ni modificar estados.")
+
+    archivo_lotes = obtener_archivo_lotes()
+
+    col_hist1, col_hist2 = st.columns(2)
+
+    with col_hist1:
+        fechas_historial = st.date_input(
+            "Fecha de generación",
+            value=(datetime.now().date() - timedelta(days=7), datetime.now().date()),
+            key="fechas_historial"
+        )
+
+    with col_hist2:
+        codigo_historial = st.text_input(
+            "Código de barras en el lote (opcional)",
+            max_chars=8,
+            key="codigo_historial",
+            help="Muestra solo los lotes que imprimieron este código"
+        ).strip()
+
+    # El rango queda incompleto mientras se eligen las fechas
+    if isinstance(fechas_historial, (tuple, list)):
+        fecha_hist_desde = fechas_historial[0] if fechas_historial else datetime.now().date()
+        fecha_hist_hasta = fechas_historial[-1] if fechas_historial else fecha_hist_desde
+    else:
+        fecha_hist_desde = fecha_hist_hasta = fechas_historial
+
+    if codigo_historial:
+        lotes_historial = [
+            lote for lote in archivo_lotes.lotes_por_codigo(codigo_historial)
+            if fecha_hist_desde.isoformat() <= lote.fecha[:10] <= fecha_hist_hasta.isoformat()
+        ]
+    else:
+        lotes_historial = archivo_lotes.lotes_por_fecha(fecha_hist_desde, fecha_hist_hasta)
+
+    lotes_historial = lotes_historial[:LIMITE_HISTORIAL]
+
+    if lotes_historial:
+        lote_historial = st.selectbox(
+            "Lote",
+            options=lotes_historial,
+            format_func=lambda lote: f"{lote.nombre} · {datetime.fromisoformat(lote.fecha).strftime('%d/%m/%Y %H:%M')} · {lote.etiquetas} etiquetas",
+            key="lote_historial"
+        )
+
+        codigo_parte = codigo_historial if codigo_historial in lote_historial.codigos else ""
+        reimpresion = (lote_historial.id, codigo_parte)
+
+        # El lote se descomprime solo al pedirlo, no en cada rerun
+        if st.session_state.get("reimpresion_preparada") != reimpresion:
+            if st.button("🗜️ Preparar reimpresión", key="preparar_reimpresion"):
+                st.session_state.reimpresion_preparada = reimpresion
+                st.rerun()
+        else:
+            try:
+                contenido_lote, contenido_parte = preparar_reimpresion(*reimpresion)
+
+                col_desc1, col_desc2 = st.columns(2)
+
+                with col_desc1:
+                    st.download_button(
+                        label=f"📥 Lote completo ({lote_historial.etiquetas} etiquetas)",
+                        data=contenido_lote or "",
+                        file_name=lote_historial.nombre,
+                        mime="application/octet-stream",
+                        use_container_width=True,
+                        key="descargar_lote_historial"
+                    )
+
+                with col_desc2:
+                    if contenido_parte is not None:
+                        st.download_button(
+                            label=f"📥 Solo {codigo_parte}",
+                            data=contenido_parte,
+                            file_name=f"{lote_historial.nombre[:-4]}_{codigo_parte}.epl",
+                            mime="application/octet-stream",
+                            use_container_width=True,
+                            key="descargar_parte_historial"
+                        )
+                        if lote_historial.columnas > 1:
+                            st.caption("Incluye las filas que el código comparte con otros códigos del rollo")
+
+            except (OSError, ValueError) as e:
+                st.error(f"❌ No se pudo leer el lote archivado: {str(e)}")
+    else:
+        st.info("💡 No hay lotes archivados para ese filtro")
+
+# ============================================================================
+# TAB 4: ESTADÍSTICAS
+# ============================================================================
+with tab4:
+    st.header("Estadísticas de Códigos")
+    st.markdown("Conteos calculados en la base de datos. Se actualizan cada 5 minutos.")
+    st.markdown("---")
+
+    col_est1, col_est2 = st.columns([3, 1])
+
+    with col_est1:
+        dias_estadisticas = st.select_slider(
+            "Días a mostrar en creaciones por día",
+            options=[7, 14, 30, 60, 90],
+            value=30
+        )
+
+    with col_est2:
+        st.markdown("")  # Espaciado para alinear el botón
+        if st.button("🔄 Actualizar ahora", use_container_width=True):
+            obtener_estadisticas_cache.clear()
+
+    try:
+        estadisticas = obtener_estadisticas_cache(dias_estadisticas)
+    except db.ErrorBaseDatos as e:
+        mostrar_error_bd(e)
+        estadisticas = None
+
+    if estadisticas:
+        por_comodin = estadisticas["por_comodin"]
+        por_dia = estadisticas["por_dia"]
+
+        total_codigos = sum(item["total"] for item in por_comodin)
+        total_impresos = sum(item["impresos"] for item in por_comodin)
+
+        col_met1, col_met2, col_met3 = st.columns(3)
+        with col_met1:
+            st.metric("Total de Códigos", total_codigos)
+        with col_met2:
+            st.metric("Impresos", total_impresos)
+        with col_met3:
+            st.metric("No Impresos", total_codigos - total_impresos)
+
+        st.markdown("---")
+
+        st.subheader("📋 Impresos vs No Impresos por Comodín")
+        if por_comodin:
+            st.dataframe(
+                por_comodin,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "comodin_proveedor": "Comodín",
+                    "total": "Total",
+                    "impresos": "Impresos",
+                    "no_impresos": "No Impresos"
+                }
+            )
+        else:
+            st.info("💡 No hay códigos en la base de datos")
+
+        st.subheader(f"📅 Códigos creados por día (últimos {dias_estadisticas} días)")
+        if por_dia:
+            st.bar_chart(por_dia, x="dia", y="creados")
+        else:
+            st.info("💡 No se crearon códigos en este periodo")
+
 # Footer
 st.markdown("---")
 st.caption("JYE Barcode System v1.0 | Didácticos Jugando y Educando")
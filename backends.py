@@ -0,0 +1,240 @@
+"""
+Backends Module for JYE Barcode System
+Pluggable data backend interface and its Supabase implementation
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Columnas de la tabla codigos_barras (ver DDL en README)
+COLUMNAS_TABLA = (
+    "id",
+    "codigo_barras",
+    "comodin_proveedor",
+    "tbc_sku",
+    "fecha_creacion",
+    "impreso",
+    "fecha_impresion",
+)
+
+# Columnas de la tabla eventos_impresion (ver SQL en README)
+COLUMNAS_EVENTOS = (
+    "id",
+    "codigo_id",
+    "codigo_barras",
+    "tipo",
+    "cantidad",
+    "lote_id",
+    "fecha",
+)
+
+# Ids por petición en filtros in_ (la lista viaja en la URL)
+MAX_IDS_POR_PETICION = 150
+
+
+class BackendDatos(ABC):
+    """
+    Operaciones primitivas sobre la tabla codigos_barras
+
+    database.py aplica encima la política de reintentos, el caché compartido
+    y los errores tipados, así que las implementaciones solo ejecutan la
+    operación y dejan propagar las excepciones de su driver.
+    """
+
+    @abstractmethod
+    def insertar_codigo(self, datos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Inserta un código y devuelve el registro creado"""
+
+    @abstractmethod
+    def existe_codigo(self, codigo_barras: str) -> bool:
+        """Indica si el código de barras ya existe"""
+
+    @abstractmethod
+    def consultar_codigos(self, filtros: Optional[Dict[str, Any]], columnas: str) -> List[Dict[str, Any]]:
+        """Consulta códigos con los filtros de obtener_codigos, por fecha de creación descendente"""
+
+    @abstractmethod
+    def marcar_impresos(self, codigo_ids: List[str], fecha_impresion: str) -> None:
+        """Marca los códigos como impresos con la fecha indicada (una sentencia por conjunto)"""
+
+    @abstractmethod
+    def insertar_eventos(self, eventos: List[Dict[str, Any]]) -> None:
+        """Inserta eventos de impresión en una sola petición, ignorando ids ya insertados"""
+
+    @abstractmethod
+    def eventos_codigo(self, codigo_id: str, limite: int) -> List[Dict[str, Any]]:
+        """Eventos de impresión de un código, del más reciente al más antiguo"""
+
+    @abstractmethod
+    def buscar_por(self, columna: str, valor: str, columnas: str = "*") -> Optional[Dict[str, Any]]:
+        """Devuelve el primer registro cuya columna sea igual al valor"""
+
+    @abstractmethod
+    def comodines_unicos(self) -> List[str]:
+        """Devuelve los comodines distintos ordenados"""
+
+    @abstractmethod
+    def pagina_codigos(self, despues_de: Optional[str], limite: int, columnas: str) -> List[Dict[str, Any]]:
+        """Página ordenada por codigo_barras con codigo_barras > despues_de"""
+
+    @abstractmethod
+    def creados_desde(self, desde: Optional[Tuple[str, str]], columnas: str, limite: int) -> List[Dict[str, Any]]:
+        """Códigos con (fecha_creacion, id) > desde, en ese orden ascendente"""
+
+    @abstractmethod
+    def estadisticas(self, dias: int) -> Dict[str, Any]:
+        """Conteos por comodín y creaciones por día"""
+
+    @abstractmethod
+    def marca_agua(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Fechas máximas de creación, de impresión y del último evento de impresión"""
+
+
+class BackendSupabase(BackendDatos):
+    """Backend sobre Supabase (PostgREST)"""
+
+    def __init__(self, obtener_cliente: Callable[[], Any]):
+        """
+        Args:
+            obtener_cliente: Función que devuelve un cliente de Supabase
+        """
+        self.obtener_cliente = obtener_cliente
+
+    def _tabla(self):
+        return self.obtener_cliente().table("codigos_barras")
+
+    def insertar_codigo(self, datos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = self._tabla().insert(datos).execute()
+        return response.data[0] if response.data else None
+
+    def existe_codigo(self, codigo_barras: str) -> bool:
+        response = self._tabla()\
+            .select("id")\
+            .eq("codigo_barras", codigo_barras)\
+            .execute()
+
+        return len(response.data) > 0
+
+    def consultar_codigos(self, filtros: Optional[Dict[str, Any]], columnas: str) -> List[Dict[str, Any]]:
+        # Iniciar query
+        query = self._tabla().select(columnas)
+
+        # Aplicar filtros si existen
+        if filtros:
+            if "comodin" in filtros and filtros["comodin"]:
+                query = query.eq("comodin_proveedor", filtros["comodin"])
+
+            if "impreso" in filtros and filtros["impreso"] is not None:
+                query = query.eq("impreso", filtros["impreso"])
+
+            if "fecha_desde" in filtros and filtros["fecha_desde"]:
+                query = query.gte("fecha_creacion", filtros["fecha_desde"].isoformat())
+
+            if "fecha_hasta" in filtros and filtros["fecha_hasta"]:
+                query = query.lte("fecha_creacion", filtros["fecha_hasta"].isoformat())
+
+        # Ordenar por fecha de creación descendente
+        response = query.order("fecha_creacion", desc=True).execute()
+
+        return response.data if response.data else []
+
+    def marcar_impresos(self, codigo_ids: List[str], fecha_impresion: str) -> None:
+        for inicio in range(0, len(codigo_ids), MAX_IDS_POR_PETICION):
+            self._tabla()\
+                .update({
+                    "impreso": True,
+                    "fecha_impresion": fecha_impresion
+                })\
+                .in_("id", codigo_ids[inicio:inicio + MAX_IDS_POR_PETICION])\
+                .execute()
+
+    def insertar_eventos(self, eventos: List[Dict[str, Any]]) -> None:
+        self.obtener_cliente().table("eventos_impresion")\
+            .upsert(eventos, ignore_duplicates=True)\
+            .execute()
+
+    def eventos_codigo(self, codigo_id: str, limite: int) -> List[Dict[str, Any]]:
+        response = self.obtener_cliente().table("eventos_impresion")\
+            .select(",".join(COLUMNAS_EVENTOS))\
+            .eq("codigo_id", codigo_id)\
+            .order("fecha", desc=True)\
+            .limit(limite)\
+            .execute()
+
+        return response.data if response.data else []
+
+    def buscar_por(self, columna: str, valor: str, columnas: str = "*") -> Optional[Dict[str, Any]]:
+        response = self._tabla()\
+            .select(columnas)\
+            .eq(columna, valor)\
+            .limit(1)\
+            .execute()
+
+        return response.data[0] if response.data else None
+
+    def comodines_unicos(self) -> List[str]:
+        response = self._tabla()\
+            .select("comodin_proveedor")\
+            .execute()
+
+        # Extraer comodines únicos y ordenar
+        return sorted(set(item["comodin_proveedor"] for item in response.data or []))
+
+    def pagina_codigos(self, despues_de: Optional[str], limite: int, columnas: str) -> List[Dict[str, Any]]:
+        query = self._tabla().select(columnas)
+
+        if despues_de is not None:
+            query = query.gt("codigo_barras", despues_de)
+
+        response = query.order("codigo_barras").limit(limite).execute()
+        return response.data if response.data else []
+
+    def creados_desde(self, desde: Optional[Tuple[str, str]], columnas: str, limite: int) -> List[Dict[str, Any]]:
+        filas: List[Dict[str, Any]] = []
+        query = self._tabla().select(columnas)
+
+        if desde is not None:
+            fecha_desde, id_desde = desde
+
+            # Keyset en dos pasos: el resto de la misma fecha y luego las posteriores
+            response = self._tabla().select(columnas)\
+                .eq("fecha_creacion", fecha_desde)\
+                .gt("id", id_desde)\
+                .order("id")\
+                .limit(limite)\
+                .execute()
+            filas = response.data or []
+
+            if len(filas) >= limite:
+                return filas
+
+            query = query.gt("fecha_creacion", fecha_desde)
+
+        response = query.order("fecha_creacion").order("id").limit(limite - len(filas)).execute()
+        return filas + (response.data or [])
+
+    def estadisticas(self, dias: int) -> Dict[str, Any]:
+        response = self.obtener_cliente().rpc("estadisticas_codigos", {"dias": dias}).execute()
+        datos = response.data or {}
+
+        return {
+            "por_comodin": datos.get("por_comodin") or [],
+            "por_dia": datos.get("por_dia") or [],
+        }
+
+    def marca_agua(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        marcas = []
+
+        for tabla, columna in (
+            ("codigos_barras", "fecha_creacion"),
+            ("codigos_barras", "fecha_impresion"),
+            ("eventos_impresion", "fecha"),
+        ):
+            response = self.obtener_cliente().table(tabla)\
+                .select(columna)\
+                .order(columna, desc=True, nullsfirst=False)\
+                .limit(1)\
+                .execute()
+            marcas.append(response.data[0][columna] if response.data else None)
+
+        return marcas[0], marcas[1], marcas[2]
@@ -0,0 +1,143 @@
+"""
+Pipeline Benchmark Module for JYE Barcode System
+Times the parallel label_pipeline against the sequential epl_generator
+functions on a synthetic lot (equivalence is covered by test_label_pipeline.py)
+
+Uso:
+    python bench_pipeline.py --items 200000 --columnas 1 2 --procesos 1 4
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List, Tuple
+
+import epl_generator as epl
+import label_pipeline as lp
+from quantity_policy import PoliticaCantidades
+
+# El benchmark mide generación, no límites de impresión
+SIN_LIMITES = PoliticaCantidades(max_por_item=None)
+
+
+class DestinoConteo(lp.Destino):
+    """Descarta el EPL y solo cuenta caracteres (evita medir la escritura a disco)"""
+
+    def __init__(self):
+        self.caracteres = 0
+
+    def escribir(self, parte: str) -> None:
+        self.caracteres += len(parte)
+
+
+def generar_items(cantidad: int, semilla: int) -> List[Tuple[str, int]]:
+    """
+    Lote sintético con comodines y cantidades variadas
+
+    Args:
+        cantidad: Ítems del lote
+        semilla: Semilla del generador aleatorio
+
+    Returns:
+        list: Tuplas (codigo_barras, cantidad)
+    """
+    aleatorio = random.Random(semilla)
+    return [
+        (f"{aleatorio.randint(100, 999):03d}{aleatorio.randint(0, 99999):05d}", aleatorio.randint(1, 10))
+        for _ in range(cantidad)
+    ]
+
+
+def medir(funcion: Callable[[], int], repeticiones: int) -> Tuple[float, int]:
+    """
+    Mejor tiempo de varias repeticiones
+
+    Args:
+        funcion: Función a medir; devuelve los caracteres generados
+        repeticiones: Veces que se ejecuta
+
+    Returns:
+        tuple: (segundos del mejor intento, caracteres generados)
+    """
+    mejor = float("inf")
+    caracteres = 0
+
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        caracteres = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+
+    return mejor, caracteres
+
+
+def ejecutar_benchmark(
+    items: List[Tuple[str, int]],
+    columnas: int,
+    procesos: List[int],
+    tamano_bloque: int,
+    repeticiones: int
+) -> List[Tuple[str, float, int]]:
+    """
+    Mide el generador secuencial y el pipeline con cada número de procesos
+
+    Args:
+        items: Lote a generar
+        columnas: Etiquetas por fila
+        procesos: Tamaños del pool a medir
+        tamano_bloque: Ítems por bloque del pipeline
+        repeticiones: Repeticiones por medición
+
+    Returns:
+        list: Tuplas (variante, segundos, caracteres)
+    """
+    resultados = []
+
+    segundos, caracteres = medir(
+        lambda: len(epl.generar_epl_multiple(items, columnas=columnas, politica=SIN_LIMITES)),
+        repeticiones
+    )
+    resultados.append(("secuencial", segundos, caracteres))
+
+    for n in procesos:
+        def pipeline() -> int:
+            destino = DestinoConteo()
+            lp.generar_en_destinos(
+                items, [destino], columnas=columnas, tamano_bloque=tamano_bloque, procesos=n, politica=SIN_LIMITES
+            )
+            return destino.caracteres
+
+        segundos, caracteres = medir(pipeline, repeticiones)
+        resultados.append((f"pipeline x{n}", segundos, caracteres))
+
+    return resultados
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Compara el pipeline paralelo con la generación secuencial")
+    parser.add_argument("--items", type=int, default=100000, help="Ítems del lote sintético")
+    parser.add_argument("--columnas", type=int, nargs="+", default=[1, 2], choices=epl.COLUMNAS_ADMITIDAS)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, lp.MAX_PROCESOS])
+    parser.add_argument("--tamano-bloque", type=int, default=lp.TAMANO_BLOQUE)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    items = generar_items(args.items, args.semilla)
+    etiquetas = sum(cantidad for _, cantidad in items)
+    print(f"Lote: {len(items)} ítems, {etiquetas} etiquetas")
+
+    for columnas in args.columnas:
+        print(f"\n{columnas} etiqueta(s) por fila")
+        resultados = ejecutar_benchmark(items, columnas, args.procesos, args.tamano_bloque, args.repeticiones)
+        base = resultados[0][1]
+
+        for variante, segundos, caracteres in resultados:
+            print(
+                f"  {variante:<14} {segundos:8.3f} s  {etiquetas / segundos:>12,.0f} etiquetas/s  "
+                f"x{base / segundos:.2f}  ({caracteres:,} caracteres)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,63 @@
 """
 Database module for JYE Barcode System
-Handles all Supabase interactions
+Handles all data access through the configured backend (Supabase or local SQLite)
 """
 
+import threading
+
 import streamlit as st
 from supabase import create_client, Client
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from supabase.client import ClientOptions
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple
+
+from resilience import (
+    ejecutar,
+    ErrorBaseDatos,
+    ErrorTransitorio,
+    PlazoAgotado,
+    CircuitoAbierto,
+    ErrorPermanente,
+)
+from shared_cache import CacheCompartido, VigilanteCambios
+from backends import BackendDatos, BackendSupabase
+from sqlite_backend import BackendSQLite, RUTA_DEFAULT as RUTA_SQLITE_DEFAULT
+from print_events import BufferEventos, crear_eventos, LOTE, REIMPRESION, INDIVIDUAL
+from models import (
+    CodigoBarras,
+    EventoImpresion,
+    COLUMNAS_DETALLE,
+    codigo_desde_fila,
+    evento_desde_fila,
+)
+
+# Timeout de cada petición HTTP a Supabase (segundos)
+TIMEOUT_PETICION = 5
+
+# Plazo total por operación, incluyendo reintentos (segundos)
+PLAZO_LECTURA = 10.0
+PLAZO_ESCRITURA = 15.0
+
+# Vida de las entradas del caché compartido por tipo de lectura (segundos)
+TTL_CODIGOS = 60.0
+TTL_BUSQUEDA = 300.0
+TTL_COMODINES = 600.0
+
+# Segundos entre consultas de la marca de agua (cambios de otras instancias)
+INTERVALO_MARCA_AGUA = 15.0
+
+# Eventos mostrados en el historial de impresión de un código
+LIMITE_HISTORIAL_IMPRESION = 100
+
+# Segundos entre ciclos de replicación SQLite -> Supabase
+INTERVALO_REPLICACION = 10.0
+
+# Caché compartido por todas las sesiones del proceso
+cache = CacheCompartido()
+
+# Backend del proceso (se crea al primer uso según secrets)
+_backend: Optional[BackendDatos] = None
+_lock_backend = threading.Lock()
 
 
 def get_supabase_client() -> Client:
@@ -19,77 +70,179 @@ def get_supabase_client() -> Client:
     try:
         url = st.secrets["supabase"]["url"]
         key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
+        return create_client(
+            url,
+            key,
+            options=ClientOptions(postgrest_client_timeout=TIMEOUT_PETICION)
+        )
     except Exception as e:
         st.error(f"Error al conectar con Supabase: {str(e)}")
         raise
 
 
-def crear_codigo_barras(comodin: str, sku: str) -> Optional[Dict[str, Any]]:
+def obtener_backend() -> BackendDatos:
     """
-    Crea un nuevo registro de código de barras en Supabase
+    Retorna el backend de datos del proceso, creándolo en el primer uso
 
-    Args:
-        comodin: Código comodín del proveedor (será padded a 3 dígitos)
-        sku: SKU TBC (será padded a 5 dígitos)
+    Por defecto se usa Supabase. Con `[backend] tipo = "sqlite"` en secrets se
+    usa una base SQLite local (ruta configurable) y, si `replicar_supabase`
+    es true, las escrituras se replican a Supabase en segundo plano.
 
     Returns:
-        dict: Registro creado con todos los campos
-        None: Si hay error
+        BackendDatos: Backend configurado
     """
-    try:
-        supabase = get_supabase_client()
+    global _backend
 
-        # Generar código de barras con padding
-        codigo_barras = comodin.zfill(3) + sku.zfill(5)
+    with _lock_backend:
+        if _backend is None:
+            config = st.secrets.get("backend", {})
 
-        # Preparar datos para inserción
-        datos = {
-            "codigo_barras": codigo_barras,
-            "comodin_proveedor": comodin,
-            "tbc_sku": sku,
-            "impreso": False
-        }
+            if config.get("tipo", "supabase") == "sqlite":
+                replica = BackendSupabase(get_supabase_client) if config.get("replicar_supabase", False) else None
+                backend = BackendSQLite(config.get("ruta", RUTA_SQLITE_DEFAULT), replica)
+                backend.iniciar_replicacion(float(config.get("intervalo_replicacion", INTERVALO_REPLICACION)))
+                _backend = backend
+            else:
+                # Crear un cliente valida las credenciales antes del primer uso
+                get_supabase_client()
+                _backend = BackendSupabase(get_supabase_client)
 
-        # Insertar en Supabase
-        response = supabase.table("codigos_barras").insert(datos).execute()
+        return _backend
 
-        if response.data:
-            return response.data[0]
-        else:
-            return None
 
-    except Exception as e:
-        st.error(f"Error al crear código de barras: {str(e)}")
-        return None
+def obtener_marca_agua() -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Obtiene la marca de agua de cambios de las tablas
 
+    Se usa para detectar escrituras de otras instancias de la aplicación:
+    cualquier código nuevo, código marcado como impreso o evento de
+    impresión (incluidas las reimpresiones) cambia alguna de las tres fechas.
 
-def verificar_codigo_existe(codigo_barras: str) -> bool:
+    Returns:
+        tuple: (fecha_creacion máxima, fecha_impresion máxima, fecha del último evento)
+
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
     """
-    Verifica si un código de barras ya existe en la base de datos
+    return ejecutar(
+        lambda: obtener_backend().marca_agua(),
+        "consultar cambios",
+        idempotente=True,
+        plazo=PLAZO_LECTURA
+    )
+
+
+vigilante = VigilanteCambios(cache, obtener_marca_agua, INTERVALO_MARCA_AGUA)
+
+
+def _registrar_escritura_local(
+    fecha_creacion: Optional[str] = None,
+    fecha_impresion: Optional[str] = None,
+    fecha_evento: Optional[str] = None
+) -> None:
+    """
+    Incorpora a la marca de agua la fecha de una escritura propia (ya invalidada por etiquetas)
+
+    Usa la fecha de la propia escritura en lugar de volver a consultar la
+    marca de agua, que costaría una consulta por tabla en cada escritura.
 
     Args:
-        codigo_barras: Código de barras de 8 dígitos a verificar
+        fecha_creacion: fecha_creacion del código creado
+        fecha_impresion: fecha_impresion asignada
+        fecha_evento: Fecha del último evento de impresión escrito
+    """
+    vigilante.registrar_escritura((fecha_creacion, fecha_impresion, fecha_evento))
+
+
+def _leer_con_cache(clave: Tuple, cargar, ttl: float, etiquetas: List[str], etiquetas_valor=None):
+    """
+    Sirve una lectura desde el caché compartido, verificando antes cambios externos
+
+    Args:
+        clave: Clave de la lectura
+        cargar: Función que consulta el backend en caso de fallo
+        ttl: Segundos de vida de la entrada
+        etiquetas: Etiquetas para invalidación selectiva
+        etiquetas_valor: Función opcional que agrega etiquetas según el resultado
 
     Returns:
-        bool: True si existe, False si no existe
+        Resultado cacheado o recién consultado
     """
     try:
-        supabase = get_supabase_client()
+        vigilante.verificar()
+    except ErrorBaseDatos:
+        # Sin marca de agua se sigue sirviendo hasta que expire el TTL
+        pass
 
-        response = supabase.table("codigos_barras")\
-            .select("id")\
-            .eq("codigo_barras", codigo_barras)\
-            .execute()
+    return cache.obtener_o_cargar(clave, cargar, ttl, etiquetas, etiquetas_valor)
 
-        return len(response.data) > 0
 
-    except Exception as e:
-        st.error(f"Error al verificar código existente: {str(e)}")
-        return False
+def crear_codigo_barras(comodin: str, sku: str) -> Optional[CodigoBarras]:
+    """
+    Crea un nuevo registro de código de barras
 
+    Args:
+        comodin: Código comodín del proveedor (será padded a 3 dígitos)
+        sku: SKU TBC (será padded a 5 dígitos)
+
+    Returns:
+        CodigoBarras: Registro creado con todos los campos
+        None: Si la inserción no devolvió datos
+
+    Raises:
+        ErrorBaseDatos: Si la inserción falla (no se reintenta: no es idempotente)
+    """
+    # Generar código de barras con padding
+    codigo_barras = comodin.zfill(3) + sku.zfill(5)
+
+    # Preparar datos para inserción
+    datos = {
+        "codigo_barras": codigo_barras,
+        "comodin_proveedor": comodin,
+        "tbc_sku": sku,
+        "impreso": False
+    }
+
+    # Insertar en el backend
+    registro = ejecutar(
+        lambda: obtener_backend().insertar_codigo(datos),
+        "crear código de barras",
+        idempotente=False,
+        plazo=PLAZO_ESCRITURA
+    )
+
+    # Listados, comodines y búsquedas sin resultado pueden haber cambiado
+    cache.invalidar("codigos", "comodines", "busqueda_vacia")
+    _registrar_escritura_local(fecha_creacion=registro.get("fecha_creacion") if registro else None)
+
+    return codigo_desde_fila(registro) if registro else None
+
+
+def verificar_codigo_existe(codigo_barras: str) -> bool:
+    """
+    Verifica si un código de barras ya existe en la base de datos
 
-def obtener_codigos(filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    Args:
+        codigo_barras: Código de barras de 8 dígitos a verificar
+
+    Returns:
+        bool: True si existe, False si no existe
+
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
+    """
+    return ejecutar(
+        lambda: obtener_backend().existe_codigo(codigo_barras),
+        "verificar código existente",
+        idempotente=True,
+        plazo=PLAZO_LECTURA
+    )
+
+
+def obtener_codigos(
+    filtros: Optional[Dict[str, Any]] = None,
+    columnas: str = COLUMNAS_DETALLE
+) -> List[CodigoBarras]:
     """
     Obtiene códigos de barras con filtros opcionales
 
@@ -99,110 +252,104 @@ def obtener_codigos(filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str,
             - impreso: bool (filtra por estado de impresión)
             - fecha_desde: datetime (fecha inicial)
             - fecha_hasta: datetime (fecha final)
+        columnas: Proyección del caso de uso (models.COLUMNAS_GRID,
+            models.COLUMNAS_DETALLE); debe incluir id, codigo_barras,
+            comodin_proveedor y tbc_sku
 
     Returns:
-        list: Lista de registros que cumplen los filtros
-    """
-    try:
-        supabase = get_supabase_client()
-
-        # Iniciar query
-        query = supabase.table("codigos_barras").select("*")
-
-        # Aplicar filtros si existen
-        if filtros:
-            if "comodin" in filtros and filtros["comodin"]:
-                query = query.eq("comodin_proveedor", filtros["comodin"])
-
-            if "impreso" in filtros and filtros["impreso"] is not None:
-                query = query.eq("impreso", filtros["impreso"])
-
-            if "fecha_desde" in filtros and filtros["fecha_desde"]:
-                query = query.gte("fecha_creacion", filtros["fecha_desde"].isoformat())
-
-            if "fecha_hasta" in filtros and filtros["fecha_hasta"]:
-                query = query.lte("fecha_creacion", filtros["fecha_hasta"].isoformat())
+        list: Registros CodigoBarras que cumplen los filtros. El resultado
+            puede venir del caché compartido entre sesiones: no debe modificarse.
 
-        # Ordenar por fecha de creación descendente
-        query = query.order("fecha_creacion", desc=True)
-
-        # Ejecutar query
-        response = query.execute()
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
+    """
+    def cargar():
+        filas = ejecutar(
+            lambda: obtener_backend().consultar_codigos(filtros, columnas),
+            "obtener códigos",
+            idempotente=True,
+            plazo=PLAZO_LECTURA
+        )
+        # Las fechas se convierten una vez al cargar, no en cada rerun
+        return [codigo_desde_fila(fila) for fila in filas]
 
-        return response.data if response.data else []
+    clave_filtros = tuple(sorted((nombre, str(valor)) for nombre, valor in (filtros or {}).items()))
 
-    except Exception as e:
-        st.error(f"Error al obtener códigos: {str(e)}")
-        return []
+    return _leer_con_cache(("obtener_codigos", columnas, clave_filtros), cargar, TTL_CODIGOS, ["codigos"])
 
 
 def actualizar_estado_impreso(codigo_ids: List[str]) -> bool:
     """
     Actualiza el estado de impresión de múltiples códigos
 
+    Es una sola actualización por conjunto de ids (filtro in_), no una por
+    código. Refleja el estado de inmediato, antes de que se escriban los
+    eventos de registrar_impresion; al escribirse, estos avanzan
+    fecha_impresion a la fecha del evento.
+
     Args:
         codigo_ids: Lista de UUIDs de códigos a actualizar
 
     Returns:
-        bool: True si la actualización fue exitosa, False si hubo error
+        bool: True si la actualización fue exitosa
+
+    Raises:
+        ErrorBaseDatos: Si la actualización falla tras los reintentos. Marcar
+            como impreso es idempotente, por lo que se reintenta con seguridad.
     """
-    try:
-        supabase = get_supabase_client()
+    # En UTC, como las fechas de los eventos, para que ambas se comparen bien
+    fecha_impresion = datetime.now(timezone.utc).isoformat()
 
-        # Actualizar estado para cada código
-        for codigo_id in codigo_ids:
-            supabase.table("codigos_barras")\
-                .update({
-                    "impreso": True,
-                    "fecha_impresion": datetime.now().isoformat()
-                })\
-                .eq("id", codigo_id)\
-                .execute()
+    ejecutar(
+        lambda: obtener_backend().marcar_impresos(codigo_ids, fecha_impresion),
+        "actualizar estado de impresión",
+        idempotente=True,
+        plazo=PLAZO_ESCRITURA
+    )
 
-        return True
+    # Invalidar listados y las búsquedas de los códigos actualizados
+    cache.invalidar("codigos", *[f"id:{codigo_id}" for codigo_id in codigo_ids])
+    _registrar_escritura_local(fecha_impresion=fecha_impresion)
 
-    except Exception as e:
-        st.error(f"Error al actualizar estado de impresión: {str(e)}")
-        return False
+    return True
 
 
-def buscar_codigo(query: str) -> Optional[Dict[str, Any]]:
+def buscar_codigo(query: str, columnas: str = COLUMNAS_DETALLE) -> Optional[CodigoBarras]:
     """
     Busca un código de barras por código completo o por TBC_SKU
 
     Args:
         query: Cadena de búsqueda (código de barras o SKU)
+        columnas: Proyección a consultar (default: todas las columnas)
 
     Returns:
-        dict: Registro encontrado
+        CodigoBarras: Registro encontrado
         None: Si no se encuentra
-    """
-    try:
-        supabase = get_supabase_client()
 
-        # Intentar buscar por código de barras primero
-        response = supabase.table("codigos_barras")\
-            .select("*")\
-            .eq("codigo_barras", query)\
-            .execute()
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
+    """
+    def consultar(campo: str):
+        return ejecutar(
+            lambda: obtener_backend().buscar_por(campo, query, columnas),
+            "buscar código",
+            idempotente=True,
+            plazo=PLAZO_LECTURA
+        )
 
-        if response.data and len(response.data) > 0:
-            return response.data[0]
+    def cargar():
+        # Intentar buscar por código de barras primero; si no, por TBC_SKU
+        registro = consultar("codigo_barras")
 
-        # Si no se encuentra, buscar por TBC_SKU
-        response = supabase.table("codigos_barras")\
-            .select("*")\
-            .eq("tbc_sku", query)\
-            .execute()
+        if registro is None:
+            registro = consultar("tbc_sku")
 
-        if response.data and len(response.data) > 0:
-            return response.data[0]
+        return codigo_desde_fila(registro) if registro else None
 
-        return None
+    def etiquetas_resultado(registro):
+        return [f"id:{registro.id}"] if registro else ["busqueda_vacia"]
 
-    except Exception as e:
-        st.error(f"Error al buscar código: {str(e)}")
-        return None
+    return _leer_con_cache(("buscar_codigo", query, columnas), cargar, TTL_BUSQUEDA, ["busqueda"], etiquetas_resultado)
 
 
 def obtener_comodines_unicos() -> List[str]:
@@ -211,23 +358,224 @@ def obtener_comodines_unicos() -> List[str]:
 
     Returns:
         list: Lista de comodines únicos ordenados
+
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
     """
-    try:
-        supabase = get_supabase_client()
+    def cargar():
+        return ejecutar(
+            lambda: obtener_backend().comodines_unicos(),
+            "obtener comodines únicos",
+            idempotente=True,
+            plazo=PLAZO_LECTURA
+        )
+
+    return _leer_con_cache(("obtener_comodines_unicos",), cargar, TTL_COMODINES, ["comodines"])
+
+
+def obtener_pagina_codigos(
+    despues_de: Optional[str] = None,
+    limite: int = 1000,
+    columnas: str = "*"
+) -> List[Dict[str, Any]]:
+    """
+    Obtiene una página de códigos ordenada por código de barras (keyset pagination)
 
-        # Obtener todos los comodines
-        response = supabase.table("codigos_barras")\
-            .select("comodin_proveedor")\
-            .execute()
+    A diferencia de OFFSET, cada página usa el índice de codigo_barras y cuesta
+    lo mismo sin importar qué tan profundo se esté en la tabla.
 
-        if response.data:
-            # Extraer comodines únicos y ordenar
-            comodines = list(set([item["comodin_proveedor"] for item in response.data]))
-            comodines.sort()
-            return comodines
+    Args:
+        despues_de: Último codigo_barras de la página anterior (None para la primera)
+        limite: Número máximo de registros por página
+        columnas: Columnas a seleccionar (formato select de PostgREST)
 
-        return []
+    Returns:
+        list: Registros de la página, vacía cuando no hay más
 
-    except Exception as e:
-        st.error(f"Error al obtener comodines únicos: {str(e)}")
-        return []
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
+    """
+    return ejecutar(
+        lambda: obtener_backend().pagina_codigos(despues_de, limite, columnas),
+        "obtener página de códigos",
+        idempotente=True,
+        plazo=PLAZO_LECTURA
+    )
+
+
+def obtener_estadisticas(dias: int = 30) -> Dict[str, Any]:
+    """
+    Obtiene estadísticas agregadas calculadas en el servidor (RPC estadisticas_codigos)
+
+    Una sola llamada devuelve los conteos agrupados, sin transferir filas,
+    por lo que el costo no depende del tamaño de la tabla. Requiere la
+    función SQL estadisticas_codigos (ver README, sección 4.2).
+
+    Args:
+        dias: Días hacia atrás para las creaciones por día
+
+    Returns:
+        dict: Con las llaves:
+            - por_comodin: list de {comodin_proveedor, total, impresos, no_impresos}
+            - por_dia: list de {dia, creados}
+
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
+    """
+    return ejecutar(
+        lambda: obtener_backend().estadisticas(dias),
+        "obtener estadísticas",
+        idempotente=True,
+        plazo=PLAZO_LECTURA
+    )
+
+
+def obtener_codigos_creados_desde(
+    desde: Optional[Tuple[str, str]],
+    columnas: str = "*",
+    limite: int = 1000
+) -> List[Dict[str, Any]]:
+    """
+    Obtiene los códigos creados después de una posición (para sincronización incremental)
+
+    Es keyset pagination sobre (fecha_creacion, id): los códigos con la misma
+    fecha que el último conocido (p.ej. de una misma importación) no se
+    saltan aunque queden en el borde de una página.
+
+    Args:
+        desde: (fecha_creacion, id) del último código conocido (None para todos)
+        columnas: Columnas a seleccionar (debe incluir id y fecha_creacion)
+        limite: Número máximo de registros
+
+    Returns:
+        list: Registros ordenados por (fecha_creacion, id) ascendente
+
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
+    """
+    return ejecutar(
+        lambda: obtener_backend().creados_desde(desde, columnas, limite),
+        "obtener códigos nuevos",
+        idempotente=True,
+        plazo=PLAZO_LECTURA
+    )
+
+
+def _escribir_eventos(eventos: List[Dict[str, Any]]) -> None:
+    """
+    Inserta un bloque de eventos de impresión y avanza la fecha de impresión de sus códigos
+
+    Los eventos traen su id, por lo que repetir la inserción no los duplica.
+    Cada evento registrado (lote, reimpresión o individual) marca su código
+    como impreso con la fecha del evento más reciente del bloque: impreso y
+    fecha_impresion siguen así al historial. Los bloques se escriben en el
+    orden en que se registraron, por lo que la fecha no retrocede.
+
+    Raises:
+        ErrorBaseDatos: Si la inserción o la actualización fallan tras los
+            reintentos (ambas son idempotentes; el bloque se reintenta completo)
+    """
+    ejecutar(
+        lambda: obtener_backend().insertar_eventos(eventos),
+        "registrar eventos de impresión",
+        idempotente=True,
+        plazo=PLAZO_ESCRITURA
+    )
+
+    # Última fecha de cada código del bloque, agrupando los códigos por fecha
+    # (los eventos de una misma impresión comparten fecha: una sentencia por impresión)
+    ultima_fecha: Dict[str, str] = {}
+    for evento in eventos:
+        ultima_fecha[evento["codigo_id"]] = max(evento["fecha"], ultima_fecha.get(evento["codigo_id"], ""))
+
+    codigos_por_fecha: Dict[str, List[str]] = {}
+    for codigo_id, fecha in ultima_fecha.items():
+        codigos_por_fecha.setdefault(fecha, []).append(codigo_id)
+
+    for fecha, codigo_ids in codigos_por_fecha.items():
+        ejecutar(
+            lambda: obtener_backend().marcar_impresos(codigo_ids, fecha),
+            "actualizar estado de impresión",
+            idempotente=True,
+            plazo=PLAZO_ESCRITURA
+        )
+
+
+def _invalidar_historial(eventos: List[Dict[str, Any]]) -> None:
+    """Invalida el historial y el estado de impresión cacheados de los códigos de un bloque escrito"""
+    codigo_ids = {evento["codigo_id"] for evento in eventos}
+    cache.invalidar(
+        "codigos",
+        *[f"eventos:{codigo_id}" for codigo_id in codigo_ids],
+        *[f"id:{codigo_id}" for codigo_id in codigo_ids]
+    )
+
+    # _escribir_eventos también asignó la fecha del evento como fecha_impresion
+    ultima_fecha = max(evento["fecha"] for evento in eventos)
+    _registrar_escritura_local(fecha_impresion=ultima_fecha, fecha_evento=ultima_fecha)
+
+
+# Buffer de eventos compartido por todas las sesiones del proceso
+eventos_impresion = BufferEventos(_escribir_eventos, al_escribir=_invalidar_historial)
+
+
+def registrar_impresion(
+    items: List[Tuple[str, str, int]],
+    tipo: str,
+    lote_id: Optional[str] = None
+) -> None:
+    """
+    Registra etiquetas impresas en el historial sin agregar peticiones al flujo de impresión
+
+    Los eventos se encolan en memoria y se insertan en bloques en segundo
+    plano (ver print_events.BufferEventos). Al escribirse, cada evento marca
+    su código como impreso y avanza fecha_impresion a la fecha del evento.
+
+    Args:
+        items: Tuplas (codigo_id, codigo_barras, cantidad)
+        tipo: LOTE, REIMPRESION o INDIVIDUAL
+        lote_id: Id del lote, si aplica
+    """
+    eventos_impresion.agregar(crear_eventos(items, tipo, lote_id))
+
+
+def obtener_historial_impresion(
+    codigo_id: str,
+    limite: int = LIMITE_HISTORIAL_IMPRESION
+) -> List[EventoImpresion]:
+    """
+    Obtiene los eventos de impresión de un código, incluidos los aún no escritos
+
+    Args:
+        codigo_id: UUID del código
+        limite: Número máximo de eventos
+
+    Returns:
+        list: Registros EventoImpresion del más reciente al más antiguo
+
+    Raises:
+        ErrorBaseDatos: Si la consulta falla tras los reintentos
+    """
+    def cargar():
+        filas = ejecutar(
+            lambda: obtener_backend().eventos_codigo(codigo_id, limite),
+            "obtener historial de impresión",
+            idempotente=True,
+            plazo=PLAZO_LECTURA
+        )
+        return [evento_desde_fila(fila) for fila in filas]
+
+    escritos = _leer_con_cache(
+        ("obtener_historial_impresion", codigo_id, limite),
+        cargar,
+        TTL_BUSQUEDA,
+        [f"eventos:{codigo_id}"]
+    )
+
+    # Un evento puede estar a la vez en escritura y ya confirmado
+    eventos = {evento.id: evento for evento in escritos}
+    for fila in eventos_impresion.pendientes(codigo_id):
+        if fila["id"] not in eventos:
+            eventos[fila["id"]] = evento_desde_fila(fila)
+
+    return sorted(eventos.values(), key=lambda evento: evento.fecha, reverse=True)[:limite]
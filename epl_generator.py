@@ -3,7 +3,228 @@ EPL Generator Module for JYE Barcode System
 Generates EPL (Eltron Programming Language) files for Zebra GC420t printer
 """
 
-from typing import List, Tuple
+import heapq
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+from quantity_policy import MAX_POR_ITEM, POLITICA_DEFAULT, PoliticaCantidades, verificar
+
+# Dimensiones de la etiqueta 5x2.5cm a 203 dpi
+ANCHO_ETIQUETA_DOTS = 406
+ALTO_ETIQUETA_DOTS = 203
+
+# Posición vertical y altura del código de barras y del texto legible
+POSICION_Y_BARRAS = 50
+ALTO_BARRAS = 60
+POSICION_Y_TEXTO = 150
+
+# Ancho máximo de impresión de la GC420t (4.09" a 203 dpi)
+ANCHO_MAX_IMPRESION_DOTS = 832
+
+# Layout multi-columna por defecto (rollos de 2 etiquetas por fila)
+SEPARACION_COLUMNAS_DOTS = 16
+MARGEN_IZQUIERDO_DOTS = 0
+
+# Etiquetas por fila que caben en el ancho de impresión con la etiqueta de 5 cm
+# (3 etiquetas miden 1250 dots, más que los 832 de la GC420t)
+COLUMNAS_ADMITIDAS = tuple(
+    columnas for columnas in (1, 2, 3)
+    if MARGEN_IZQUIERDO_DOTS + columnas * ANCHO_ETIQUETA_DOTS + (columnas - 1) * SEPARACION_COLUMNAS_DOTS
+    <= ANCHO_MAX_IMPRESION_DOTS
+)
+
+# Ancho mínimo de módulo (barra angosta) que escanea de forma confiable:
+# 2 dots = 0.25 mm a 203 dpi. 1 dot se pierde a velocidades altas.
+ANCHO_MODULO_MIN = 2
+ANCHO_MODULO_MAX = 6
+
+# Zona de silencio requerida por Code 128 a cada lado (en módulos)
+ZONA_SILENCIO_MODULOS = 10
+
+# Módulos de los caracteres de control de Code 128
+MODULOS_CARACTER = 11
+MODULOS_STOP = 13
+
+
+def usa_subset_c(codigo_barras: str) -> bool:
+    """
+    Indica si el código puede codificarse completo en Code 128 subset C
+
+    Subset C codifica dos dígitos por carácter, por lo que requiere un
+    número par de dígitos. Nuestros códigos de 8 dígitos siempre califican.
+
+    Args:
+        codigo_barras: Contenido del código de barras
+
+    Returns:
+        bool: True si es numérico con longitud par
+    """
+    return codigo_barras.isdigit() and len(codigo_barras) % 2 == 0
+
+
+def calcular_modulos_code128(codigo_barras: str) -> int:
+    """
+    Calcula el ancho del símbolo Code 128 en módulos (sin zonas de silencio)
+
+    Args:
+        codigo_barras: Contenido del código de barras
+
+    Returns:
+        int: Módulos de start + datos + checksum + stop
+
+    Example:
+        >>> calcular_modulos_code128("38598778")  # subset C: 4 caracteres
+        79
+    """
+    if usa_subset_c(codigo_barras):
+        caracteres_datos = len(codigo_barras) // 2
+    else:
+        caracteres_datos = len(codigo_barras)
+
+    # start + datos + checksum + stop
+    return MODULOS_CARACTER * (caracteres_datos + 2) + MODULOS_STOP
+
+
+def calcular_ancho_simbolo(codigo_barras: str, ancho_modulo: int) -> int:
+    """
+    Calcula el ancho total del símbolo en dots, incluyendo zonas de silencio
+
+    Args:
+        codigo_barras: Contenido del código de barras
+        ancho_modulo: Ancho de la barra angosta en dots
+
+    Returns:
+        int: Ancho en dots
+    """
+    modulos = calcular_modulos_code128(codigo_barras) + 2 * ZONA_SILENCIO_MODULOS
+    return modulos * ancho_modulo
+
+
+def seleccionar_ancho_modulo(
+    codigo_barras: str,
+    ancho_etiqueta: int = ANCHO_ETIQUETA_DOTS,
+    ancho_min: int = ANCHO_MODULO_MIN,
+    ancho_max: int = ANCHO_MODULO_MAX
+) -> int:
+    """
+    Selecciona el ancho de módulo más denso que escanea y cabe en la etiqueta
+
+    Args:
+        codigo_barras: Contenido del código de barras
+        ancho_etiqueta: Ancho disponible en dots (default: 406)
+        ancho_min: Ancho mínimo de módulo escaneable
+        ancho_max: Ancho máximo de módulo a considerar
+
+    Returns:
+        int: Ancho de módulo en dots
+
+    Raises:
+        ValueError: Si el símbolo no cabe en la etiqueta ni con el ancho mínimo
+    """
+    for ancho_modulo in range(ancho_min, ancho_max + 1):
+        if calcular_ancho_simbolo(codigo_barras, ancho_modulo) <= ancho_etiqueta:
+            return ancho_modulo
+
+    raise ValueError(
+        f"El código {codigo_barras} no cabe en una etiqueta de {ancho_etiqueta} dots "
+        f"con un módulo de {ancho_min} dots"
+    )
+
+
+def validar_ancho_simbolo(
+    codigo_barras: str,
+    ancho_modulo: int,
+    ancho_etiqueta: int = ANCHO_ETIQUETA_DOTS
+) -> Tuple[bool, str]:
+    """
+    Verifica que el símbolo con zonas de silencio quepa en la etiqueta
+
+    Args:
+        codigo_barras: Contenido del código de barras
+        ancho_modulo: Ancho de la barra angosta en dots
+        ancho_etiqueta: Ancho de la etiqueta en dots (default: 406)
+
+    Returns:
+        tuple: (es_valido, mensaje_error)
+    """
+    ancho_simbolo = calcular_ancho_simbolo(codigo_barras, ancho_modulo)
+
+    if ancho_simbolo > ancho_etiqueta:
+        return False, (
+            f"El código de barras mide {ancho_simbolo} dots y la etiqueta "
+            f"solo tiene {ancho_etiqueta} dots"
+        )
+
+    return True, ""
+
+
+def generar_comando_barras(
+    codigo_barras: str,
+    x_etiqueta: int = 0,
+    ancho_etiqueta: int = ANCHO_ETIQUETA_DOTS
+) -> str:
+    """
+    Genera los comandos EPL del código de barras y su texto legible
+
+    El código se emite en Code 128 subset C explícito ("1C") cuando es
+    numérico de longitud par, con el módulo más denso que escanea, y se
+    centra horizontalmente dentro de la etiqueta.
+
+    Args:
+        codigo_barras: Código de barras a imprimir
+        x_etiqueta: Posición horizontal de la etiqueta en dots
+        ancho_etiqueta: Ancho de la etiqueta en dots (default: 406)
+
+    Returns:
+        str: Líneas B (barcode) y A (texto) terminadas en salto de línea
+
+    Raises:
+        ValueError: Si el símbolo no cabe en la etiqueta
+    """
+    ancho_modulo = seleccionar_ancho_modulo(codigo_barras, ancho_etiqueta)
+
+    es_valido, mensaje_error = validar_ancho_simbolo(codigo_barras, ancho_modulo, ancho_etiqueta)
+    if not es_valido:
+        raise ValueError(mensaje_error)
+
+    tipo = "1C" if usa_subset_c(codigo_barras) else "1"
+
+    # Centrar las barras (sin zonas de silencio, que quedan a cada lado)
+    ancho_barras = calcular_modulos_code128(codigo_barras) * ancho_modulo
+    x = x_etiqueta + (ancho_etiqueta - ancho_barras) // 2
+
+    # IMPORTANTE: SIN comillas en los códigos de barras
+    return (
+        f"B{x},{POSICION_Y_BARRAS},0,{tipo},{ancho_modulo},{ancho_modulo * 2},"
+        f"{ALTO_BARRAS},N,{codigo_barras}\n"
+        f"A{x},{POSICION_Y_TEXTO},0,3,1,1,N,{codigo_barras}\n"
+    )
+
+
+def serializar_formato(comandos: str, ancho: int, repeticiones: int) -> str:
+    """
+    Arma un formato EPL completo alrededor de sus comandos de barras
+
+    Args:
+        comandos: Líneas B/A de generar_comando_barras
+        ancho: Ancho de impresión del formato en dots (q)
+        repeticiones: Veces que se imprime el formato (P)
+
+    Returns:
+        str: Formato terminado en su comando P<n>
+    """
+    return (
+        f"N\n"
+        f"q{ancho}\n"
+        f"Q{ALTO_ETIQUETA_DOTS},26\n"
+        f"{comandos}"
+        f"P{repeticiones}\n"
+    )
+
+
+def _formato_epl(codigo_barras: str, cantidad: int) -> str:
+    """Genera un formato EPL completo (una etiqueta por fila)"""
+    return serializar_formato(generar_comando_barras(codigo_barras), ANCHO_ETIQUETA_DOTS, cantidad)
 
 
 def generar_epl_individual(codigo_barras: str, cantidad: int = 1) -> str:
@@ -17,34 +238,38 @@ def generar_epl_individual(codigo_barras: str, cantidad: int = 1) -> str:
     Returns:
         str: Contenido del archivo EPL listo para enviar a la impresora
 
+    Raises:
+        ValueError: Si el código de barras no cabe en la etiqueta
+
     Example:
         >>> epl = generar_epl_individual("38598778", 5)
         >>> # Genera EPL para imprimir 5 copias del código 38598778
     """
     # Template EPL para Zebra GC420t (203 dpi)
     # Etiquetas: 5x2.5cm (406x203 dots a 203dpi)
-    # IMPORTANTE: SIN comillas en los códigos de barras
-    epl_content = f"""N
-q406
-Q203,26
-B100,50,0,1,2,4,60,N,{codigo_barras}
-A100,150,0,3,1,1,N,{codigo_barras}
-P{cantidad}
-"""
+    epl_content = _formato_epl(codigo_barras, cantidad)
     return epl_content
 
 
-def generar_epl_batch(codigos_y_cantidades: List[Tuple[str, int]]) -> str:
+def generar_epl_batch(
+    codigos_y_cantidades: List[Tuple[str, int]],
+    politica: PoliticaCantidades = POLITICA_DEFAULT
+) -> str:
     """
     Genera contenido EPL para múltiples códigos de barras en un solo archivo
 
     Args:
         codigos_y_cantidades: Lista de tuplas (codigo_barras, cantidad)
             Ejemplo: [("38598778", 5), ("05201234", 10), ("00800099", 30)]
+        politica: Límites de copias que el lote debe cumplir
 
     Returns:
         str: Contenido EPL concatenado con todos los códigos
 
+    Raises:
+        ValueError: Si el lote excede la política o algún código de barras
+            no cabe en la etiqueta
+
     Example:
         >>> codigos = [("38598778", 5), ("05201234", 10)]
         >>> epl = generar_epl_batch(codigos)
@@ -53,18 +278,13 @@ def generar_epl_batch(codigos_y_cantidades: List[Tuple[str, int]]) -> str:
     if not codigos_y_cantidades:
         return ""
 
+    verificar(codigos_y_cantidades, politica)
+
     # Generar EPL para cada código y concatenar
-    # IMPORTANTE: SIN comillas en los códigos de barras
     epl_blocks = []
 
     for codigo_barras, cantidad in codigos_y_cantidades:
-        epl_block = f"""N
-q406
-Q203,26
-B100,50,0,1,2,4,60,N,{codigo_barras}
-A100,150,0,3,1,1,N,{codigo_barras}
-P{cantidad}
-"""
+        epl_block = _formato_epl(codigo_barras, cantidad)
         epl_blocks.append(epl_block)
 
     # Unir todos los bloques
@@ -73,21 +293,197 @@ P{cantidad}
     return epl_content
 
 
-def validar_cantidad(cantidad: int, max_cantidad: int = 100) -> Tuple[bool, str]:
+def planificar_filas(
+    codigos_y_cantidades: List[Tuple[str, int]],
+    columnas: int
+) -> List[Tuple[Tuple[Optional[str], ...], int]]:
+    """
+    Agrupa códigos y cantidades en filas de N etiquetas con el menor número de formatos
+
+    En cada paso se elige, entre los códigos con más etiquetas pendientes, la
+    asignación de columnas que llena la fila completa (sin desperdiciar
+    etiquetas en blanco) e imprime más etiquetas con un solo formato. Un mismo
+    código puede ocupar varias columnas. Solo quedan columnas vacías cuando
+    las etiquetas pendientes no alcanzan para llenar una fila.
+
+    Args:
+        codigos_y_cantidades: Lista de tuplas (codigo_barras, cantidad)
+        columnas: Etiquetas por fila
+
+    Returns:
+        list: Tuplas (codigos_por_columna, repeticiones). Las columnas vacías
+            se representan con None.
+
+    Example:
+        >>> planificar_filas([("38598778", 5), ("05201234", 3)], 2)
+        [(('38598778', '05201234'), 3), (('38598778', '38598778'), 1)]
+    """
+    # Consolidar cantidades por código conservando el orden de entrada
+    pendientes: Dict[str, int] = {}
+    for codigo_barras, cantidad in codigos_y_cantidades:
+        if cantidad > 0:
+            pendientes[codigo_barras] = pendientes.get(codigo_barras, 0) + cantidad
+
+    filas = []
+
+    # Montículo por (más pendientes, orden de entrada): cada fila toma los
+    # candidatos en O(columnas log n) en lugar de reordenar todos los códigos
+    orden = {codigo: posicion for posicion, codigo in enumerate(pendientes)}
+    monticulo = [(-cantidad, orden[codigo], codigo) for codigo, cantidad in pendientes.items()]
+    heapq.heapify(monticulo)
+    total_pendiente = sum(pendientes.values())
+
+    while pendientes:
+        # Candidatos: los códigos con más etiquetas pendientes
+        candidatos = [heapq.heappop(monticulo)[2] for _ in range(min(columnas, len(monticulo)))]
+        columnas_a_llenar = min(columnas, total_pendiente)
+
+        mejor = None
+        mejor_puntaje = None
+
+        for asignacion in product(range(columnas + 1), repeat=len(candidatos)):
+            usadas = sum(asignacion)
+            if usadas == 0 or usadas > columnas:
+                continue
+
+            repeticiones = min(
+                pendientes[codigo] // n
+                for codigo, n in zip(candidatos, asignacion) if n > 0
+            )
+            if repeticiones == 0:
+                continue
+
+            # Prioridad: fila sin huecos, luego más etiquetas por formato
+            puntaje = (usadas >= columnas_a_llenar, repeticiones * usadas, usadas)
+            if mejor_puntaje is None or puntaje > mejor_puntaje:
+                mejor, mejor_puntaje = (asignacion, repeticiones), puntaje
+
+        asignacion, repeticiones = mejor
+
+        fila: List[Optional[str]] = []
+        for codigo, n in zip(candidatos, asignacion):
+            fila.extend([codigo] * n)
+            if n > 0:
+                pendientes[codigo] -= n * repeticiones
+                total_pendiente -= n * repeticiones
+                if pendientes[codigo] == 0:
+                    del pendientes[codigo]
+
+        # Devolver los candidatos que aún tienen etiquetas con su nueva cantidad
+        for codigo in candidatos:
+            if codigo in pendientes:
+                heapq.heappush(monticulo, (-pendientes[codigo], orden[codigo], codigo))
+
+        fila.extend([None] * (columnas - len(fila)))
+        filas.append((tuple(fila), repeticiones))
+
+    return filas
+
+
+def calcular_ancho_fila(
+    columnas: int,
+    ancho_etiqueta: int = ANCHO_ETIQUETA_DOTS,
+    separacion: int = SEPARACION_COLUMNAS_DOTS,
+    margen_izquierdo: int = MARGEN_IZQUIERDO_DOTS
+) -> int:
+    """
+    Calcula el ancho de una fila de N etiquetas y verifica que la impresora la admita
+
+    Args:
+        columnas: Etiquetas por fila
+        ancho_etiqueta: Ancho de cada etiqueta en dots
+        separacion: Espacio entre etiquetas de una fila en dots
+        margen_izquierdo: Desplazamiento de la primera columna en dots
+
+    Returns:
+        int: Ancho de la fila en dots
+
+    Raises:
+        ValueError: Si la fila no cabe en el ancho de impresión
+    """
+    ancho_fila = margen_izquierdo + columnas * ancho_etiqueta + (columnas - 1) * separacion
+    if ancho_fila > ANCHO_MAX_IMPRESION_DOTS:
+        raise ValueError(
+            f"Una fila de {columnas} etiquetas mide {ancho_fila} dots y la impresora "
+            f"solo imprime {ANCHO_MAX_IMPRESION_DOTS} dots de ancho"
+        )
+    return ancho_fila
+
+
+def generar_epl_multiple(
+    codigos_y_cantidades: List[Tuple[str, int]],
+    columnas: int = 2,
+    ancho_etiqueta: int = ANCHO_ETIQUETA_DOTS,
+    separacion: int = SEPARACION_COLUMNAS_DOTS,
+    margen_izquierdo: int = MARGEN_IZQUIERDO_DOTS,
+    politica: PoliticaCantidades = POLITICA_DEFAULT
+) -> str:
+    """
+    Genera contenido EPL para rollos de N etiquetas por fila (multi-up)
+
+    Cada pasada de impresión produce N etiquetas, por lo que un lote se
+    imprime en aproximadamente 1/N del tiempo. Las cantidades se reparten
+    con planificar_filas para emitir el menor número de formatos.
+
+    Args:
+        codigos_y_cantidades: Lista de tuplas (codigo_barras, cantidad)
+        columnas: Etiquetas por fila (default: 2)
+        ancho_etiqueta: Ancho de cada etiqueta en dots (default: 406)
+        separacion: Espacio entre etiquetas de una fila en dots
+        margen_izquierdo: Desplazamiento de la primera columna en dots
+        politica: Límites de copias que el lote debe cumplir (el rollo se
+            cuenta en filas completas)
+
+    Returns:
+        str: Contenido EPL con un formato por fila distinta
+
+    Raises:
+        ValueError: Si la fila no cabe en el ancho de impresión, el lote
+            excede la política o algún código no cabe en su etiqueta
+
+    Example:
+        >>> epl = generar_epl_multiple([("38598778", 5), ("05201234", 3)], columnas=2)
+        >>> # Genera 2 formatos: [38598778|05201234] x3 y [38598778|38598778] x1
+    """
+    if not codigos_y_cantidades:
+        return ""
+
+    if columnas < 1:
+        raise ValueError("El número de columnas debe ser al menos 1")
+
+    if columnas == 1:
+        return generar_epl_batch(codigos_y_cantidades, politica)
+
+    ancho_fila = calcular_ancho_fila(columnas, ancho_etiqueta, separacion, margen_izquierdo)
+    verificar(codigos_y_cantidades, politica, columnas)
+
+    epl_blocks = []
+
+    for fila, repeticiones in planificar_filas(codigos_y_cantidades, columnas):
+        comandos = ""
+        for columna, codigo_barras in enumerate(fila):
+            if codigo_barras is None:
+                continue
+            x_etiqueta = margen_izquierdo + columna * (ancho_etiqueta + separacion)
+            comandos += generar_comando_barras(codigo_barras, x_etiqueta, ancho_etiqueta)
+
+        epl_blocks.append(serializar_formato(comandos, ancho_fila, repeticiones))
+
+    return "\n".join(epl_blocks)
+
+
+def validar_cantidad(cantidad: int, max_cantidad: int = MAX_POR_ITEM) -> Tuple[bool, str]:
     """
     Valida que la cantidad de copias sea válida
 
+    Los límites configurables (por comodín, lote y rollo) se aplican con
+    quantity_policy.PoliticaCantidades.
+
     Args:
         cantidad: Número de copias solicitadas
-        max_cantidad: Cantidad máxima permitida (default: 100)
+        max_cantidad: Cantidad máxima permitida (default: quantity_policy.MAX_POR_ITEM)
 
     Returns:
         tuple: (es_valido, mensaje_error)
     """
-    if cantidad < 1:
-        return False, "La cantidad debe ser al menos 1"
-
-    if cantidad > max_cantidad:
-        return False, f"La cantidad no puede exceder {max_cantidad} copias"
-
-    return True, ""
+    return PoliticaCantidades(max_por_item=max_cantidad).validar_cantidad(cantidad)
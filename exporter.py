@@ -0,0 +1,214 @@
+"""
+Exporter Module for JYE Barcode System
+Streams the full codigos_barras table to CSV or Parquet in constant memory
+
+Uso desde la línea de comandos:
+    python exporter.py --formato csv --salida codigos.csv
+    python exporter.py --formato parquet --salida codigos.parquet
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, TextIO
+
+import database as db
+
+# Columnas exportadas (en orden)
+COLUMNAS_EXPORTACION = [
+    "id",
+    "codigo_barras",
+    "comodin_proveedor",
+    "tbc_sku",
+    "fecha_creacion",
+    "impreso",
+    "fecha_impresion",
+]
+
+# Registros por página: es también el tamaño máximo del buffer en memoria
+TAMANO_PAGINA = 1000
+
+FORMATOS = ("csv", "parquet")
+
+# Directorio de las exportaciones generadas desde la aplicación
+DIRECTORIO_EXPORTACIONES = os.path.join(tempfile.gettempdir(), "jye_exportaciones")
+
+# Horas que se conserva una exportación que ninguna sesión reemplazó
+RETENCION_HORAS = 24
+
+
+def iterar_codigos(
+    tamano_pagina: int = TAMANO_PAGINA,
+    columnas: List[str] = COLUMNAS_EXPORTACION
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Recorre toda la tabla por páginas usando keyset pagination
+
+    Solo hay una página en memoria a la vez, así que el consumo es el mismo
+    con 10 mil o 10 millones de registros.
+
+    Args:
+        tamano_pagina: Registros por página
+        columnas: Columnas a seleccionar (debe incluir codigo_barras)
+
+    Yields:
+        list: Página de registros ordenados por codigo_barras
+
+    Raises:
+        ErrorBaseDatos: Si alguna página falla tras los reintentos
+    """
+    select = ",".join(columnas)
+    ultimo = None
+
+    while True:
+        pagina = db.obtener_pagina_codigos(ultimo, tamano_pagina, select)
+
+        if not pagina:
+            return
+
+        yield pagina
+
+        # No se corta con páginas cortas: PostgREST puede limitar el tamaño
+        ultimo = pagina[-1]["codigo_barras"]
+
+
+def exportar_csv(destino: TextIO, tamano_pagina: int = TAMANO_PAGINA) -> int:
+    """
+    Exporta la tabla completa a CSV
+
+    Args:
+        destino: Archivo de texto abierto para escritura (newline="")
+        tamano_pagina: Registros por página
+
+    Returns:
+        int: Número de registros exportados
+    """
+    escritor = csv.DictWriter(destino, fieldnames=COLUMNAS_EXPORTACION, extrasaction="ignore")
+    escritor.writeheader()
+
+    total = 0
+    for pagina in iterar_codigos(tamano_pagina):
+        escritor.writerows(pagina)
+        total += len(pagina)
+
+    return total
+
+
+def exportar_parquet(ruta: str, tamano_pagina: int = TAMANO_PAGINA) -> int:
+    """
+    Exporta la tabla completa a Parquet (un row group por página)
+
+    Requiere pyarrow (dependencia opcional: pip install pyarrow).
+
+    Args:
+        ruta: Ruta del archivo .parquet a crear
+        tamano_pagina: Registros por página
+
+    Returns:
+        int: Número de registros exportados
+
+    Raises:
+        ImportError: Si pyarrow no está instalado
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("La exportación a Parquet requiere pyarrow: pip install pyarrow")
+
+    # Las fechas se conservan en ISO 8601, igual que las devuelve Supabase
+    esquema = pa.schema([
+        ("id", pa.string()),
+        ("codigo_barras", pa.string()),
+        ("comodin_proveedor", pa.string()),
+        ("tbc_sku", pa.string()),
+        ("fecha_creacion", pa.string()),
+        ("impreso", pa.bool_()),
+        ("fecha_impresion", pa.string()),
+    ])
+
+    total = 0
+    with pq.ParquetWriter(ruta, esquema) as escritor:
+        for pagina in iterar_codigos(tamano_pagina):
+            tabla = pa.Table.from_pylist(pagina, schema=esquema)
+            escritor.write_table(tabla)
+            total += len(pagina)
+
+    return total
+
+
+def exportar(ruta: str, formato: str, tamano_pagina: int = TAMANO_PAGINA) -> int:
+    """
+    Exporta la tabla completa al archivo indicado
+
+    Args:
+        ruta: Ruta del archivo de salida
+        formato: "csv" o "parquet"
+        tamano_pagina: Registros por página
+
+    Returns:
+        int: Número de registros exportados
+
+    Raises:
+        ValueError: Si el formato no es soportado
+    """
+    if formato == "csv":
+        with open(ruta, "w", newline="", encoding="utf-8") as destino:
+            return exportar_csv(destino, tamano_pagina)
+
+    if formato == "parquet":
+        return exportar_parquet(ruta, tamano_pagina)
+
+    raise ValueError(f"Formato no soportado: {formato}. Usa uno de: {', '.join(FORMATOS)}")
+
+
+def limpiar_exportaciones(
+    directorio: str = DIRECTORIO_EXPORTACIONES,
+    retencion_horas: float = RETENCION_HORAS
+) -> int:
+    """
+    Elimina las exportaciones más antiguas que la retención
+
+    Cubre las sesiones que se cerraron sin generar otra exportación.
+
+    Args:
+        directorio: Directorio de exportaciones
+        retencion_horas: Antigüedad máxima de un archivo
+
+    Returns:
+        int: Archivos eliminados
+    """
+    if not os.path.isdir(directorio):
+        return 0
+
+    limite = time.time() - retencion_horas * 3600
+    eliminados = 0
+
+    for nombre in os.listdir(directorio):
+        ruta = os.path.join(directorio, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+                eliminados += 1
+        except OSError:
+            continue
+
+    return eliminados
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Exporta la tabla codigos_barras")
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--salida", required=True, help="Ruta del archivo de salida")
+    parser.add_argument("--tamano-pagina", type=int, default=TAMANO_PAGINA)
+    args = parser.parse_args()
+
+    total = exportar(args.salida, args.formato, args.tamano_pagina)
+    print(f"Se exportaron {total} códigos a {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
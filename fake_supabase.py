@@ -0,0 +1,265 @@
+"""
+Fake Supabase Module for JYE Barcode System
+In-memory stand-in for the Supabase client (table/select/filters/insert/update/rpc)
+with configurable injected latency, used by the load-test harness
+"""
+
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+
+
+class RespuestaFalsa:
+    """Respuesta con la misma forma que la de postgrest (atributo data)"""
+
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class ConsultaFalsa:
+    """Constructor de consultas encadenable compatible con el subconjunto usado por database.py"""
+
+    def __init__(self, cliente: "ClienteFalso", tabla: str):
+        self._cliente = cliente
+        self._tabla = tabla
+        self._columnas: Optional[List[str]] = None
+        self._filtros: List[Callable[[Dict[str, Any]], bool]] = []
+        self._orden: List[tuple] = []
+        self._limite: Optional[int] = None
+        self._insertar: Optional[Any] = None
+        self._ignorar_duplicados = False
+        self._actualizar: Optional[Dict[str, Any]] = None
+
+    # Proyección y escritura
+    def select(self, columnas: str = "*") -> "ConsultaFalsa":
+        if columnas.strip() != "*":
+            self._columnas = [c.strip() for c in columnas.split(",")]
+        return self
+
+    def insert(self, datos: Any) -> "ConsultaFalsa":
+        self._insertar = datos
+        return self
+
+    def upsert(self, datos: Any, ignore_duplicates: bool = False) -> "ConsultaFalsa":
+        # Solo se usa para inserciones idempotentes por id
+        self._insertar = datos
+        self._ignorar_duplicados = ignore_duplicates
+        return self
+
+    def update(self, datos: Dict[str, Any]) -> "ConsultaFalsa":
+        self._actualizar = datos
+        return self
+
+    # Filtros
+    def eq(self, columna: str, valor: Any) -> "ConsultaFalsa":
+        self._filtros.append(lambda fila: fila.get(columna) == valor)
+        return self
+
+    def gt(self, columna: str, valor: Any) -> "ConsultaFalsa":
+        self._filtros.append(lambda fila: fila.get(columna) is not None and fila[columna] > valor)
+        return self
+
+    def gte(self, columna: str, valor: Any) -> "ConsultaFalsa":
+        self._filtros.append(lambda fila: fila.get(columna) is not None and fila[columna] >= valor)
+        return self
+
+    def lte(self, columna: str, valor: Any) -> "ConsultaFalsa":
+        self._filtros.append(lambda fila: fila.get(columna) is not None and fila[columna] <= valor)
+        return self
+
+    def in_(self, columna: str, valores: List[Any]) -> "ConsultaFalsa":
+        conjunto = set(valores)
+        self._filtros.append(lambda fila: fila.get(columna) in conjunto)
+        return self
+
+    # Orden y límite
+    def order(self, columna: str, desc: bool = False, nullsfirst: Optional[bool] = None) -> "ConsultaFalsa":
+        self._orden.append((columna, desc))
+        return self
+
+    def limit(self, limite: int) -> "ConsultaFalsa":
+        self._limite = limite
+        return self
+
+    def execute(self) -> RespuestaFalsa:
+        self._cliente.esperar_latencia()
+        return self._cliente.ejecutar(self)
+
+    def _filtrar(self, filas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        resultado = [fila for fila in filas if all(f(fila) for f in self._filtros)]
+
+        for columna, desc in reversed(self._orden):
+            # Los nulos van al final, como en la consulta de la marca de agua
+            con_valor = [f for f in resultado if f.get(columna) is not None]
+            sin_valor = [f for f in resultado if f.get(columna) is None]
+            con_valor.sort(key=lambda fila: fila[columna], reverse=desc)
+            resultado = con_valor + sin_valor
+
+        if self._limite is not None:
+            resultado = resultado[:self._limite]
+
+        return resultado
+
+    def _proyectar(self, filas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self._columnas is None:
+            return [dict(fila) for fila in filas]
+        return [{c: fila.get(c) for c in self._columnas} for fila in filas]
+
+
+class RpcFalsa:
+    """Llamada RPC falsa"""
+
+    def __init__(self, cliente: "ClienteFalso", nombre: str, parametros: Dict[str, Any]):
+        self._cliente = cliente
+        self._nombre = nombre
+        self._parametros = parametros
+
+    def execute(self) -> RespuestaFalsa:
+        self._cliente.esperar_latencia()
+        return RespuestaFalsa(self._cliente.ejecutar_rpc(self._nombre, self._parametros))
+
+
+class ClienteFalso:
+    """
+    Cliente de Supabase en memoria
+
+    Cada execute() espera latencia_ms ± jitter_ms para simular el viaje a
+    Supabase. Respeta la restricción única de codigo_barras.
+    """
+
+    def __init__(self, latencia_ms: float = 0.0, jitter_ms: float = 0.0, semilla: Optional[int] = None):
+        """
+        Args:
+            latencia_ms: Latencia media inyectada por petición
+            jitter_ms: Variación máxima de la latencia
+            semilla: Semilla para reproducir la latencia
+        """
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.peticiones = 0
+        self._aleatorio = random.Random(semilla)
+        self._tablas: Dict[str, List[Dict[str, Any]]] = {"codigos_barras": []}
+        self._lock = threading.Lock()
+
+    def table(self, nombre: str) -> ConsultaFalsa:
+        return ConsultaFalsa(self, nombre)
+
+    def rpc(self, nombre: str, parametros: Optional[Dict[str, Any]] = None) -> RpcFalsa:
+        return RpcFalsa(self, nombre, parametros or {})
+
+    def esperar_latencia(self) -> None:
+        """Duerme la latencia configurada"""
+        with self._lock:
+            self.peticiones += 1
+            variacion = self._aleatorio.uniform(-self.jitter_ms, self.jitter_ms)
+
+        espera = max(self.latencia_ms + variacion, 0.0) / 1000
+        if espera:
+            time.sleep(espera)
+
+    def sembrar(self, cantidad: int, comodines: int = 20, impresos: float = 0.5) -> List[Dict[str, Any]]:
+        """
+        Carga códigos de prueba
+
+        Args:
+            cantidad: Número de códigos a crear
+            comodines: Número de comodines distintos
+            impresos: Fracción de códigos marcados como impresos
+
+        Returns:
+            list: Registros creados
+        """
+        ahora = datetime.now(timezone.utc)
+        filas = []
+
+        with self._lock:
+            for i in range(cantidad):
+                comodin = str(100 + i % comodines)
+                sku = str(i // comodines)
+                impreso = self._aleatorio.random() < impresos
+                fecha = ahora - timedelta(minutes=cantidad - i)
+                filas.append({
+                    "id": str(uuid.uuid4()),
+                    "codigo_barras": comodin.zfill(3) + sku.zfill(5),
+                    "comodin_proveedor": comodin,
+                    "tbc_sku": sku,
+                    "fecha_creacion": fecha.isoformat(),
+                    "impreso": impreso,
+                    "fecha_impresion": fecha.isoformat() if impreso else None,
+                })
+
+            self._tablas["codigos_barras"].extend(filas)
+
+        return filas
+
+    def ejecutar(self, consulta: ConsultaFalsa) -> RespuestaFalsa:
+        """Aplica una consulta sobre las tablas en memoria"""
+        with self._lock:
+            tabla = self._tablas.setdefault(consulta._tabla, [])
+
+            if consulta._insertar is not None:
+                nuevas = consulta._insertar if isinstance(consulta._insertar, list) else [consulta._insertar]
+                insertadas = []
+                ids = {f["id"] for f in tabla} if consulta._ignorar_duplicados else set()
+
+                for datos in nuevas:
+                    fila = dict(datos)
+                    if fila.get("id") in ids:
+                        continue
+                    if consulta._tabla == "codigos_barras":
+                        if any(f["codigo_barras"] == fila["codigo_barras"] for f in tabla):
+                            raise APIError({
+                                "code": "23505",
+                                "message": "duplicate key value violates unique constraint",
+                            })
+                        fila.setdefault("fecha_impresion", None)
+                        fila.setdefault("fecha_creacion", datetime.now(timezone.utc).isoformat())
+                    fila.setdefault("id", str(uuid.uuid4()))
+                    tabla.append(fila)
+                    insertadas.append(dict(fila))
+
+                return RespuestaFalsa(insertadas)
+
+            filas = consulta._filtrar(tabla)
+
+            if consulta._actualizar is not None:
+                for fila in filas:
+                    fila.update(consulta._actualizar)
+
+            return RespuestaFalsa(consulta._proyectar(filas))
+
+    def ejecutar_rpc(self, nombre: str, parametros: Dict[str, Any]) -> Any:
+        """Implementa las funciones SQL usadas por la aplicación"""
+        if nombre != "estadisticas_codigos":
+            raise APIError({"code": "PGRST202", "message": f"Función {nombre} no existe"})
+
+        with self._lock:
+            filas = list(self._tablas["codigos_barras"])
+
+        por_comodin: Dict[str, Dict[str, Any]] = {}
+        por_dia: Dict[str, int] = {}
+        desde = (datetime.now(timezone.utc) - timedelta(days=parametros.get("dias", 30))).isoformat()
+
+        for fila in filas:
+            item = por_comodin.setdefault(fila["comodin_proveedor"], {
+                "comodin_proveedor": fila["comodin_proveedor"],
+                "total": 0,
+                "impresos": 0,
+                "no_impresos": 0,
+            })
+            item["total"] += 1
+            item["impresos" if fila["impreso"] else "no_impresos"] += 1
+
+            if fila["fecha_creacion"] >= desde:
+                dia = fila["fecha_creacion"][:10]
+                por_dia[dia] = por_dia.get(dia, 0) + 1
+
+        return {
+            "por_comodin": [por_comodin[c] for c in sorted(por_comodin)],
+            "por_dia": [{"dia": d, "creados": por_dia[d]} for d in sorted(por_dia)],
+        }
@@ -0,0 +1,648 @@
+"""
+Label Pipeline Module for JYE Barcode System
+Staged generation of very large lots (validate, optimize, encode, serialize)
+sharded across a process pool in bounded chunks and streamed in order to
+file, printer or lot archive sinks
+
+Uso:
+    python label_pipeline.py --entrada conteo.csv --salida conteo.epl --columnas 2
+    python label_pipeline.py --entrada conteo.csv --salida conteo.epl --etiquetas-por-rollo 2000
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import closing
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import epl_generator as epl
+import quantity_policy as qp
+from barcode_generator import MAX_COMODIN_LENGTH, MAX_SKU_LENGTH
+
+# Ítems (codigo_barras, cantidad) por bloque de trabajo
+TAMANO_BLOQUE = 2000
+
+# Procesos del pool (default: todos los núcleos)
+MAX_PROCESOS = os.cpu_count() or 1
+
+# Bloques encolados por proceso: acota la memoria sin dejar núcleos ociosos
+BLOQUES_POR_PROCESO = 2
+
+# "spawn" evita heredar con fork los hilos y locks de la aplicación Streamlit
+CONTEXTO_PROCESOS = "spawn"
+
+LONGITUD_CODIGO = MAX_COMODIN_LENGTH + MAX_SKU_LENGTH
+
+
+class ErrorItem(NamedTuple):
+    """Ítem descartado en la validación"""
+    posicion: int
+    codigo_barras: str
+    cantidad: int
+    mensaje: str
+
+
+class ResultadoBloque(NamedTuple):
+    """Salida de un bloque, en el orden de entrada"""
+    indice: int
+    contenido: str
+    etiquetas: int
+    formatos: int
+    errores: List[ErrorItem]
+
+
+class ResumenPipeline(NamedTuple):
+    """Totales de una ejecución del pipeline"""
+    etiquetas: int
+    formatos: int
+    bloques: int
+    errores: List[ErrorItem]
+    segundos: float
+
+
+# ============================================================================
+# ETAPAS (se ejecutan dentro de cada proceso del pool)
+# ============================================================================
+
+def validar_items(
+    items: List[Tuple[str, int]],
+    inicio: int = 0
+) -> Tuple[List[Tuple[str, int]], List[ErrorItem]]:
+    """
+    Etapa 1: descarta los ítems que no pueden imprimirse
+
+    Args:
+        items: Tuplas (codigo_barras, cantidad)
+        inicio: Posición del primer ítem dentro del lote (para los errores)
+
+    Returns:
+        tuple: (ítems válidos, errores)
+    """
+    validos = []
+    errores = []
+
+    for posicion, (codigo_barras, cantidad) in enumerate(items, start=inicio):
+        codigo_barras = str(codigo_barras).strip()
+
+        if len(codigo_barras) != LONGITUD_CODIGO or not codigo_barras.isdigit():
+            errores.append(ErrorItem(
+                posicion, codigo_barras, cantidad,
+                f"El código debe tener {LONGITUD_CODIGO} dígitos"
+            ))
+        elif not isinstance(cantidad, int) or cantidad < 1:
+            errores.append(ErrorItem(posicion, codigo_barras, cantidad, "La cantidad debe ser al menos 1"))
+        else:
+            validos.append((codigo_barras, cantidad))
+
+    return validos, errores
+
+
+def optimizar_filas(
+    items: List[Tuple[str, int]],
+    columnas: int
+) -> List[Tuple[Tuple[Optional[str], ...], int]]:
+    """
+    Etapa 2: agrupa los ítems en filas del rollo con el menor número de formatos
+
+    Args:
+        items: Ítems válidos del bloque
+        columnas: Etiquetas por fila
+
+    Returns:
+        list: Tuplas (codigos_por_columna, repeticiones) como epl.planificar_filas
+    """
+    if columnas == 1:
+        # Una etiqueta por fila: un formato por ítem, en el orden de entrada
+        return [((codigo_barras,), cantidad) for codigo_barras, cantidad in items]
+
+    return epl.planificar_filas(items, columnas)
+
+
+def codificar_filas(
+    filas: List[Tuple[Tuple[Optional[str], ...], int]],
+    columnas: int
+) -> List[Tuple[str, int]]:
+    """
+    Etapa 3: genera los comandos de barras de cada fila
+
+    El comando de un código solo depende de su columna, así que se calcula
+    una vez por (código, columna) dentro del bloque.
+
+    Args:
+        filas: Salida de optimizar_filas
+        columnas: Etiquetas por fila
+
+    Returns:
+        list: Tuplas (comandos B/A de la fila, repeticiones)
+    """
+    comandos_por_celda: Dict[Tuple[str, int], str] = {}
+    codificadas = []
+
+    for fila, repeticiones in filas:
+        comandos = ""
+        for columna, codigo_barras in enumerate(fila):
+            if codigo_barras is None:
+                continue
+
+            celda = (codigo_barras, columna)
+            if celda not in comandos_por_celda:
+                if columnas == 1:
+                    comandos_por_celda[celda] = epl.generar_comando_barras(codigo_barras)
+                else:
+                    x_etiqueta = epl.MARGEN_IZQUIERDO_DOTS + columna * (epl.ANCHO_ETIQUETA_DOTS + epl.SEPARACION_COLUMNAS_DOTS)
+                    comandos_por_celda[celda] = epl.generar_comando_barras(codigo_barras, x_etiqueta)
+            comandos += comandos_por_celda[celda]
+
+        codificadas.append((comandos, repeticiones))
+
+    return codificadas
+
+
+def serializar_filas(codificadas: List[Tuple[str, int]], ancho: int) -> str:
+    """
+    Etapa 4: arma el texto EPL del bloque
+
+    Args:
+        codificadas: Salida de codificar_filas
+        ancho: Ancho de impresión de cada formato en dots
+
+    Returns:
+        str: Formatos separados por una línea en blanco, como epl_generator
+    """
+    return "\n".join(epl.serializar_formato(comandos, ancho, repeticiones) for comandos, repeticiones in codificadas)
+
+
+def procesar_bloque(
+    indice: int,
+    items: List[Tuple[str, int]],
+    inicio: int,
+    columnas: int
+) -> ResultadoBloque:
+    """
+    Ejecuta las cuatro etapas sobre un bloque
+
+    Args:
+        indice: Número de bloque
+        items: Tuplas (codigo_barras, cantidad) del bloque
+        inicio: Posición del primer ítem dentro del lote
+        columnas: Etiquetas por fila
+
+    Returns:
+        ResultadoBloque: EPL y totales del bloque
+    """
+    ancho = epl.ANCHO_ETIQUETA_DOTS if columnas == 1 else epl.calcular_ancho_fila(columnas)
+
+    validos, errores = validar_items(items, inicio)
+    filas = optimizar_filas(validos, columnas)
+    codificadas = codificar_filas(filas, columnas)
+    contenido = serializar_filas(codificadas, ancho)
+
+    return ResultadoBloque(
+        indice=indice,
+        contenido=contenido,
+        etiquetas=sum(cantidad for _, cantidad in validos),
+        formatos=len(codificadas),
+        errores=errores,
+    )
+
+
+# ============================================================================
+# EJECUCIÓN EN PARALELO
+# ============================================================================
+
+def _partir(items: Iterable[Tuple[str, int]], tamano_bloque: int) -> Iterator[List[Tuple[str, int]]]:
+    """Parte una secuencia (o un iterador) en listas de tamano_bloque"""
+    iterador = iter(items)
+    while True:
+        bloque = list(islice(iterador, tamano_bloque))
+        if not bloque:
+            return
+        yield bloque
+
+
+def _partir_filas_completas(
+    items: Iterable[Tuple[str, int]],
+    tamano_bloque: int,
+    columnas: int
+) -> Iterator[Tuple[int, List[Tuple[str, int]]]]:
+    """
+    Parte el lote en bloques que llenan filas completas del rollo
+
+    Cada bloque se optimiza por separado: si sus etiquetas no fueran
+    múltiplo de `columnas`, su última fila dejaría posiciones en blanco a
+    mitad del rollo. Las etiquetas sobrantes pasan al bloque siguiente
+    (partiendo el último ítem si hace falta), así que solo el último bloque
+    puede terminar en una fila incompleta.
+
+    Args:
+        items: Tuplas (codigo_barras, cantidad); puede ser un iterador
+        tamano_bloque: Ítems por bloque
+        columnas: Etiquetas por fila
+
+    Yields:
+        tuple: (posición del primer ítem dentro del lote, ítems del bloque)
+    """
+    arrastre: List[Tuple[str, int]] = []
+    inicio = 0
+    bloques = _partir(items, tamano_bloque)
+    siguiente = next(bloques, None)
+
+    while siguiente is not None:
+        bloque = arrastre + siguiente
+        arrastre = []
+        partido = False
+
+        # El último bloque no tiene a quién pasar etiquetas
+        siguiente = next(bloques, None)
+
+        if columnas > 1 and siguiente is not None:
+            validos, _ = validar_items(bloque)
+            resto = sum(cantidad for _, cantidad in validos) % columnas
+
+            while resto and bloque:
+                codigo_barras, cantidad = bloque[-1]
+                es_valido = bool(validar_items([bloque[-1]])[0])
+
+                if es_valido and cantidad > resto:
+                    # Ambas fracciones conservan la posición del ítem
+                    bloque[-1] = (codigo_barras, cantidad - resto)
+                    arrastre.insert(0, (codigo_barras, resto))
+                    partido = True
+                    break
+
+                arrastre.insert(0, bloque.pop())
+                if es_valido:
+                    resto -= cantidad
+
+        if bloque:
+            yield inicio, bloque
+            inicio += len(bloque) - 1 if partido else len(bloque)
+
+
+def validar_columnas(columnas: int) -> None:
+    """
+    Verifica que las etiquetas por fila quepan en el ancho de impresión
+
+    Args:
+        columnas: Etiquetas por fila
+
+    Raises:
+        ValueError: Si columnas es menor a 1 o la fila no cabe
+    """
+    if columnas < 1:
+        raise ValueError("El número de columnas debe ser al menos 1")
+    if columnas > 1:
+        epl.calcular_ancho_fila(columnas)
+
+
+def generar_bloques(
+    items: Iterable[Tuple[str, int]],
+    columnas: int = 1,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    procesos: int = MAX_PROCESOS
+) -> Iterator[ResultadoBloque]:
+    """
+    Genera el EPL de un lote por bloques, en paralelo y en el orden de entrada
+
+    Los bloques se reparten en un pool de procesos con a lo sumo
+    procesos * BLOQUES_POR_PROCESO bloques en vuelo, y cada uno se entrega
+    en cuanto él y todos los anteriores terminaron. Un lote de un solo
+    bloque (o procesos=1) se procesa en el hilo actual sin crear el pool.
+
+    Con columnas=1 la concatenación de los bloques es idéntica a
+    epl.generar_epl_batch. Con varias columnas cada bloque se optimiza por
+    separado, pero los bordes se ajustan para que cada bloque llene filas
+    completas (ver _partir_filas_completas): las etiquetas por código y las
+    posiciones del rollo son las mismas que con epl.generar_epl_multiple.
+
+    Args:
+        items: Tuplas (codigo_barras, cantidad); puede ser un iterador
+        columnas: Etiquetas por fila
+        tamano_bloque: Ítems por bloque
+        procesos: Procesos del pool
+
+    Yields:
+        ResultadoBloque: Bloques en orden
+
+    Raises:
+        ValueError: Si la fila no cabe en el ancho de impresión
+    """
+    validar_columnas(columnas)
+
+    bloques = _partir_filas_completas(items, tamano_bloque, columnas)
+    primeros = list(islice(bloques, 2))
+    if not primeros:
+        return
+    todos = chain(primeros, bloques)
+
+    if len(primeros) == 1 or procesos <= 1:
+        for indice, (inicio, bloque) in enumerate(todos):
+            yield procesar_bloque(indice, bloque, inicio, columnas)
+        return
+
+    contexto = multiprocessing.get_context(CONTEXTO_PROCESOS)
+    en_vuelo: Deque[Future] = deque()
+    max_en_vuelo = procesos * BLOQUES_POR_PROCESO
+
+    pool = ProcessPoolExecutor(max_workers=procesos, mp_context=contexto)
+    try:
+        for indice, (inicio, bloque) in enumerate(todos):
+            en_vuelo.append(pool.submit(procesar_bloque, indice, bloque, inicio, columnas))
+
+            # Entregar en orden el bloque más antiguo al llenarse la ventana
+            if len(en_vuelo) >= max_en_vuelo:
+                yield en_vuelo.popleft().result()
+
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+    finally:
+        # Al cancelar o fallar, descartar los bloques que aún no empezaron
+        for futuro in en_vuelo:
+            futuro.cancel()
+        pool.shutdown(wait=True)
+
+
+class Destino(ABC):
+    """Receptor del EPL generado, bloque a bloque y en orden"""
+
+    @abstractmethod
+    def escribir(self, parte: str) -> None:
+        """Recibe la siguiente parte del EPL"""
+
+    def cerrar(self, resumen: ResumenPipeline) -> None:
+        """Se llama una vez escritas todas las partes"""
+
+    def descartar(self) -> None:
+        """Se llama si la generación falla o se cancela"""
+
+
+class DestinoArchivo(Destino):
+    """
+    Escribe el EPL en un archivo
+
+    Las partes se escriben en <ruta>.tmp y el archivo final aparece completo
+    al cerrar, nunca a medias.
+    """
+
+    def __init__(self, ruta: str):
+        """
+        Args:
+            ruta: Ruta del archivo .epl
+        """
+        self.ruta = ruta
+        self._temporal = ruta + ".tmp"
+        self._archivo = open(self._temporal, "w", encoding="ascii")
+
+    def escribir(self, parte: str) -> None:
+        self._archivo.write(parte)
+
+    def cerrar(self, resumen: ResumenPipeline) -> None:
+        self._archivo.close()
+        os.replace(self._temporal, self.ruta)
+
+    def descartar(self) -> None:
+        self._archivo.close()
+        if os.path.exists(self._temporal):
+            os.remove(self._temporal)
+
+
+class DestinoImpresora(Destino):
+    """
+    Envía cada parte a la impresora en cuanto está lista
+
+    La impresora empieza a imprimir el primer bloque mientras los
+    siguientes se generan.
+    """
+
+    def __init__(self, transporte, cancelar: Optional[threading.Event] = None):
+        """
+        Args:
+            transporte: printer_transport.TransporteImpresora conectado
+            cancelar: Evento opcional para detener el envío
+        """
+        self.transporte = transporte
+        self.cancelar = cancelar
+        self.enviados = 0
+
+    def escribir(self, parte: str) -> None:
+        self.enviados += self.transporte.enviar_trabajo(parte, cancelar=self.cancelar)
+
+
+class DestinoArchivoLotes(Destino):
+    """
+    Guarda el lote en el archivo de lotes al terminar
+
+    El archivo almacena cada lote como un registro comprimido único, así que
+    las partes se acumulan y se archivan juntas al cerrar.
+    """
+
+    def __init__(self, archivo, nombre: str, columnas: int = 1, lote_id: Optional[str] = None):
+        """
+        Args:
+            archivo: lot_archive.ArchivoLotes
+            nombre: Nombre del archivo del lote
+            columnas: Etiquetas por fila del rollo
+            lote_id: Id del lote (default: uno nuevo)
+        """
+        self.archivo = archivo
+        self.nombre = nombre
+        self.columnas = columnas
+        self.lote_id = lote_id
+        self.entrada = None
+        self._partes: List[str] = []
+
+    def escribir(self, parte: str) -> None:
+        self._partes.append(parte)
+
+    def cerrar(self, resumen: ResumenPipeline) -> None:
+        self.entrada = self.archivo.archivar(
+            "".join(self._partes), self.nombre, resumen.etiquetas, self.columnas, self.lote_id
+        )
+        self._partes = []
+
+    def descartar(self) -> None:
+        self._partes = []
+
+
+def generar_en_destinos(
+    items: Iterable[Tuple[str, int]],
+    destinos: List[Destino],
+    columnas: int = 1,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    procesos: int = MAX_PROCESOS,
+    cancelar: Optional[threading.Event] = None,
+    on_progreso: Optional[Callable[[int, int], None]] = None,
+    politica: qp.PoliticaCantidades = qp.POLITICA_DEFAULT
+) -> ResumenPipeline:
+    """
+    Genera un lote y lo entrega bloque a bloque a uno o varios destinos
+
+    Un lote en memoria (lista) se verifica completo contra la política
+    antes de entregar la primera parte. Un iterador se verifica a medida
+    que se lee (quantity_policy.controlar): si excede un límite, los
+    destinos se descartan, pero un destino como la impresora ya pudo
+    recibir las partes anteriores.
+
+    Args:
+        items: Tuplas (codigo_barras, cantidad); puede ser un iterador
+        destinos: Destinos que reciben cada parte en orden
+        columnas: Etiquetas por fila
+        tamano_bloque: Ítems por bloque
+        procesos: Procesos del pool
+        cancelar: Evento opcional para detener la generación entre bloques
+        on_progreso: Callback (bloques_escritos, etiquetas_escritas)
+        politica: Límites de copias que el lote debe cumplir
+
+    Returns:
+        ResumenPipeline: Totales de la ejecución; los ítems inválidos
+            (incluidas las cantidades menores a 1) se omiten del EPL y se
+            listan en errores
+
+    Raises:
+        InterruptedError: Si se cancela (los destinos se descartan)
+        ValueError: Si la fila no cabe en el ancho de impresión o el lote
+            excede la política (los destinos se descartan)
+    """
+    inicio = time.perf_counter()
+    etiquetas = 0
+    formatos = 0
+    bloques = 0
+    errores: List[ErrorItem] = []
+
+    try:
+        if isinstance(items, Sequence):
+            # Las cantidades inválidas no rechazan el lote: se reportan en errores
+            infracciones = [
+                infraccion for infraccion in qp.evaluar(items, politica, columnas).infracciones
+                if infraccion.limite != qp.CANTIDAD_MINIMA
+            ]
+            if infracciones:
+                raise ValueError(qp.describir_infracciones(infracciones))
+        else:
+            items = qp.controlar(items, politica, columnas)
+
+        with closing(generar_bloques(items, columnas, tamano_bloque, procesos)) as resultados:
+            for resultado in resultados:
+                if cancelar is not None and cancelar.is_set():
+                    raise InterruptedError("Generación cancelada")
+
+                if resultado.contenido:
+                    # Los bloques se separan igual que los formatos dentro de un bloque
+                    parte = resultado.contenido if formatos == 0 else "\n" + resultado.contenido
+                    for destino in destinos:
+                        destino.escribir(parte)
+
+                etiquetas += resultado.etiquetas
+                formatos += resultado.formatos
+                bloques += 1
+                errores.extend(resultado.errores)
+
+                if on_progreso:
+                    on_progreso(bloques, etiquetas)
+
+    except BaseException:
+        for destino in destinos:
+            destino.descartar()
+        raise
+
+    resumen = ResumenPipeline(etiquetas, formatos, bloques, errores, time.perf_counter() - inicio)
+
+    for destino in destinos:
+        destino.cerrar(resumen)
+
+    return resumen
+
+
+def leer_csv(ruta: str) -> Iterator[Tuple[str, int]]:
+    """
+    Lee ítems (codigo_barras, cantidad) de un CSV sin cargarlo completo
+
+    Args:
+        ruta: CSV con columnas codigo_barras y cantidad (con encabezado)
+
+    Yields:
+        tuple: (codigo_barras, cantidad); una cantidad no numérica se entrega
+            como 0 para que la validación la reporte
+    """
+    with open(ruta, "r", encoding="utf-8", newline="") as archivo:
+        for fila in csv.DictReader(archivo):
+            cantidad = fila.get("cantidad", "").strip()
+            yield fila.get("codigo_barras", "").strip(), int(cantidad) if cantidad.isdigit() else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Genera el EPL de un lote grande en paralelo")
+    parser.add_argument("--entrada", required=True, help="CSV con columnas codigo_barras,cantidad")
+    parser.add_argument("--salida", required=True, help="Archivo .epl de salida")
+    parser.add_argument(
+        "--columnas", type=int, default=1, choices=epl.COLUMNAS_ADMITIDAS, help="Etiquetas por fila del rollo"
+    )
+    parser.add_argument("--procesos", type=int, default=MAX_PROCESOS, help="Procesos del pool")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE, help="Ítems por bloque")
+    parser.add_argument("--max-por-item", type=int, help="Copias máximas de un código por lote")
+    parser.add_argument("--max-por-comodin", type=int, help="Etiquetas máximas de un comodín por lote")
+    parser.add_argument("--max-por-lote", type=int, help="Etiquetas máximas por lote")
+    parser.add_argument("--etiquetas-por-rollo", type=int, help="Etiquetas del rollo cargado")
+    args = parser.parse_args()
+
+    # Sin límites se genera un solo archivo en streaming; con límites la
+    # política necesita ver el lote completo para proponer la división
+    politica = qp.PoliticaCantidades(
+        max_por_item=args.max_por_item,
+        max_por_comodin=args.max_por_comodin,
+        max_por_lote=args.max_por_lote,
+        etiquetas_por_rollo=args.etiquetas_por_rollo,
+    )
+
+    # Cada salida lleva la fila del CSV de cada ítem (None: la misma posición)
+    if politica.max_por_impresion is None:
+        salidas = [(args.salida, leer_csv(args.entrada), None)]
+    else:
+        items = list(leer_csv(args.entrada))
+        evaluacion = qp.evaluar(items, politica, args.columnas)
+
+        for infraccion in evaluacion.infracciones[:20]:
+            fila = f"Fila {infraccion.posicion + 1}: " if infraccion.posicion is not None else ""
+            print(f"Límite: {fila}{infraccion.descripcion()}")
+
+        base, extension = os.path.splitext(args.salida)
+        salidas = [
+            (
+                args.salida if len(evaluacion.partes) == 1 else f"{base}_parte{numero}de{len(evaluacion.partes)}{extension}",
+                [(items[indice][0], cantidad) for indice, cantidad in parte],
+                [indice for indice, _ in parte]
+            )
+            for numero, parte in enumerate(evaluacion.partes, start=1)
+        ]
+
+    for ruta, items_salida, filas_origen in salidas:
+        resumen = generar_en_destinos(
+            items_salida,
+            [DestinoArchivo(ruta)],
+            columnas=args.columnas,
+            tamano_bloque=args.tamano_bloque,
+            procesos=args.procesos,
+            politica=politica,
+        )
+
+        print(f"{ruta}")
+        print(f"  Etiquetas: {resumen.etiquetas}")
+        print(f"  Formatos: {resumen.formatos} en {resumen.bloques} bloques")
+        print(f"  Tiempo: {resumen.segundos:.2f} s ({resumen.etiquetas / max(resumen.segundos, 1e-9):.0f} etiquetas/s)")
+
+        for error in resumen.errores[:20]:
+            fila = error.posicion if filas_origen is None else filas_origen[error.posicion]
+            print(f"  Fila {fila + 1}: {error.codigo_barras} - {error.mensaje}")
+        if len(resumen.errores) > 20:
+            print(f"  ... y {len(resumen.errores) - 20} errores más")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Load Test Module for JYE Barcode System
+Drives N concurrent simulated Streamlit sessions through realistic flows
+against the in-memory fake backend and reports rerun latency and throughput.
+Each session runs in its own process: AppTest does not support several
+sessions in one process.
+
+Uso:
+    python load_test.py --sesiones 20 --iteraciones 5 --latencia-ms 80 --jitter-ms 30
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from streamlit.testing.v1 import AppTest
+
+import database as db
+from fake_supabase import ClienteFalso
+
+RUTA_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Timeout de cada rerun simulado (segundos)
+TIMEOUT_RERUN = 120
+
+# Segundos que una sesión espera a que las demás estén listas para empezar juntas
+TIMEOUT_INICIO = 300
+
+# "spawn": cada sesión arranca un intérprete limpio (sin el estado de Streamlit del padre)
+CONTEXTO_PROCESOS = "spawn"
+
+
+class Metricas:
+    """Acumula las latencias de rerun de todas las sesiones"""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = {}
+        self.errores: List[str] = []
+        self._lock = threading.Lock()
+
+    def registrar(self, paso: str, segundos: float) -> None:
+        with self._lock:
+            self.latencias.setdefault(paso, []).append(segundos)
+
+    def registrar_error(self, mensaje: str) -> None:
+        with self._lock:
+            self.errores.append(mensaje)
+
+    def todas(self) -> List[float]:
+        with self._lock:
+            return [valor for valores in self.latencias.values() for valor in valores]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """
+    Percentil por rango más cercano
+
+    Args:
+        valores: Muestras
+        p: Percentil entre 0 y 100
+
+    Returns:
+        float: Valor del percentil (0 si no hay muestras)
+    """
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(int(round(p / 100 * len(ordenados) + 0.5)) - 1, 0)
+    return ordenados[min(indice, len(ordenados) - 1)]
+
+
+def _widget(elementos, etiqueta: str):
+    """Busca un widget por etiqueta exacta o por prefijo"""
+    for elemento in elementos:
+        if elemento.label == etiqueta:
+            return elemento
+    for elemento in elementos:
+        if elemento.label and elemento.label.startswith(etiqueta):
+            return elemento
+    raise LookupError(f"No se encontró el widget '{etiqueta}'")
+
+
+class SesionSimulada:
+    """Sesión de Streamlit simulada con AppTest"""
+
+    def __init__(self, numero: int, metricas: Metricas, semilla: int):
+        self.numero = numero
+        self.metricas = metricas
+        self.aleatorio = random.Random(semilla)
+        self.app = AppTest.from_file(RUTA_APP, default_timeout=TIMEOUT_RERUN)
+        self.app.secrets["supabase"] = {"url": "http://supabase.falso", "key": "falsa"}
+
+    def _rerun(self, paso: str, accion: Optional[Callable[[], Any]] = None) -> None:
+        """Aplica una interacción, ejecuta el rerun y mide su duración"""
+        inicio = time.perf_counter()
+        if accion is None:
+            self.app.run()
+        else:
+            accion().run()
+        self.metricas.registrar(paso, time.perf_counter() - inicio)
+
+        if self.app.exception:
+            raise RuntimeError(str(self.app.exception[0].value))
+
+    def flujo_crear(self) -> None:
+        """TAB 1: crea un código nuevo"""
+        comodin = str(self.aleatorio.randint(900, 999))
+        sku = str(self.aleatorio.randint(0, 99999))
+
+        _widget(self.app.text_input, "Comodín Proveedor").input(comodin)
+        _widget(self.app.text_input, "TBC SKU").input(sku)
+        self._rerun("crear", lambda: _widget(self.app.button, "🔢 Generar Código de Barras").click())
+
+    def flujo_lote(self) -> None:
+        """TAB 2: filtra, selecciona y genera un lote"""
+        _widget(self.app.radio, "Estado de Impresión").set_value("No Impresos")
+        self._rerun("filtrar", lambda: _widget(self.app.button, "🔎 Aplicar Filtros").click())
+
+        # Cada rerun reconstruye el árbol de widgets: la casilla se busca de nuevo por key antes de marcarla
+        claves = [c.key for c in self.app.checkbox if c.key and c.key.startswith("checkbox_")]
+        for clave in claves[:self.aleatorio.randint(1, 5)]:
+            self._rerun("seleccionar", lambda clave=clave: self.app.checkbox(key=clave).check())
+
+        if not any(c.key and c.key.startswith("checkbox_") and c.value for c in self.app.checkbox):
+            return
+
+        self._rerun("confirmar", lambda: _widget(self.app.checkbox, "Confirmo").check())
+        self._rerun("generar_lote", lambda: _widget(self.app.button, "📥 Descargar lote completo").click())
+
+    def flujo_busqueda(self, codigos: List[str]) -> None:
+        """TAB 3: búsqueda por prefijo, búsqueda exacta y reimpresión"""
+        codigo = self.aleatorio.choice(codigos)
+        campo = _widget(self.app.text_input, "Ingresa el Código de Barras")
+
+        self._rerun("sugerencias", lambda: campo.input(codigo[:4]))
+        campo = _widget(self.app.text_input, "Ingresa el Código de Barras")
+        campo.input(codigo)
+        self._rerun("buscar", lambda: _widget(self.app.button, "🔎 Buscar").click())
+
+        try:
+            boton = _widget(self.app.button, "🖨️ Reimprimir Código")
+        except LookupError:
+            return
+        self._rerun("reimprimir", lambda: boton.click())
+
+    def ejecutar(self, iteraciones: int, codigos: List[str]) -> None:
+        """Ejecuta los flujos en bucle"""
+        try:
+            self._rerun("carga_inicial")
+            for _ in range(iteraciones):
+                self.flujo_crear()
+                self.flujo_lote()
+                self.flujo_busqueda(codigos)
+        except Exception as e:
+            self.metricas.registrar_error(f"Sesión {self.numero}: {type(e).__name__}: {str(e)}")
+
+
+def _ejecutar_sesion(
+    numero: int,
+    iteraciones: int,
+    latencia_ms: float,
+    jitter_ms: float,
+    codigos_iniciales: int,
+    semilla: int,
+    barrera,
+    resultados
+) -> None:
+    """
+    Ejecuta una sesión simulada en su propio proceso y publica sus métricas
+
+    Cada proceso tiene su propio backend falso (mismos parámetros), así que
+    las sesiones no comparten caché ni datos: la prueba mide la latencia de
+    cada sesión con la latencia de red inyectada y N sesiones ocupando la
+    CPU a la vez.
+    """
+    metricas = Metricas()
+    cliente = None
+    inicio = fin = time.time()
+
+    try:
+        cliente = ClienteFalso(latencia_ms, jitter_ms, semilla + numero)
+        codigos = [fila["codigo_barras"] for fila in cliente.sembrar(codigos_iniciales)]
+
+        # Toda la aplicación usa el cliente falso
+        db.create_client = lambda url, key, options=None: cliente
+
+        sesion = SesionSimulada(numero, metricas, semilla + numero)
+        barrera.wait(TIMEOUT_INICIO)
+
+        inicio = time.time()
+        sesion.ejecutar(iteraciones, codigos)
+        fin = time.time()
+    except Exception as e:
+        metricas.registrar_error(f"Sesión {numero}: {type(e).__name__}: {str(e)}")
+
+    resultados.put({
+        "numero": numero,
+        "inicio": inicio,
+        "fin": fin,
+        "latencias": metricas.latencias,
+        "errores": metricas.errores,
+        "peticiones_bd": cliente.peticiones if cliente is not None else 0,
+        "cache": db.cache.estadisticas(),
+    })
+
+
+def ejecutar_prueba(
+    sesiones: int,
+    iteraciones: int,
+    latencia_ms: float,
+    jitter_ms: float,
+    codigos_iniciales: int,
+    semilla: int = 42
+) -> Dict[str, Any]:
+    """
+    Ejecuta la prueba de carga
+
+    Args:
+        sesiones: Sesiones concurrentes (un proceso por sesión)
+        iteraciones: Repeticiones de los tres flujos por sesión
+        latencia_ms: Latencia inyectada por petición a la base de datos
+        jitter_ms: Variación de la latencia
+        codigos_iniciales: Códigos sembrados en el backend falso
+        semilla: Semilla para reproducir la prueba
+
+    Returns:
+        dict: Resumen con percentiles, throughput, peticiones y errores.
+            "valido" es False si alguna sesión falló o no terminó: los
+            percentiles cubren entonces flujos incompletos.
+    """
+    contexto = multiprocessing.get_context(CONTEXTO_PROCESOS)
+    barrera = contexto.Barrier(sesiones)
+    cola = contexto.Queue()
+
+    procesos = [
+        contexto.Process(
+            target=_ejecutar_sesion,
+            args=(n, iteraciones, latencia_ms, jitter_ms, codigos_iniciales, semilla, barrera, cola),
+            name=f"sesion-{n}",
+            daemon=True,
+        )
+        for n in range(sesiones)
+    ]
+    for proceso in procesos:
+        proceso.start()
+
+    # Leer mientras corren: un proceso no termina hasta que su resultado sale de la cola
+    parciales: List[Dict[str, Any]] = []
+    while len(parciales) < sesiones:
+        try:
+            parciales.append(cola.get(timeout=1))
+        except queue.Empty:
+            if not any(proceso.is_alive() for proceso in procesos):
+                break
+
+    for proceso in procesos:
+        proceso.join(5)
+        if proceso.is_alive():
+            proceso.terminate()
+
+    metricas = Metricas()
+    for parcial in parciales:
+        for paso, valores in parcial["latencias"].items():
+            for valor in valores:
+                metricas.registrar(paso, valor)
+        for error in parcial["errores"]:
+            metricas.registrar_error(error)
+
+    terminadas = {parcial["numero"] for parcial in parciales}
+    for n in range(sesiones):
+        if n not in terminadas:
+            metricas.registrar_error(f"Sesión {n}: el proceso terminó sin resultados (código {procesos[n].exitcode})")
+
+    latencias = metricas.todas()
+    duracion = (
+        max(parcial["fin"] for parcial in parciales) - min(parcial["inicio"] for parcial in parciales)
+        if parciales else 0.0
+    )
+    aciertos = sum(parcial["cache"]["aciertos"] for parcial in parciales)
+    fallos = sum(parcial["cache"]["fallos"] for parcial in parciales)
+
+    return {
+        "sesiones": sesiones,
+        "valido": not metricas.errores,
+        "reruns": len(latencias),
+        "duracion_s": duracion,
+        "throughput_reruns_s": len(latencias) / duracion if duracion else 0.0,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "por_paso": {
+            paso: {
+                "reruns": len(valores),
+                "p50_ms": percentil(valores, 50) * 1000,
+                "p95_ms": percentil(valores, 95) * 1000,
+            }
+            for paso, valores in sorted(metricas.latencias.items())
+        },
+        "peticiones_bd": sum(parcial["peticiones_bd"] for parcial in parciales),
+        "cache": {
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "tasa_aciertos": aciertos / (aciertos + fallos) if aciertos + fallos else 0.0,
+        },
+        "errores": metricas.errores,
+    }
+
+
+def imprimir_resumen(resumen: Dict[str, Any]) -> None:
+    """Imprime el resumen de la prueba en consola"""
+    print(f"Sesiones concurrentes: {resumen['sesiones']}")
+    print(f"Reruns: {resumen['reruns']} en {resumen['duracion_s']:.1f} s "
+          f"({resumen['throughput_reruns_s']:.1f} reruns/s)")
+    print(f"Latencia de rerun: p50 {resumen['p50_ms']:.0f} ms | "
+          f"p95 {resumen['p95_ms']:.0f} ms | p99 {resumen['p99_ms']:.0f} ms")
+    print(f"Peticiones a la base de datos: {resumen['peticiones_bd']} "
+          f"(caché: {resumen['cache']['tasa_aciertos']:.0%} de aciertos)")
+    print("")
+    print(f"{'Paso':<16}{'Reruns':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for paso, datos in resumen["por_paso"].items():
+        print(f"{paso:<16}{datos['reruns']:>8}{datos['p50_ms']:>10.0f}{datos['p95_ms']:>10.0f}")
+
+    if resumen["errores"]:
+        print("")
+        print(f"Errores ({len(resumen['errores'])}):")
+        for error in resumen["errores"]:
+            print(f"  - {error}")
+
+    if not resumen["valido"]:
+        print("")
+        print("RESULTADO INVÁLIDO: hubo sesiones que no completaron sus flujos; las latencias no son comparables")
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Prueba de carga de sesiones concurrentes")
+    parser.add_argument("--sesiones", type=int, default=10)
+    parser.add_argument("--iteraciones", type=int, default=3)
+    parser.add_argument("--latencia-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--codigos", type=int, default=2000, help="Códigos sembrados en el backend falso")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    resumen = ejecutar_prueba(
+        args.sesiones,
+        args.iteraciones,
+        args.latencia_ms,
+        args.jitter_ms,
+        args.codigos,
+        args.semilla,
+    )
+    imprimir_resumen(resumen)
+
+    # Código de salida distinto de cero para que un harness detecte la regresión
+    if not resumen["valido"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Lot Archive Module for JYE Barcode System
+Append-only archive of generated EPL lots: zlib-compressed payloads read
+back through a memory map, indexed by lot id, date and barcode
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import uuid
+import zlib
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Directorio por defecto del archivo (relativo a donde se ejecuta la app)
+DIRECTORIO_DEFAULT = "archivo_lotes"
+
+ARCHIVO_DATOS = "lotes.dat"
+ARCHIVO_INDICE = "lotes.idx"
+
+# Cabecera de cada registro: firma, longitud comprimida, CRC32 del contenido comprimido
+FIRMA = b"JYEL"
+CABECERA = struct.Struct("<4sII")
+
+# Nivel de compresión zlib (el EPL es texto muy repetitivo)
+NIVEL_COMPRESION = 6
+
+
+class EntradaLote(NamedTuple):
+    """Lote archivado (una línea del índice)"""
+    id: str
+    nombre: str
+    fecha: str
+    etiquetas: int
+    columnas: int
+    offset: int
+    longitud: int
+    codigos: Dict[str, List[Tuple[int, int]]]  # codigo_barras -> rangos (inicio, fin) en el EPL
+
+
+def rangos_por_codigo(contenido: str) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Ubica los formatos de cada código dentro del contenido EPL
+
+    Un formato termina en su comando P<n>. En rollos multi-columna un formato
+    puede contener varios códigos y aparece en los rangos de cada uno.
+
+    Args:
+        contenido: EPL generado por epl_generator
+
+    Returns:
+        dict: codigo_barras -> lista de rangos [inicio, fin) contiguos fusionados
+    """
+    rangos: Dict[str, List[Tuple[int, int]]] = {}
+    inicio: Optional[int] = None
+    posicion = 0
+    codigos_formato: List[str] = []
+
+    for linea in contenido.splitlines(keepends=True):
+        texto = linea.strip()
+        if texto and inicio is None:
+            inicio = posicion
+        posicion += len(linea)
+
+        if texto.startswith("B"):
+            codigos_formato.append(texto.rsplit(",", 1)[-1])
+        elif texto.startswith("P") and texto[1:].isdigit():
+            for codigo in dict.fromkeys(codigos_formato):
+                lista = rangos.setdefault(codigo, [])
+                if lista and lista[-1][1] >= inicio - 1:
+                    # Formato contiguo al anterior (solo los separa el salto de línea)
+                    lista[-1] = (lista[-1][0], posicion)
+                else:
+                    lista.append((inicio, posicion))
+            codigos_formato = []
+            inicio = None
+
+    return rangos
+
+
+class ArchivoLotes:
+    """
+    Archivo de lotes de solo anexado
+
+    Los contenidos se guardan comprimidos, uno tras otro, en lotes.dat y
+    nunca se reescriben. Cada lote agrega una línea JSON a lotes.idx con su
+    posición y los rangos de cada código, por lo que el índice en memoria se
+    reconstruye al abrir sin leer los datos. Las lecturas usan un mapa en
+    memoria del archivo de datos: recuperar un lote es una descompresión de
+    un segmento, sin consultar la base de datos.
+
+    Si la aplicación se detiene a mitad de una escritura, el registro
+    incompleto no queda en el índice (los datos se escriben antes que la
+    línea del índice) y se ignora.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_DEFAULT):
+        """
+        Args:
+            directorio: Directorio de lotes.dat y lotes.idx
+        """
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+        self._ruta_datos = os.path.join(directorio, ARCHIVO_DATOS)
+        self._ruta_indice = os.path.join(directorio, ARCHIVO_INDICE)
+        self._lock = threading.RLock()
+        self._lotes: Dict[str, EntradaLote] = {}
+        self._por_codigo: Dict[str, List[str]] = {}
+        self._orden: List[str] = []
+        self._mapa: Optional[mmap.mmap] = None
+
+        self._datos = open(self._ruta_datos, "ab")
+        self._cargar_indice()
+
+    def __len__(self) -> int:
+        return len(self._orden)
+
+    def archivar(
+        self,
+        contenido: str,
+        nombre: str,
+        etiquetas: int,
+        columnas: int = 1,
+        lote_id: Optional[str] = None
+    ) -> EntradaLote:
+        """
+        Agrega un lote al archivo
+
+        Args:
+            contenido: EPL del lote
+            nombre: Nombre del archivo del lote (p.ej. lote_YYYYMMDD_HHMMSS.epl)
+            etiquetas: Total de etiquetas del lote
+            columnas: Etiquetas por fila del rollo
+            lote_id: Id del lote (default: uno nuevo)
+
+        Returns:
+            EntradaLote: Entrada agregada al índice
+        """
+        comprimido = zlib.compress(contenido.encode("ascii"), NIVEL_COMPRESION)
+        cabecera = CABECERA.pack(FIRMA, len(comprimido), zlib.crc32(comprimido))
+
+        with self._lock:
+            offset = self._datos.seek(0, os.SEEK_END)
+            self._datos.write(cabecera + comprimido)
+            self._datos.flush()
+            os.fsync(self._datos.fileno())
+
+            entrada = EntradaLote(
+                id=lote_id or uuid.uuid4().hex[:12],
+                nombre=nombre,
+                fecha=datetime.now().isoformat(),
+                etiquetas=etiquetas,
+                columnas=columnas,
+                offset=offset + CABECERA.size,
+                longitud=len(comprimido),
+                codigos=rangos_por_codigo(contenido),
+            )
+
+            with open(self._ruta_indice, "a", encoding="ascii") as indice:
+                indice.write(json.dumps(entrada._asdict()) + "\n")
+
+            self._indexar(entrada)
+
+        return entrada
+
+    def obtener(self, lote_id: str) -> Optional[EntradaLote]:
+        """Devuelve la entrada de un lote por id"""
+        with self._lock:
+            return self._lotes.get(lote_id)
+
+    def leer_lote(self, lote_id: str) -> Optional[str]:
+        """
+        Lee el EPL completo de un lote
+
+        Args:
+            lote_id: Id del lote
+
+        Returns:
+            str: Contenido EPL
+            None: Si el lote no existe
+
+        Raises:
+            ValueError: Si el registro está dañado (CRC distinto)
+        """
+        entrada = self.obtener(lote_id)
+        if entrada is None:
+            return None
+
+        with self._lock:
+            mapa = self._mapear(entrada.offset + entrada.longitud)
+            firma, longitud, crc = CABECERA.unpack_from(mapa, entrada.offset - CABECERA.size)
+            comprimido = mapa[entrada.offset:entrada.offset + entrada.longitud]
+
+        if firma != FIRMA or longitud != entrada.longitud or zlib.crc32(comprimido) != crc:
+            raise ValueError(f"El lote {lote_id} está dañado en el archivo")
+
+        return zlib.decompress(comprimido).decode("ascii")
+
+    def leer_parte_codigo(self, lote_id: str, codigo_barras: str, contenido: Optional[str] = None) -> Optional[str]:
+        """
+        Lee solo los formatos de un lote que imprimen un código
+
+        En rollos multi-columna incluye las filas que el código comparte con
+        otros códigos.
+
+        Args:
+            lote_id: Id del lote
+            codigo_barras: Código a extraer
+            contenido: EPL del lote ya leído con leer_lote (evita descomprimirlo de nuevo)
+
+        Returns:
+            str: Formatos EPL del código
+            None: Si el lote no existe o no contiene el código
+        """
+        entrada = self.obtener(lote_id)
+        if entrada is None or codigo_barras not in entrada.codigos:
+            return None
+
+        if contenido is None:
+            contenido = self.leer_lote(lote_id)
+        return "\n".join(contenido[inicio:fin] for inicio, fin in entrada.codigos[codigo_barras])
+
+    def recientes(self, limite: int = 20) -> List[EntradaLote]:
+        """
+        Lotes más recientes primero
+
+        Args:
+            limite: Número máximo de lotes
+
+        Returns:
+            list: Entradas del índice
+        """
+        with self._lock:
+            return [self._lotes[lote_id] for lote_id in reversed(self._orden[-limite:])]
+
+    def lotes_por_fecha(self, desde: date, hasta: date) -> List[EntradaLote]:
+        """
+        Lotes generados entre dos fechas (inclusive), más recientes primero
+
+        Args:
+            desde: Fecha inicial
+            hasta: Fecha final
+
+        Returns:
+            list: Entradas del índice
+        """
+        inicio = desde.isoformat()
+        # "T99" es mayor que cualquier hora del día final
+        fin = hasta.isoformat() + "T99"
+
+        with self._lock:
+            return [
+                self._lotes[lote_id] for lote_id in reversed(self._orden)
+                if inicio <= self._lotes[lote_id].fecha <= fin
+            ]
+
+    def lotes_por_codigo(self, codigo_barras: str) -> List[EntradaLote]:
+        """
+        Lotes que imprimieron un código, más recientes primero
+
+        Args:
+            codigo_barras: Código de barras de 8 dígitos
+
+        Returns:
+            list: Entradas del índice
+        """
+        with self._lock:
+            return [self._lotes[lote_id] for lote_id in reversed(self._por_codigo.get(codigo_barras, []))]
+
+    def cerrar(self) -> None:
+        """Cierra el archivo de datos y el mapa en memoria"""
+        with self._lock:
+            if self._mapa is not None:
+                self._mapa.close()
+                self._mapa = None
+            self._datos.close()
+
+    def _mapear(self, hasta: int) -> mmap.mmap:
+        """Devuelve un mapa que cubre al menos `hasta` bytes (requiere el lock)"""
+        if self._mapa is None or len(self._mapa) < hasta:
+            if self._mapa is not None:
+                self._mapa.close()
+            with open(self._ruta_datos, "rb") as archivo:
+                self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mapa
+
+    def _indexar(self, entrada: EntradaLote) -> None:
+        """Agrega una entrada a los índices en memoria (requiere el lock)"""
+        self._lotes[entrada.id] = entrada
+        self._orden.append(entrada.id)
+        for codigo in entrada.codigos:
+            self._por_codigo.setdefault(codigo, []).append(entrada.id)
+
+    def _cargar_indice(self) -> None:
+        """Reconstruye los índices en memoria desde lotes.idx"""
+        if not os.path.exists(self._ruta_indice):
+            return
+
+        tamano_datos = os.path.getsize(self._ruta_datos)
+
+        with open(self._ruta_indice, "rb+") as indice:
+            contenido = indice.read()
+
+            # Descartar la línea incompleta de una escritura interrumpida para
+            # que la siguiente entrada no quede pegada a ella
+            completo = contenido.rfind(b"\n") + 1
+            if completo < len(contenido):
+                indice.truncate(completo)
+
+        for linea in contenido[:completo].decode("ascii").splitlines():
+            try:
+                datos = json.loads(linea)
+                datos["codigos"] = {
+                    codigo: [tuple(rango) for rango in rangos]
+                    for codigo, rangos in datos["codigos"].items()
+                }
+                entrada = EntradaLote(**datos)
+            except (ValueError, TypeError, KeyError):
+                continue
+
+            if entrada.offset + entrada.longitud <= tamano_datos:
+                self._indexar(entrada)
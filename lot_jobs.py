@@ -0,0 +1,409 @@
+"""
+Lot Jobs Module for JYE Barcode System
+Background job runner for large lot generation: thread pool, incremental
+progress, cancellation, resume and persisted artifacts
+"""
+
+import json
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import label_pipeline as lp
+import quantity_policy as qp
+
+# Estados de un trabajo
+EN_COLA = "en_cola"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+CANCELADO = "cancelado"
+ERROR = "error"
+INTERRUMPIDO = "interrumpido"
+
+# Estados desde los que un trabajo puede reanudarse
+REANUDABLES = (CANCELADO, ERROR, INTERRUMPIDO)
+
+# Directorio por defecto de artefactos y metadatos
+DIRECTORIO_DEFAULT = os.path.join(tempfile.gettempdir(), "jye_lotes")
+
+# Trabajos procesados en paralelo
+MAX_HILOS = 2
+
+# Códigos marcados como impresos por llamada a la base de datos
+TAMANO_BLOQUE = 200
+
+# Trabajos terminados (con su artefacto) que se conservan en el directorio
+MAX_CONSERVADOS = 50
+
+
+@dataclass
+class TrabajoLote:
+    """Trabajo de generación de un lote"""
+    id: str
+    nombre: str
+    seleccion: List[Tuple[str, str, int]]  # (codigo_id, codigo_barras, cantidad)
+    columnas: int
+    etiquetas: int
+    creado: str
+    estado: str = EN_COLA
+    generado: bool = False
+    marcados: int = 0
+    error: str = ""
+    terminado: Optional[str] = None
+    cancelar: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+
+    @property
+    def progreso(self) -> float:
+        """Fracción del trabajo terminada (la generación cuenta como el primer 10%)"""
+        if not self.seleccion:
+            return 1.0
+        avance_marcado = self.marcados / len(self.seleccion)
+        return (0.1 if self.generado else 0.0) + 0.9 * avance_marcado
+
+    @property
+    def activo(self) -> bool:
+        """True si el trabajo está en cola o en proceso"""
+        return self.estado in (EN_COLA, EN_PROCESO)
+
+    def a_dict(self) -> Dict:
+        """Representación serializable (sin el evento de cancelación)"""
+        return {campo.name: getattr(self, campo.name) for campo in fields(self) if campo.name != "cancelar"}
+
+
+class GestorTrabajos:
+    """
+    Cola de trabajos de lote compartida por todas las sesiones del proceso
+
+    Cada trabajo genera el EPL completo en un archivo con el pipeline
+    paralelo de label_pipeline (por bloques, sin armarlo en memoria) y luego
+    marca los códigos como impresos en bloques de `tamano_bloque`, guardando
+    el avance después de cada bloque. Cancelar detiene el trabajo entre bloques;
+    reanudar continúa desde el último bloque guardado. Los metadatos se
+    persisten junto al artefacto, por lo que los lotes terminados siguen
+    disponibles tras reiniciar la aplicación y los que quedaron a medias
+    aparecen como interrumpidos y pueden reanudarse. Solo se conservan los
+    `max_conservados` trabajos terminados más recientes; los anteriores se
+    eliminan junto con su artefacto.
+    """
+
+    def __init__(
+        self,
+        marcar_impresos: Callable[[List[str]], bool],
+        directorio: str = DIRECTORIO_DEFAULT,
+        max_hilos: int = MAX_HILOS,
+        tamano_bloque: int = TAMANO_BLOQUE,
+        archivar: Optional[Callable[[TrabajoLote, str], None]] = None,
+        registrar_impresion: Optional[Callable[[List[Tuple[str, str, int]], str], None]] = None,
+        procesos: int = lp.MAX_PROCESOS,
+        max_conservados: int = MAX_CONSERVADOS,
+        politica: qp.PoliticaCantidades = qp.POLITICA_DEFAULT
+    ):
+        """
+        Args:
+            marcar_impresos: Función que marca una lista de ids como impresos
+                (db.actualizar_estado_impreso)
+            directorio: Directorio de artefactos y metadatos
+            max_hilos: Trabajos procesados en paralelo
+            tamano_bloque: Códigos marcados por llamada a la base de datos
+            archivar: Función opcional que recibe el trabajo y su EPL una vez
+                generado (p.ej. para el archivo de lotes)
+            registrar_impresion: Función opcional que recibe cada bloque marcado
+                [(codigo_id, codigo_barras, cantidad)] y el id del trabajo
+            procesos: Procesos del pool de generación por trabajo
+            max_conservados: Trabajos terminados que se conservan en el directorio
+            politica: Límites de copias que cada lote encolado debe cumplir
+        """
+        self.marcar_impresos = marcar_impresos
+        self.archivar = archivar
+        self.registrar_impresion = registrar_impresion
+        self.directorio = directorio
+        self.tamano_bloque = tamano_bloque
+        self.procesos = procesos
+        self.max_conservados = max_conservados
+        self.politica = politica
+        self._trabajos: Dict[str, TrabajoLote] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="lote")
+
+        os.makedirs(directorio, exist_ok=True)
+        self._cargar_existentes()
+        self.limpiar()
+
+    def encolar(
+        self,
+        seleccion: Dict[str, Tuple[str, int]],
+        columnas: int = 1,
+        nombre: Optional[str] = None
+    ) -> TrabajoLote:
+        """
+        Encola la generación de un lote
+
+        Args:
+            seleccion: {codigo_id: (codigo_barras, cantidad)} como en TAB 2
+            columnas: Etiquetas por fila del rollo
+            nombre: Nombre del archivo (default: lote_YYYYMMDD_HHMMSS.epl)
+
+        Returns:
+            TrabajoLote: Trabajo creado
+
+        Raises:
+            ValueError: Si la fila de `columnas` etiquetas no cabe en la
+                impresora o el lote excede la política (dividirlo antes con
+                quantity_policy.dividir_seleccion)
+        """
+        # Validar antes de encolar: un lote imposible no debe terminar en ERROR
+        lp.validar_columnas(columnas)
+        qp.verificar(list(seleccion.values()), self.politica, columnas)
+
+        ahora = datetime.now()
+        trabajo = TrabajoLote(
+            id=uuid.uuid4().hex[:12],
+            nombre=nombre or f"lote_{ahora.strftime('%Y%m%d_%H%M%S')}.epl",
+            seleccion=[(codigo_id, codigo, cantidad) for codigo_id, (codigo, cantidad) in seleccion.items()],
+            columnas=columnas,
+            etiquetas=sum(cantidad for _, cantidad in seleccion.values()),
+            creado=ahora.isoformat(),
+        )
+
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+            self._guardar(trabajo)
+
+        self._pool.submit(self._procesar, trabajo)
+        return trabajo
+
+    def cancelar(self, trabajo_id: str) -> bool:
+        """
+        Solicita cancelar un trabajo (se detiene al terminar el bloque en curso)
+
+        Args:
+            trabajo_id: Id del trabajo
+
+        Returns:
+            bool: True si el trabajo estaba activo
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None or not trabajo.activo:
+                return False
+
+            trabajo.cancelar.set()
+            if trabajo.estado == EN_COLA:
+                trabajo.estado = CANCELADO
+                self._guardar(trabajo)
+            return True
+
+    def reanudar(self, trabajo_id: str) -> bool:
+        """
+        Reanuda un trabajo cancelado, fallido o interrumpido desde su último bloque
+
+        Args:
+            trabajo_id: Id del trabajo
+
+        Returns:
+            bool: True si se volvió a encolar
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None or trabajo.estado not in REANUDABLES:
+                return False
+
+            trabajo.cancelar.clear()
+            trabajo.estado = EN_COLA
+            trabajo.error = ""
+            self._guardar(trabajo)
+
+        self._pool.submit(self._procesar, trabajo)
+        return True
+
+    def obtener(self, trabajo_id: str) -> Optional[TrabajoLote]:
+        """Devuelve un trabajo por id"""
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def listar(self) -> List[TrabajoLote]:
+        """
+        Lista los trabajos, del más reciente al más antiguo
+
+        Returns:
+            list: Trabajos conocidos
+        """
+        with self._lock:
+            return sorted(self._trabajos.values(), key=lambda t: t.creado, reverse=True)
+
+    def ruta_artefacto(self, trabajo_id: str) -> Optional[str]:
+        """
+        Ruta del EPL de un trabajo completado (sin leerlo)
+
+        Args:
+            trabajo_id: Id del trabajo
+
+        Returns:
+            str: Ruta del archivo EPL
+            None: Si el trabajo no existe o no está completado
+        """
+        trabajo = self.obtener(trabajo_id)
+        if trabajo is None or trabajo.estado != COMPLETADO:
+            return None
+
+        return self._ruta(trabajo.id, ".epl")
+
+    def leer_artefacto(self, trabajo_id: str) -> Optional[str]:
+        """
+        Lee el EPL de un trabajo completado
+
+        Args:
+            trabajo_id: Id del trabajo
+
+        Returns:
+            str: Contenido EPL
+            None: Si el trabajo no existe o no está completado
+        """
+        ruta = self.ruta_artefacto(trabajo_id)
+        if ruta is None:
+            return None
+
+        with open(ruta, "r", encoding="ascii") as archivo:
+            return archivo.read()
+
+    def limpiar(self) -> int:
+        """
+        Elimina los trabajos terminados más antiguos que exceden max_conservados
+
+        Los trabajos activos nunca se eliminan. También se borran los archivos
+        del directorio que no pertenecen a ningún trabajo conocido (p.ej.
+        temporales de una escritura interrumpida).
+
+        Returns:
+            int: Trabajos eliminados
+        """
+        with self._lock:
+            terminados = sorted(
+                (t for t in self._trabajos.values() if not t.activo),
+                key=lambda t: t.creado,
+                reverse=True
+            )
+            eliminar = terminados[self.max_conservados:]
+
+            for trabajo in eliminar:
+                del self._trabajos[trabajo.id]
+
+            # Dentro del lock: un trabajo encolado ahora no pierde sus archivos
+            for nombre in os.listdir(self.directorio):
+                if nombre.split(".", 1)[0] in self._trabajos:
+                    continue
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                except OSError:
+                    continue
+
+        return len(eliminar)
+
+    def _procesar(self, trabajo: TrabajoLote) -> None:
+        """Ejecuta un trabajo en un hilo del pool"""
+        with self._lock:
+            if trabajo.cancelar.is_set() or trabajo.estado != EN_COLA:
+                return
+            trabajo.estado = EN_PROCESO
+            self._guardar(trabajo)
+
+        try:
+            if not trabajo.generado:
+                ruta = self._ruta(trabajo.id, ".epl")
+                resumen = lp.generar_en_destinos(
+                    ((codigo, cantidad) for _, codigo, cantidad in trabajo.seleccion),
+                    [lp.DestinoArchivo(ruta)],
+                    columnas=trabajo.columnas,
+                    procesos=self.procesos,
+                    cancelar=trabajo.cancelar,
+                    politica=self.politica,
+                )
+
+                if resumen.errores:
+                    error = resumen.errores[0]
+                    raise ValueError(f"Código {error.codigo_barras}: {error.mensaje}")
+
+                if self.archivar is not None:
+                    with open(ruta, "r", encoding="ascii") as archivo:
+                        self.archivar(trabajo, archivo.read())
+
+                with self._lock:
+                    trabajo.generado = True
+                    self._guardar(trabajo)
+
+            while trabajo.marcados < len(trabajo.seleccion):
+                if trabajo.cancelar.is_set():
+                    with self._lock:
+                        trabajo.estado = CANCELADO
+                        self._guardar(trabajo)
+                    return
+
+                fin = min(trabajo.marcados + self.tamano_bloque, len(trabajo.seleccion))
+                bloque = trabajo.seleccion[trabajo.marcados:fin]
+                self.marcar_impresos([codigo_id for codigo_id, _, _ in bloque])
+
+                if self.registrar_impresion is not None:
+                    self.registrar_impresion(bloque, trabajo.id)
+
+                with self._lock:
+                    trabajo.marcados = fin
+                    self._guardar(trabajo)
+
+            with self._lock:
+                trabajo.estado = COMPLETADO
+                trabajo.terminado = datetime.now().isoformat()
+                self._guardar(trabajo)
+
+            self.limpiar()
+
+        except InterruptedError:
+            # Cancelado durante la generación: al reanudar se genera de nuevo
+            with self._lock:
+                trabajo.estado = CANCELADO
+                self._guardar(trabajo)
+
+        except Exception as e:
+            with self._lock:
+                trabajo.estado = ERROR
+                trabajo.error = str(e)
+                self._guardar(trabajo)
+
+    def _ruta(self, trabajo_id: str, extension: str) -> str:
+        return os.path.join(self.directorio, trabajo_id + extension)
+
+    def _escribir(self, ruta: str, contenido: str) -> None:
+        """Escribe un archivo de forma atómica (nunca queda a medias)"""
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="ascii") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+    def _guardar(self, trabajo: TrabajoLote) -> None:
+        """Persiste los metadatos de un trabajo (requiere el lock)"""
+        self._escribir(self._ruta(trabajo.id, ".json"), json.dumps(trabajo.a_dict()))
+
+    def _cargar_existentes(self) -> None:
+        """Recupera los trabajos persistidos en el directorio"""
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".json"):
+                continue
+
+            try:
+                with open(os.path.join(self.directorio, nombre), "r", encoding="ascii") as archivo:
+                    datos = json.load(archivo)
+                datos["seleccion"] = [tuple(item) for item in datos["seleccion"]]
+                trabajo = TrabajoLote(**datos)
+            except (OSError, ValueError, TypeError, KeyError):
+                continue
+
+            # Un trabajo activo al cerrar la aplicación quedó a medias
+            if trabajo.activo:
+                trabajo.estado = INTERRUMPIDO
+                self._guardar(trabajo)
+
+            self._trabajos[trabajo.id] = trabajo
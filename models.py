@@ -0,0 +1,112 @@
+"""
+Models Module for JYE Barcode System
+Typed records returned by the data layer, column projections per use case
+and timestamp parsing done once when rows are loaded
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+# Proyecciones por caso de uso (formato select de PostgREST)
+# Grilla de TAB 2: lo mínimo para mostrar y generar el lote
+COLUMNAS_GRID = "id,codigo_barras,comodin_proveedor,tbc_sku"
+
+# Detalle de TAB 3: todas las columnas de la tabla
+COLUMNAS_DETALLE = "id,codigo_barras,comodin_proveedor,tbc_sku,fecha_creacion,impreso,fecha_impresion"
+
+# Fracción de segundo de largo variable (PostgREST omite los ceros finales)
+_FRACCION = re.compile(r"\.(\d+)")
+
+
+class CodigoBarras(NamedTuple):
+    """
+    Registro de codigos_barras
+
+    Las columnas que no estén en la proyección consultada quedan con su
+    valor por defecto.
+    """
+    id: str
+    codigo_barras: str
+    comodin_proveedor: str
+    tbc_sku: str
+    fecha_creacion: Optional[datetime] = None
+    impreso: bool = False
+    fecha_impresion: Optional[datetime] = None
+
+
+class EventoImpresion(NamedTuple):
+    """Registro de eventos_impresion"""
+    id: str
+    codigo_id: str
+    codigo_barras: str
+    tipo: str
+    cantidad: int
+    lote_id: Optional[str]
+    fecha: datetime
+
+
+def parsear_fecha(valor: Any) -> Optional[datetime]:
+    """
+    Convierte un timestamp ISO 8601 de la base de datos a datetime
+
+    Acepta el sufijo "Z" y fracciones de segundo de cualquier largo, que
+    datetime.fromisoformat no admite antes de Python 3.11.
+
+    Args:
+        valor: String ISO, datetime o None
+
+    Returns:
+        datetime: Fecha (con zona horaria si el valor la trae)
+        None: Si el valor está vacío
+    """
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        return valor
+
+    texto = valor.replace("Z", "+00:00").replace(" ", "T", 1)
+    texto = _FRACCION.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), texto, count=1)
+    return datetime.fromisoformat(texto)
+
+
+def codigo_desde_fila(fila: Dict[str, Any]) -> CodigoBarras:
+    """
+    Construye un CodigoBarras a partir de una fila del backend
+
+    Args:
+        fila: Diccionario con al menos id, codigo_barras, comodin_proveedor y tbc_sku
+
+    Returns:
+        CodigoBarras: Registro con las fechas ya convertidas
+    """
+    return CodigoBarras(
+        id=fila["id"],
+        codigo_barras=fila["codigo_barras"],
+        comodin_proveedor=fila["comodin_proveedor"],
+        tbc_sku=fila["tbc_sku"],
+        fecha_creacion=parsear_fecha(fila.get("fecha_creacion")),
+        impreso=bool(fila.get("impreso", False)),
+        fecha_impresion=parsear_fecha(fila.get("fecha_impresion")),
+    )
+
+
+def evento_desde_fila(fila: Dict[str, Any]) -> EventoImpresion:
+    """
+    Construye un EventoImpresion a partir de una fila del backend o del buffer
+
+    Args:
+        fila: Diccionario con las columnas de eventos_impresion
+
+    Returns:
+        EventoImpresion: Evento con la fecha ya convertida
+    """
+    return EventoImpresion(
+        id=fila["id"],
+        codigo_id=fila["codigo_id"],
+        codigo_barras=fila["codigo_barras"],
+        tipo=fila["tipo"],
+        cantidad=int(fila["cantidad"]),
+        lote_id=fila.get("lote_id"),
+        fecha=parsear_fecha(fila["fecha"]),
+    )
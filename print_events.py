@@ -0,0 +1,257 @@
+"""
+Print Events Module for JYE Barcode System
+In-process buffer of print events (lots, reprints, individual labels)
+flushed to the append-only eventos_impresion table in batched inserts
+"""
+
+import atexit
+import threading
+import uuid
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from resilience import ErrorPermanente
+
+# Tipos de evento
+LOTE = "lote"
+REIMPRESION = "reimpresion"
+INDIVIDUAL = "individual"
+
+# Eventos por inserción multi-fila
+TAMANO_LOTE_EVENTOS = 500
+
+# Segundos máximos que un evento espera en el buffer
+INTERVALO_VACIADO = 5.0
+
+# Eventos retenidos como máximo si la base de datos no está disponible
+MAX_PENDIENTES = 50000
+
+# Eventos rechazados de forma permanente que se conservan para revisión
+MAX_RECHAZADOS = 1000
+
+
+def crear_eventos(
+    items: Iterable[Tuple[str, str, int]],
+    tipo: str,
+    lote_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Crea los registros de evento de una impresión
+
+    El id se genera aquí para que reintentar una inserción no duplique
+    eventos, y la fecha es la de la impresión, no la del vaciado.
+
+    Args:
+        items: Tuplas (codigo_id, codigo_barras, cantidad)
+        tipo: LOTE, REIMPRESION o INDIVIDUAL
+        lote_id: Id del lote (archivo o trabajo), si aplica
+
+    Returns:
+        list: Eventos listos para insertar en eventos_impresion
+    """
+    fecha = datetime.now(timezone.utc).isoformat()
+
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "codigo_id": codigo_id,
+            "codigo_barras": codigo_barras,
+            "tipo": tipo,
+            "cantidad": cantidad,
+            "lote_id": lote_id,
+            "fecha": fecha,
+        }
+        for codigo_id, codigo_barras, cantidad in items
+    ]
+
+
+class BufferEventos:
+    """
+    Buffer de eventos de impresión compartido por el proceso
+
+    Registrar un evento no hace ninguna petición: los eventos se acumulan y
+    un hilo los inserta en bloques de `tamano_lote` cuando el buffer se llena
+    o cada `intervalo` segundos. Si la escritura falla de forma transitoria,
+    el bloque vuelve al frente del buffer y se reintenta en el siguiente
+    vaciado. Si falla de forma permanente (ErrorPermanente: restricciones,
+    datos inválidos), el bloque se parte en mitades hasta aislar los eventos
+    que nunca podrán escribirse; esos pasan a `rechazados` y el resto se
+    escribe, para que un evento inválido no bloquee a los siguientes.
+    """
+
+    def __init__(
+        self,
+        escribir: Callable[[List[Dict[str, Any]]], None],
+        tamano_lote: int = TAMANO_LOTE_EVENTOS,
+        intervalo: float = INTERVALO_VACIADO,
+        max_pendientes: int = MAX_PENDIENTES,
+        al_escribir: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ):
+        """
+        Args:
+            escribir: Función que inserta una lista de eventos (una petición)
+            tamano_lote: Eventos por inserción
+            intervalo: Segundos máximos entre vaciados
+            max_pendientes: Eventos retenidos como máximo; los más antiguos
+                se descartan si la base de datos no responde por mucho tiempo
+            al_escribir: Función opcional llamada con cada bloque escrito
+                (p.ej. para invalidar cachés)
+        """
+        self.escribir = escribir
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self.al_escribir = al_escribir
+        self.descartados = 0
+        self.ultimo_error: Optional[Exception] = None
+
+        # Eventos rechazados de forma permanente (los más recientes) y su error
+        self.rechazados: List[Tuple[Dict[str, Any], str]] = []
+        self.total_rechazados = 0
+
+        self._pendientes: List[Dict[str, Any]] = []
+        self._en_vuelo: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._lock_vaciado = threading.Lock()
+        self._hay_lote = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def agregar(self, eventos: List[Dict[str, Any]]) -> None:
+        """
+        Agrega eventos al buffer (no bloquea)
+
+        Args:
+            eventos: Eventos creados con crear_eventos
+        """
+        with self._lock:
+            self._pendientes.extend(eventos)
+
+            exceso = len(self._pendientes) - self.max_pendientes
+            if exceso > 0:
+                del self._pendientes[:exceso]
+                self.descartados += exceso
+
+            if len(self._pendientes) >= self.tamano_lote:
+                self._hay_lote.set()
+
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name="eventos-impresion", daemon=True)
+                self._hilo.start()
+                atexit.register(self.vaciar)
+
+    def pendientes(self, codigo_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Eventos aún no confirmados por la base de datos (incluye el bloque en escritura)
+
+        Args:
+            codigo_id: Filtrar por código (default: todos)
+
+        Returns:
+            list: Copia de los eventos pendientes
+        """
+        with self._lock:
+            return [
+                e for e in self._en_vuelo + self._pendientes
+                if codigo_id is None or e["codigo_id"] == codigo_id
+            ]
+
+    def vaciar(self) -> int:
+        """
+        Escribe todos los eventos pendientes en bloques
+
+        Returns:
+            int: Eventos escritos (se detiene en la primera falla transitoria)
+        """
+        escritos = 0
+
+        with self._lock_vaciado:
+            while True:
+                with self._lock:
+                    bloque = self._pendientes[:self.tamano_lote]
+                    del self._pendientes[:len(bloque)]
+                    self._en_vuelo = bloque
+                    if len(self._pendientes) < self.tamano_lote:
+                        self._hay_lote.clear()
+
+                if not bloque:
+                    break
+
+                escritos_bloque, completo = self._escribir_bloque(bloque)
+                escritos += escritos_bloque
+
+                if not completo:
+                    break
+
+        return escritos
+
+    def _escribir_bloque(self, bloque: List[Dict[str, Any]]) -> Tuple[int, bool]:
+        """
+        Escribe un bloque aislando los eventos rechazados de forma permanente
+
+        Args:
+            bloque: Eventos a escribir
+
+        Returns:
+            tuple: (eventos escritos, True si no hubo falla transitoria). Tras
+                una falla transitoria lo que faltaba escribir vuelve al frente
+                del buffer.
+        """
+        escritos = 0
+
+        # Partes por escribir, la siguiente al final (conserva el orden)
+        por_escribir = [bloque]
+
+        while por_escribir:
+            parte = por_escribir.pop()
+
+            try:
+                self.escribir(parte)
+            except ErrorPermanente as e:
+                self.ultimo_error = e
+
+                if len(parte) > 1:
+                    mitad = len(parte) // 2
+                    por_escribir.append(parte[mitad:])
+                    por_escribir.append(parte[:mitad])
+                else:
+                    self._rechazar(parte[0], e)
+                    self._actualizar_en_vuelo(por_escribir)
+                continue
+            except Exception as e:
+                self.ultimo_error = e
+                restantes = [parte] + por_escribir[::-1]
+                with self._lock:
+                    self._en_vuelo = []
+                    self._pendientes[:0] = list(chain.from_iterable(restantes))
+                    # Esperar el intervalo antes de reintentar aunque haya un bloque lleno
+                    self._hay_lote.clear()
+                return escritos, False
+
+            self.ultimo_error = None
+            escritos += len(parte)
+
+            if self.al_escribir is not None:
+                self.al_escribir(parte)
+
+            self._actualizar_en_vuelo(por_escribir)
+
+        return escritos, True
+
+    def _actualizar_en_vuelo(self, por_escribir: List[List[Dict[str, Any]]]) -> None:
+        """Deja en _en_vuelo solo los eventos del bloque que aún no se resolvieron"""
+        with self._lock:
+            self._en_vuelo = list(chain.from_iterable(reversed(por_escribir)))
+
+    def _rechazar(self, evento: Dict[str, Any], error: Exception) -> None:
+        """Aparta un evento que la base de datos rechazó de forma permanente"""
+        with self._lock:
+            self.rechazados.append((evento, str(error)))
+            del self.rechazados[:-MAX_RECHAZADOS]
+            self.total_rechazados += 1
+
+    def _ciclo(self) -> None:
+        """Vacía el buffer al llenarse un bloque o al cumplirse el intervalo"""
+        while True:
+            self._hay_lote.wait(self.intervalo)
+            self.vaciar()
@@ -0,0 +1,279 @@
+"""
+Printer Simulator Module for JYE Barcode System
+Simulates a Zebra printer on a local TCP socket (receive buffer, ~HS status,
+paper-out/pause/head-open) to test printer_transport without hardware
+"""
+
+import select
+import socket
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from printer_transport import ETX, STX, dividir_formatos
+
+
+class SimuladorImpresora:
+    """
+    Impresora simulada que escucha en 127.0.0.1
+
+    Los formatos recibidos se encolan en un buffer de capacidad limitada y se
+    imprimen a razón de etiquetas_por_segundo. Si llega un formato con el
+    buffer lleno se descarta y se cuenta en formatos_perdidos, igual que una
+    impresora real que desborda su buffer de recepción.
+
+    Example:
+        >>> with SimuladorImpresora(capacidad_formatos=4) as sim:
+        ...     with TransporteImpresora("127.0.0.1", sim.puerto) as t:
+        ...         t.enviar_trabajo(contenido_epl)
+    """
+
+    def __init__(self, capacidad_formatos: int = 16, etiquetas_por_segundo: float = 50.0):
+        """
+        Args:
+            capacidad_formatos: Formatos que caben en el buffer de recepción
+            etiquetas_por_segundo: Velocidad de impresión simulada
+        """
+        self.capacidad_formatos = capacidad_formatos
+        self.etiquetas_por_segundo = etiquetas_por_segundo
+
+        # Estado controlable desde las pruebas
+        self.sin_papel = False
+        self.pausada = False
+        self.cabezal_abierto = False
+
+        # Resultados observables
+        self.formatos_impresos: List[str] = []
+        self.formatos_perdidos = 0
+        self.consultas_estado = 0
+
+        self._buffer: deque = deque()
+        self._restantes_formato_actual = 0
+        self._lock = threading.Lock()
+        # Se toma mientras se leen y encolan datos de la conexión
+        self._lock_entrada = threading.Lock()
+        self._conexion: Optional[socket.socket] = None
+        self._pendiente = ""
+        self._detener = threading.Event()
+        self._servidor: Optional[socket.socket] = None
+        self._hilos: List[threading.Thread] = []
+        self.puerto = 0
+
+    def iniciar(self) -> None:
+        """Abre el socket local y arranca los hilos de recepción e impresión"""
+        self._servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._servidor.bind(("127.0.0.1", 0))
+        self._servidor.listen(1)
+        self._servidor.settimeout(0.1)
+        self.puerto = self._servidor.getsockname()[1]
+
+        for objetivo in (self._aceptar, self._imprimir):
+            hilo = threading.Thread(target=objetivo, daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self) -> None:
+        """Detiene el simulador y cierra el socket"""
+        self._detener.set()
+        for hilo in self._hilos:
+            hilo.join(timeout=1.0)
+        if self._servidor is not None:
+            self._servidor.close()
+
+    def __enter__(self) -> "SimuladorImpresora":
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.detener()
+
+    def esperar_vacio(self, timeout: float = 10.0) -> bool:
+        """
+        Espera a que se impriman todos los formatos recibidos
+
+        Solo termina cuando no quedan datos por leer en la conexión ni
+        formatos a medio recibir, el buffer está vacío y no hay ninguna
+        etiqueta imprimiéndose.
+
+        Args:
+            timeout: Segundos máximos de espera
+
+        Returns:
+            bool: True si la entrada y el buffer quedaron vacíos antes del timeout
+        """
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            if self._entrada_vacia():
+                with self._lock:
+                    if not self._buffer and self._restantes_formato_actual == 0:
+                        return True
+            time.sleep(0.01)
+        return False
+
+    def _entrada_vacia(self) -> bool:
+        """True si todo lo recibido por la conexión ya se procesó"""
+        with self._lock_entrada:
+            if self._pendiente.strip():
+                return False
+
+            conexion = self._conexion
+            if conexion is None:
+                return True
+
+            try:
+                legibles, _, _ = select.select([conexion], [], [], 0)
+            except (OSError, ValueError):
+                return True
+            return not legibles
+
+    def respuesta_estado(self) -> bytes:
+        """
+        Construye la respuesta de ~HS con el estado actual
+
+        Returns:
+            bytes: Tres líneas STX...ETX CR LF
+        """
+        with self._lock:
+            en_buffer = len(self._buffer)
+            lleno = en_buffer >= self.capacidad_formatos
+            restantes = self._restantes_formato_actual
+
+        linea1 = "030,{},{},0406,{:03d},{},0,0,000,0,0,0".format(
+            int(self.sin_papel), int(self.pausada), en_buffer, int(lleno)
+        )
+        linea2 = "001,0,{},0,0,2,6,0,{:08d},1,000".format(
+            int(self.cabezal_abierto), restantes
+        )
+        linea3 = "1234,0"
+
+        return b"".join(
+            STX + linea.encode("ascii") + ETX + b"\r\n"
+            for linea in (linea1, linea2, linea3)
+        )
+
+    def _aceptar(self) -> None:
+        """Acepta conexiones y procesa los datos recibidos"""
+        while not self._detener.is_set():
+            try:
+                conexion, _ = self._servidor.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+
+            conexion.settimeout(0.1)
+            with conexion:
+                self._recibir(conexion)
+
+    def _recibir(self, conexion: socket.socket) -> None:
+        """Lee el flujo de una conexión separando ~HS de los formatos"""
+        with self._lock_entrada:
+            self._conexion = conexion
+            self._pendiente = ""
+
+        try:
+            while not self._detener.is_set():
+                try:
+                    legibles, _, _ = select.select([conexion], [], [], 0.1)
+                except (OSError, ValueError):
+                    return
+                if not legibles:
+                    continue
+
+                with self._lock_entrada:
+                    try:
+                        datos = conexion.recv(4096)
+                    except socket.timeout:
+                        continue
+                    except OSError:
+                        return
+
+                    if not datos:
+                        return
+
+                    self._procesar(conexion, datos.decode("ascii", errors="replace"))
+        finally:
+            with self._lock_entrada:
+                self._conexion = None
+
+    def _procesar(self, conexion: socket.socket, texto: str) -> None:
+        """
+        Procesa los datos recibidos en el orden del flujo
+
+        Los formatos que llegaron antes de un ~HS se encolan antes de
+        responderlo, así el estado incluye todo lo ya enviado.
+        """
+        pendiente = self._pendiente + texto
+
+        while "~HS" in pendiente:
+            anterior, pendiente = pendiente.split("~HS", 1)
+            pendiente = self._encolar(anterior) + pendiente
+            self.consultas_estado += 1
+            conexion.sendall(self.respuesta_estado())
+
+        self._pendiente = self._encolar(pendiente)
+
+    def _encolar(self, texto: str) -> str:
+        """
+        Encola los formatos completos del texto
+
+        Returns:
+            str: Resto sin procesar (línea o formato incompleto)
+        """
+        # Procesar solo líneas completas y conservar el resto
+        corte = texto.rfind("\n") + 1
+        completos = dividir_formatos(texto[:corte])
+        resto = texto[corte:]
+
+        if completos and not _formato_completo(completos[-1]):
+            resto = completos.pop() + resto
+
+        with self._lock:
+            for formato in completos:
+                if len(self._buffer) >= self.capacidad_formatos:
+                    self.formatos_perdidos += 1
+                else:
+                    self._buffer.append(formato)
+
+        return resto
+
+    def _imprimir(self) -> None:
+        """Consume formatos del buffer a la velocidad configurada"""
+        while not self._detener.is_set():
+            if self.sin_papel or self.pausada or self.cabezal_abierto:
+                time.sleep(0.01)
+                continue
+
+            with self._lock:
+                if self._restantes_formato_actual == 0 and self._buffer:
+                    formato = self._buffer.popleft()
+                    self.formatos_impresos.append(formato)
+                    self._restantes_formato_actual = _copias(formato)
+                imprimiendo = self._restantes_formato_actual > 0
+
+            if not imprimiendo:
+                time.sleep(0.005)
+                continue
+
+            time.sleep(1.0 / self.etiquetas_por_segundo)
+            with self._lock:
+                self._restantes_formato_actual -= 1
+
+
+def _formato_completo(formato: str) -> bool:
+    """True si el formato termina en su comando de impresión"""
+    ultima = formato.strip().splitlines()[-1].strip() if formato.strip() else ""
+    return ultima.startswith("P") or "^XZ" in ultima
+
+
+def _copias(formato: str) -> int:
+    """Obtiene la cantidad de copias de un formato EPL (P<n>) o ZPL (^PQ<n>)"""
+    for linea in formato.splitlines():
+        linea = linea.strip()
+        if linea.startswith("^PQ"):
+            return int(linea[3:].split(",")[0] or 1)
+        if linea.startswith("P") and linea[1:].isdigit():
+            return int(linea[1:])
+    return 1
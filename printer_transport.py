@@ -0,0 +1,383 @@
+"""
+Printer Transport Module for JYE Barcode System
+Sends EPL/ZPL jobs to the Zebra GC420t over a raw TCP socket with flow
+control based on host status polling (~HS)
+"""
+
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+# Puerto RAW estándar de los print servers Zebra
+PUERTO_RAW = 9100
+
+# Comando de estado del host (Host Status Return)
+COMANDO_ESTADO = b"~HS"
+
+# Delimitadores de cada línea de respuesta de ~HS
+STX = b"\x02"
+ETX = b"\x03"
+
+# Formatos que dejamos encolados en la impresora antes de volver a consultar.
+# Nunca debe superar la capacidad del buffer de recepción de la impresora:
+# dentro de una ventana se envía sin consultar, y lo que no cabe se pierde.
+MAX_FORMATOS_BUFFER = 4
+
+# Fin de formato: línea "P<n>" en EPL o "^XZ" en ZPL
+_FIN_FORMATO = re.compile(r"^(P\d+.*|.*\^XZ.*)$")
+
+
+class ErrorImpresora(Exception):
+    """Error de comunicación o estado de la impresora"""
+
+
+@dataclass
+class EstadoImpresora:
+    """
+    Estado de la impresora reportado por ~HS
+
+    Attributes:
+        sin_papel: La impresora reporta falta de papel
+        pausada: La impresora está en pausa
+        cabezal_abierto: El cabezal está abierto
+        buffer_lleno: El buffer de recepción está lleno
+        formatos_en_buffer: Formatos pendientes en el buffer de recepción
+        etiquetas_restantes: Etiquetas que faltan por imprimir del lote actual
+    """
+    sin_papel: bool = False
+    pausada: bool = False
+    cabezal_abierto: bool = False
+    buffer_lleno: bool = False
+    formatos_en_buffer: int = 0
+    etiquetas_restantes: int = 0
+
+    @property
+    def operativa(self) -> bool:
+        """True si la impresora puede seguir imprimiendo"""
+        return not (self.sin_papel or self.pausada or self.cabezal_abierto)
+
+    def puede_recibir(self, max_formatos: int = MAX_FORMATOS_BUFFER) -> bool:
+        """
+        Indica si es seguro enviar más formatos a la impresora
+
+        Args:
+            max_formatos: Máximo de formatos permitidos en el buffer
+
+        Returns:
+            bool: True si hay espacio en el buffer y la impresora está operativa
+        """
+        return (
+            self.operativa
+            and not self.buffer_lleno
+            and self.formatos_en_buffer < max_formatos
+        )
+
+    def credito(self, max_formatos: int = MAX_FORMATOS_BUFFER) -> int:
+        """
+        Formatos que pueden enviarse antes de volver a consultar
+
+        Args:
+            max_formatos: Máximo de formatos permitidos en el buffer
+
+        Returns:
+            int: Espacio libre reportado (0 si no puede recibir)
+        """
+        if not self.puede_recibir(max_formatos):
+            return 0
+        return max_formatos - self.formatos_en_buffer
+
+    def descripcion(self) -> str:
+        """
+        Describe el estado para mostrarlo en la interfaz
+
+        Returns:
+            str: Mensaje legible del estado actual
+        """
+        problemas = []
+        if self.sin_papel:
+            problemas.append("sin papel")
+        if self.cabezal_abierto:
+            problemas.append("cabezal abierto")
+        if self.pausada:
+            problemas.append("en pausa")
+        if self.buffer_lleno:
+            problemas.append("buffer lleno")
+
+        if problemas:
+            return "Impresora " + ", ".join(problemas)
+
+        return (
+            f"Impresora lista ({self.formatos_en_buffer} formatos en buffer, "
+            f"{self.etiquetas_restantes} etiquetas pendientes)"
+        )
+
+
+def parsear_estado_hs(respuesta: bytes) -> EstadoImpresora:
+    """
+    Interpreta la respuesta de ~HS
+
+    La respuesta son tres líneas delimitadas por STX/ETX:
+        1: aaa,b,c,dddd,eee,f,g,h,iii,j,k,l
+        2: mmm,n,o,p,q,r,s,t,uuuuuuuu,v,www
+        3: xxxx,y
+
+    Args:
+        respuesta: Bytes recibidos de la impresora
+
+    Returns:
+        EstadoImpresora: Estado interpretado
+
+    Raises:
+        ErrorImpresora: Si la respuesta está incompleta o mal formada
+    """
+    lineas = re.findall(rb"\x02([^\x03]*)\x03", respuesta)
+
+    if len(lineas) < 2:
+        raise ErrorImpresora("Respuesta de estado incompleta")
+
+    try:
+        campos1 = lineas[0].decode("ascii").strip().split(",")
+        campos2 = lineas[1].decode("ascii").strip().split(",")
+
+        return EstadoImpresora(
+            sin_papel=campos1[1] == "1",
+            pausada=campos1[2] == "1",
+            formatos_en_buffer=int(campos1[4]),
+            buffer_lleno=campos1[5] == "1",
+            cabezal_abierto=campos2[2] == "1",
+            etiquetas_restantes=int(campos2[8]),
+        )
+    except (IndexError, ValueError, UnicodeDecodeError) as e:
+        raise ErrorImpresora(f"Respuesta de estado inválida: {str(e)}")
+
+
+def dividir_formatos(contenido: str) -> List[str]:
+    """
+    Divide un trabajo EPL/ZPL en formatos individuales
+
+    Args:
+        contenido: Contenido completo generado por epl_generator
+
+    Returns:
+        list: Formatos en orden, cada uno terminado en su comando de impresión
+    """
+    formatos = []
+    actual = []
+
+    for linea in contenido.splitlines(keepends=True):
+        if not actual and not linea.strip():
+            continue
+
+        actual.append(linea)
+
+        if _FIN_FORMATO.match(linea.strip()):
+            formatos.append("".join(actual))
+            actual = []
+
+    if actual:
+        formatos.append("".join(actual))
+
+    return formatos
+
+
+class TransporteImpresora:
+    """
+    Envía trabajos a la impresora con control de flujo por sondeo de estado
+
+    Cada ventana de envío se basa en lo que reporta ~HS: el crédito es la
+    ventana (max_formatos_buffer) menos los formatos ya encolados, y al
+    agotarlo se vuelve a consultar. Si la impresora está sin papel, en
+    pausa, con el cabezal abierto o con el buffer lleno, el envío se
+    detiene y se reanuda automáticamente cuando el estado se normaliza.
+
+    La ventana no debe superar la capacidad del buffer de la impresora. Si
+    ~HS reporta el buffer lleno con menos formatos que la ventana, la
+    ventana se reduce a esa cantidad para el resto de la conexión.
+
+    Example:
+        >>> with TransporteImpresora("192.168.1.50") as impresora:
+        ...     impresora.enviar_trabajo(contenido_epl)
+    """
+
+    def __init__(
+        self,
+        host: str,
+        puerto: int = PUERTO_RAW,
+        timeout: float = 5.0,
+        intervalo_sondeo: float = 0.5,
+        max_formatos_buffer: int = MAX_FORMATOS_BUFFER,
+        max_espera: float = 300.0,
+        on_estado: Optional[Callable[[EstadoImpresora], None]] = None
+    ):
+        """
+        Args:
+            host: Dirección IP o nombre de la impresora (o print server)
+            puerto: Puerto RAW (default: 9100)
+            timeout: Timeout de socket en segundos
+            intervalo_sondeo: Segundos entre consultas mientras se espera
+            max_formatos_buffer: Formatos máximos encolados en la impresora
+                (no mayor que la capacidad de su buffer de recepción)
+            max_espera: Segundos máximos en pausa antes de abortar el envío
+            on_estado: Callback invocado con cada estado consultado
+        """
+        self.host = host
+        self.puerto = puerto
+        self.timeout = timeout
+        self.intervalo_sondeo = intervalo_sondeo
+        self.max_formatos_buffer = max_formatos_buffer
+        self.max_espera = max_espera
+        self.on_estado = on_estado
+        self.ultimo_estado: Optional[EstadoImpresora] = None
+        self._socket: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def conectar(self) -> None:
+        """Abre la conexión con la impresora"""
+        if self._socket is None:
+            try:
+                self._socket = socket.create_connection(
+                    (self.host, self.puerto), timeout=self.timeout
+                )
+            except OSError as e:
+                raise ErrorImpresora(f"No se pudo conectar con la impresora: {str(e)}")
+
+    def cerrar(self) -> None:
+        """Cierra la conexión con la impresora"""
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def __enter__(self) -> "TransporteImpresora":
+        self.conectar()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.cerrar()
+
+    def consultar_estado(self) -> EstadoImpresora:
+        """
+        Consulta el estado de la impresora con ~HS
+
+        Returns:
+            EstadoImpresora: Estado actual reportado por la impresora
+
+        Raises:
+            ErrorImpresora: Si no hay respuesta o es inválida
+        """
+        self.conectar()
+
+        with self._lock:
+            try:
+                self._socket.sendall(COMANDO_ESTADO)
+
+                # Leer hasta recibir las tres líneas de respuesta
+                respuesta = b""
+                while respuesta.count(ETX) < 3:
+                    datos = self._socket.recv(1024)
+                    if not datos:
+                        raise ErrorImpresora("La impresora cerró la conexión")
+                    respuesta += datos
+
+            except socket.timeout:
+                raise ErrorImpresora("La impresora no respondió a la consulta de estado")
+            except OSError as e:
+                raise ErrorImpresora(f"Error de comunicación con la impresora: {str(e)}")
+
+        estado = parsear_estado_hs(respuesta)
+        self.ultimo_estado = estado
+
+        # Buffer lleno con menos formatos que la ventana: esa es su capacidad real
+        if estado.buffer_lleno and 0 < estado.formatos_en_buffer < self.max_formatos_buffer:
+            self.max_formatos_buffer = estado.formatos_en_buffer
+
+        if self.on_estado:
+            self.on_estado(estado)
+
+        return estado
+
+    def _esperar_disponibilidad(self, cancelar: Optional[threading.Event]) -> EstadoImpresora:
+        """
+        Consulta el estado hasta que la impresora pueda recibir más formatos
+
+        Args:
+            cancelar: Evento opcional para abortar la espera
+
+        Returns:
+            EstadoImpresora: Primer estado que permite continuar el envío
+
+        Raises:
+            ErrorImpresora: Si la espera supera max_espera o se cancela
+        """
+        inicio = time.monotonic()
+
+        while True:
+            estado = self.consultar_estado()
+
+            if estado.credito(self.max_formatos_buffer) > 0:
+                return estado
+
+            if cancelar is not None and cancelar.is_set():
+                raise ErrorImpresora("Envío cancelado")
+
+            if time.monotonic() - inicio > self.max_espera:
+                raise ErrorImpresora(
+                    f"Tiempo de espera agotado: {estado.descripcion()}"
+                )
+
+            time.sleep(self.intervalo_sondeo)
+
+    def enviar_trabajo(
+        self,
+        contenido: str,
+        cancelar: Optional[threading.Event] = None,
+        on_progreso: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Envía un trabajo completo respetando el control de flujo
+
+        Args:
+            contenido: Contenido EPL/ZPL (uno o varios formatos)
+            cancelar: Evento opcional para detener el envío
+            on_progreso: Callback (formatos_enviados, total_formatos)
+
+        Returns:
+            int: Número de formatos enviados
+
+        Raises:
+            ErrorImpresora: Si hay error de comunicación, se cancela o
+                la impresora permanece detenida más de max_espera
+        """
+        formatos = dividir_formatos(contenido)
+        total = len(formatos)
+        enviados = 0
+        credito = 0
+
+        self.conectar()
+
+        for formato in formatos:
+            if cancelar is not None and cancelar.is_set():
+                raise ErrorImpresora("Envío cancelado")
+
+            # Ventana agotada: volver a consultar (y esperar si es necesario)
+            if credito <= 0:
+                estado = self._esperar_disponibilidad(cancelar)
+                credito = estado.credito(self.max_formatos_buffer)
+
+            with self._lock:
+                try:
+                    self._socket.sendall(formato.encode("ascii"))
+                except OSError as e:
+                    raise ErrorImpresora(f"Error al enviar datos a la impresora: {str(e)}")
+
+            enviados += 1
+            credito -= 1
+
+            if on_progreso:
+                on_progreso(enviados, total)
+
+        return enviados
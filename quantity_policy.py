@@ -0,0 +1,418 @@
+"""
+Quantity Policy Module for JYE Barcode System
+Configurable copy limits (per item, per comodín, per lot and per roll)
+evaluated over a whole lot in one pass, with automatic split proposals
+"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from barcode_generator import MAX_COMODIN_LENGTH
+
+# Copias máximas de un código por impresión (límite histórico de la app)
+MAX_POR_ITEM = 100
+
+# Tipos de límite
+POR_ITEM = "por_item"
+POR_COMODIN = "por_comodin"
+POR_LOTE = "por_lote"
+POR_ROLLO = "por_rollo"
+CANTIDAD_MINIMA = "cantidad_minima"
+
+DESCRIPCIONES = {
+    POR_ITEM: "copias por código",
+    POR_COMODIN: "etiquetas por comodín",
+    POR_LOTE: "etiquetas por lote",
+    POR_ROLLO: "etiquetas del rollo",
+    CANTIDAD_MINIMA: "cantidad mínima",
+}
+
+
+@dataclass(frozen=True)
+class PoliticaCantidades:
+    """
+    Límites de impresión; None significa sin límite
+
+    Todos se aplican a cada lote generado: si un lote los excede, evaluar
+    propone dividirlo en partes que los cumplan.
+    """
+    max_por_item: Optional[int] = MAX_POR_ITEM
+    max_por_comodin: Optional[int] = None
+    max_por_lote: Optional[int] = None
+    etiquetas_por_rollo: Optional[int] = None
+
+    def __post_init__(self):
+        for campo in fields(self):
+            limite = getattr(self, campo.name)
+            if limite is not None and limite < 1:
+                raise ValueError(f"{campo.name} debe ser al menos 1 (None para no limitar)")
+
+    @classmethod
+    def desde_config(cls, config: Mapping[str, Any]) -> "PoliticaCantidades":
+        """
+        Crea la política desde la sección [limites] de secrets
+
+        Args:
+            config: Claves opcionales max_por_item, max_por_comodin,
+                max_por_lote y etiquetas_por_rollo
+
+        Returns:
+            PoliticaCantidades: Política con los valores por defecto para las
+                claves ausentes o vacías
+
+        Raises:
+            ValueError: Si un límite configurado no es un entero de al menos 1
+                (0 es un valor configurado, no la ausencia de límite; se omite
+                la clave para no limitar)
+        """
+        def entero(clave: str, defecto: Optional[int]) -> Optional[int]:
+            valor = config.get(clave)
+            return defecto if valor is None or valor == "" else int(valor)
+
+        return cls(
+            max_por_item=entero("max_por_item", MAX_POR_ITEM),
+            max_por_comodin=entero("max_por_comodin", None),
+            max_por_lote=entero("max_por_lote", None),
+            etiquetas_por_rollo=entero("etiquetas_por_rollo", None),
+        )
+
+    @property
+    def max_por_impresion(self) -> Optional[int]:
+        """Copias máximas de un código en una impresión individual o reimpresión (None: sin límite)"""
+        limites = [
+            limite for limite in (self.max_por_item, self.max_por_comodin, self.max_por_lote, self.etiquetas_por_rollo)
+            if limite is not None
+        ]
+        return min(limites) if limites else None
+
+    def validar_cantidad(self, cantidad: int) -> Tuple[bool, str]:
+        """
+        Valida las copias de un solo código (TAB 1 y reimpresión)
+
+        Args:
+            cantidad: Número de copias solicitadas
+
+        Returns:
+            tuple: (es_valido, mensaje_error)
+        """
+        if cantidad < 1:
+            return False, "La cantidad debe ser al menos 1"
+
+        maximo = self.max_por_impresion
+        if maximo is not None and cantidad > maximo:
+            return False, f"La cantidad no puede exceder {maximo} copias"
+
+        return True, ""
+
+
+# Política aplicada cuando el llamador no indica otra (límite histórico por código)
+POLITICA_DEFAULT = PoliticaCantidades()
+
+# Infracciones listadas en el mensaje de un lote rechazado
+MAX_INFRACCIONES_MENSAJE = 3
+
+
+class Infraccion(NamedTuple):
+    """Límite excedido por un lote"""
+    limite: str
+    clave: str  # código, comodín o "" para los límites del lote completo
+    solicitado: int
+    maximo: int
+    posicion: Optional[int] = None  # índice del ítem en el lote (solo cantidad_minima)
+
+    def descripcion(self) -> str:
+        """Mensaje legible de la infracción"""
+        sujeto = f" ({self.clave})" if self.clave else ""
+        if self.limite == CANTIDAD_MINIMA:
+            return f"Cantidad inválida{sujeto}: {self.solicitado}"
+        return f"{DESCRIPCIONES[self.limite].capitalize()}{sujeto}: {self.solicitado} de {self.maximo} permitidas"
+
+
+class EvaluacionLote(NamedTuple):
+    """Resultado de evaluar un lote contra la política"""
+    infracciones: List[Infraccion]
+    partes: List[List[Tuple[int, int]]]  # por parte: (índice del ítem, cantidad)
+    etiquetas: int
+
+    @property
+    def dentro_de_limites(self) -> bool:
+        """True si el lote puede imprimirse tal cual"""
+        return not self.infracciones
+
+    @property
+    def divisible(self) -> bool:
+        """True si las partes propuestas resuelven todas las infracciones"""
+        return all(infraccion.limite != CANTIDAD_MINIMA for infraccion in self.infracciones)
+
+
+def posiciones_rollo(etiquetas: int, columnas: int = 1) -> int:
+    """
+    Posiciones del rollo que ocupa un lote
+
+    En rollos multi-columna la última fila ocupa todas sus posiciones
+    aunque tenga columnas en blanco.
+
+    Args:
+        etiquetas: Etiquetas impresas
+        columnas: Etiquetas por fila
+
+    Returns:
+        int: Etiquetas del rollo consumidas (filas completas)
+    """
+    return -(-etiquetas // columnas) * columnas
+
+
+def evaluar(
+    items: Sequence[Tuple[str, int]],
+    politica: PoliticaCantidades,
+    columnas: int = 1
+) -> EvaluacionLote:
+    """
+    Evalúa un lote completo contra la política en una sola pasada
+
+    Al mismo tiempo reparte las etiquetas en partes que cumplen todos los
+    límites: cada ítem va a la primera parte con capacidad (y se reparte
+    entre varias si no cabe). Como la capacidad de una parte solo
+    disminuye, los punteros a la primera parte con capacidad (global, por
+    comodín y por código) solo avanzan, y el costo total es lineal en ítems
+    más las partes que recorre cada puntero. El orden de los ítems se
+    conserva dentro de cada parte.
+
+    El límite por rollo cuenta filas completas (posiciones_rollo): en rollos
+    multi-columna las posiciones en blanco de la última fila también
+    consumen rollo, así que cada parte propuesta llena a lo sumo las filas
+    enteras que caben en el rollo.
+
+    Args:
+        items: Tuplas (codigo_barras, cantidad)
+        politica: Límites a aplicar
+        columnas: Etiquetas por fila del rollo
+
+    Returns:
+        EvaluacionLote: Infracciones del lote tal cual y partes propuestas
+            (una sola parte si no hay infracciones). Los ítems con cantidad
+            menor a 1 se reportan y quedan fuera de las partes.
+
+    Raises:
+        ValueError: Si el rollo no alcanza para una fila de `columnas` etiquetas
+    """
+    sin_limite = float("inf")
+    limite_item = sin_limite if politica.max_por_item is None else politica.max_por_item
+    limite_comodin = sin_limite if politica.max_por_comodin is None else politica.max_por_comodin
+    limite_rollo = sin_limite
+
+    if politica.etiquetas_por_rollo is not None:
+        limite_rollo = politica.etiquetas_por_rollo // columnas * columnas
+        if limite_rollo == 0:
+            raise ValueError(
+                f"Un rollo de {politica.etiquetas_por_rollo} etiquetas no alcanza para una fila de {columnas}"
+            )
+
+    limite_parte = min(sin_limite if politica.max_por_lote is None else politica.max_por_lote, limite_rollo)
+
+    infracciones: List[Infraccion] = []
+    partes: List[List[Tuple[int, int]]] = []
+    totales_parte: List[int] = []
+    comodines_parte: List[Dict[str, int]] = []
+    codigos_parte: List[Dict[str, int]] = []
+
+    # Primera parte que puede tener capacidad
+    desde_parte = 0
+    desde_comodin: Dict[str, int] = {}
+    desde_codigo: Dict[str, int] = {}
+
+    total = 0
+    por_comodin: Dict[str, int] = {}
+    por_codigo: Dict[str, int] = {}
+
+    for indice, (codigo_barras, cantidad) in enumerate(items):
+        if cantidad < 1:
+            infracciones.append(Infraccion(CANTIDAD_MINIMA, codigo_barras, cantidad, 1, indice))
+            continue
+
+        comodin = codigo_barras[:MAX_COMODIN_LENGTH]
+        total += cantidad
+        por_comodin[comodin] = por_comodin.get(comodin, 0) + cantidad
+        por_codigo[codigo_barras] = por_codigo.get(codigo_barras, 0) + cantidad
+
+        restante = cantidad
+        parte = max(desde_parte, desde_comodin.get(comodin, 0), desde_codigo.get(codigo_barras, 0))
+
+        while restante > 0:
+            if parte == len(partes):
+                partes.append([])
+                totales_parte.append(0)
+                comodines_parte.append({})
+                codigos_parte.append({})
+
+            capacidad = min(
+                limite_parte - totales_parte[parte],
+                limite_comodin - comodines_parte[parte].get(comodin, 0),
+                limite_item - codigos_parte[parte].get(codigo_barras, 0),
+            )
+            if capacidad <= 0:
+                parte += 1
+                continue
+
+            tomadas = int(min(restante, capacidad))
+            partes[parte].append((indice, tomadas))
+            totales_parte[parte] += tomadas
+            comodines_parte[parte][comodin] = comodines_parte[parte].get(comodin, 0) + tomadas
+            codigos_parte[parte][codigo_barras] = codigos_parte[parte].get(codigo_barras, 0) + tomadas
+            restante -= tomadas
+
+        # Las partes anteriores a `parte` ya no tienen capacidad para este
+        # código, pero pueden tenerla para otros del mismo comodín (si se
+        # llenaron por el límite por ítem): ese puntero solo avanza sobre
+        # partes llenas o sin capacidad para el comodín
+        desde_codigo[codigo_barras] = parte
+        parte_comodin = desde_comodin.get(comodin, 0)
+        while parte_comodin < len(partes) and (
+            totales_parte[parte_comodin] >= limite_parte
+            or comodines_parte[parte_comodin].get(comodin, 0) >= limite_comodin
+        ):
+            parte_comodin += 1
+        desde_comodin[comodin] = parte_comodin
+        while desde_parte < len(partes) and totales_parte[desde_parte] >= limite_parte:
+            desde_parte += 1
+
+    # Infracciones del lote tal cual (de la más específica a la más general)
+    for codigo_barras, cantidad in por_codigo.items():
+        if cantidad > limite_item:
+            infracciones.append(Infraccion(POR_ITEM, codigo_barras, cantidad, politica.max_por_item))
+
+    for comodin, cantidad in por_comodin.items():
+        if cantidad > limite_comodin:
+            infracciones.append(Infraccion(POR_COMODIN, comodin, cantidad, politica.max_por_comodin))
+
+    if politica.max_por_lote is not None and total > politica.max_por_lote:
+        infracciones.append(Infraccion(POR_LOTE, "", total, politica.max_por_lote))
+
+    posiciones = posiciones_rollo(total, columnas)
+    if politica.etiquetas_por_rollo is not None and posiciones > politica.etiquetas_por_rollo:
+        infracciones.append(Infraccion(POR_ROLLO, "", posiciones, politica.etiquetas_por_rollo))
+
+    return EvaluacionLote(infracciones, partes, total)
+
+
+def describir_infracciones(infracciones: Sequence[Infraccion]) -> str:
+    """
+    Mensaje de error de un lote rechazado
+
+    Args:
+        infracciones: Infracciones del lote
+
+    Returns:
+        str: Las primeras MAX_INFRACCIONES_MENSAJE descripciones
+    """
+    mensaje = "El lote excede los límites de impresión: " + "; ".join(
+        infraccion.descripcion() for infraccion in infracciones[:MAX_INFRACCIONES_MENSAJE]
+    )
+    if len(infracciones) > MAX_INFRACCIONES_MENSAJE:
+        mensaje += f" (y {len(infracciones) - MAX_INFRACCIONES_MENSAJE} más)"
+    return mensaje
+
+
+def verificar(
+    items: Sequence[Tuple[str, int]],
+    politica: PoliticaCantidades,
+    columnas: int = 1
+) -> None:
+    """
+    Rechaza un lote que no cumple la política (sin proponer división)
+
+    Los generadores de EPL la usan para no producir un lote que nadie
+    evaluó; dividir_seleccion entrega partes que siempre la cumplen.
+
+    Args:
+        items: Tuplas (codigo_barras, cantidad)
+        politica: Límites a aplicar
+        columnas: Etiquetas por fila del rollo
+
+    Raises:
+        ValueError: Si el lote excede algún límite o tiene cantidades menores a 1
+    """
+    evaluacion = evaluar(items, politica, columnas)
+    if not evaluacion.dentro_de_limites:
+        raise ValueError(describir_infracciones(evaluacion.infracciones))
+
+
+def controlar(
+    items: Iterable[Tuple[str, int]],
+    politica: PoliticaCantidades,
+    columnas: int = 1
+) -> Iterator[Tuple[str, int]]:
+    """
+    Entrega los ítems de un lote en streaming verificando la política
+
+    Equivale a verificar para lotes que no caben en memoria, pero el límite
+    excedido se detecta al leer el ítem que lo excede. Los ítems con
+    cantidad menor a 1 se entregan sin contar (el pipeline los reporta).
+
+    Args:
+        items: Tuplas (codigo_barras, cantidad); puede ser un iterador
+        politica: Límites a aplicar
+        columnas: Etiquetas por fila del rollo
+
+    Yields:
+        tuple: Los mismos ítems, en orden
+
+    Raises:
+        ValueError: Al llegar al primer ítem que excede un límite
+    """
+    total = 0
+    por_comodin: Dict[str, int] = {}
+    por_codigo: Dict[str, int] = {}
+
+    for codigo_barras, cantidad in items:
+        if isinstance(cantidad, int) and cantidad >= 1:
+            comodin = codigo_barras[:MAX_COMODIN_LENGTH]
+            total += cantidad
+            por_comodin[comodin] = por_comodin.get(comodin, 0) + cantidad
+            por_codigo[codigo_barras] = por_codigo.get(codigo_barras, 0) + cantidad
+
+            infraccion = None
+            if politica.max_por_item is not None and por_codigo[codigo_barras] > politica.max_por_item:
+                infraccion = Infraccion(POR_ITEM, codigo_barras, por_codigo[codigo_barras], politica.max_por_item)
+            elif politica.max_por_comodin is not None and por_comodin[comodin] > politica.max_por_comodin:
+                infraccion = Infraccion(POR_COMODIN, comodin, por_comodin[comodin], politica.max_por_comodin)
+            elif politica.max_por_lote is not None and total > politica.max_por_lote:
+                infraccion = Infraccion(POR_LOTE, "", total, politica.max_por_lote)
+            elif politica.etiquetas_por_rollo is not None and \
+                    posiciones_rollo(total, columnas) > politica.etiquetas_por_rollo:
+                infraccion = Infraccion(
+                    POR_ROLLO, "", posiciones_rollo(total, columnas), politica.etiquetas_por_rollo
+                )
+
+            if infraccion is not None:
+                raise ValueError(describir_infracciones([infraccion]))
+
+        yield codigo_barras, cantidad
+
+
+def dividir_seleccion(
+    seleccion: Dict[str, Tuple[str, int]],
+    politica: PoliticaCantidades,
+    columnas: int = 1
+) -> Tuple[EvaluacionLote, List[Dict[str, Tuple[str, int]]]]:
+    """
+    Evalúa una selección de TAB 2 y la reparte en lotes que cumplen la política
+
+    Args:
+        seleccion: {codigo_id: (codigo_barras, cantidad)}
+        politica: Límites a aplicar
+        columnas: Etiquetas por fila del rollo
+
+    Returns:
+        tuple: (evaluación, lotes con el mismo formato que la selección)
+    """
+    claves = list(seleccion)
+    valores = list(seleccion.values())
+    evaluacion = evaluar(valores, politica, columnas)
+
+    lotes = [
+        {claves[indice]: (valores[indice][0], cantidad) for indice, cantidad in parte}
+        for parte in evaluacion.partes
+    ]
+
+    return evaluacion, lotes
@@ -0,0 +1,267 @@
+"""
+Resilience Module for JYE Barcode System
+Retry policy, deadlines, circuit breaker and typed errors for data-layer calls
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+import httpx
+from postgrest.exceptions import APIError
+
+T = TypeVar("T")
+
+# Clases de SQLSTATE de PostgreSQL que indican fallas transitorias:
+# 08 conexión, 40 rollback de transacción, 53 recursos, 57 intervención (timeouts)
+SQLSTATE_TRANSITORIOS = ("08", "40", "53", "57")
+
+# Errores de PostgREST al conectar con la base de datos (PGRST000-PGRST003)
+PGRST_TRANSITORIOS = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+# Códigos HTTP que vale la pena reintentar
+HTTP_TRANSITORIOS = (408, 429, 500, 502, 503, 504)
+
+# Mensajes de SQLite por contención de locks (la base local sigue disponible)
+SQLITE_TRANSITORIOS = ("database is locked", "database is busy")
+
+
+class ErrorBaseDatos(Exception):
+    """Error base de la capa de datos (nunca equivale a un resultado vacío)"""
+
+    def __init__(self, mensaje: str, operacion: str = "", causa: Optional[Exception] = None):
+        super().__init__(mensaje)
+        self.operacion = operacion
+        self.causa = causa
+
+
+class ErrorTransitorio(ErrorBaseDatos):
+    """Falla de red o de disponibilidad que persistió tras los reintentos"""
+
+
+class PlazoAgotado(ErrorTransitorio):
+    """La operación no terminó dentro de su plazo"""
+
+
+class CircuitoAbierto(ErrorBaseDatos):
+    """La base de datos se considera caída; la llamada se rechazó sin intentarla"""
+
+    def __init__(self, mensaje: str, operacion: str = "", reintentar_en: float = 0.0):
+        super().__init__(mensaje, operacion)
+        self.reintentar_en = reintentar_en
+
+
+class ErrorPermanente(ErrorBaseDatos):
+    """Error que no se resuelve reintentando (restricciones, permisos, datos inválidos)"""
+
+
+def es_error_transitorio(error: Exception) -> bool:
+    """
+    Clasifica una excepción del backend de datos (Supabase o SQLite)
+
+    Args:
+        error: Excepción lanzada por el cliente
+
+    Returns:
+        bool: True si la falla puede resolverse reintentando
+    """
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in HTTP_TRANSITORIOS
+
+    if isinstance(error, APIError):
+        codigo = str(error.code or "")
+        return codigo in PGRST_TRANSITORIOS or codigo.startswith(SQLSTATE_TRANSITORIOS)
+
+    if isinstance(error, sqlite3.OperationalError):
+        return str(error).startswith(SQLITE_TRANSITORIOS)
+
+    return False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker compartido por todas las sesiones del proceso
+
+    Tras umbral_fallos fallas transitorias consecutivas el circuito se abre y
+    las llamadas fallan de inmediato con CircuitoAbierto durante
+    tiempo_reset segundos. Luego se permite una llamada de prueba
+    (semiabierto): si tiene éxito el circuito se cierra, si falla se reabre.
+    """
+
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, umbral_fallos: int = 5, tiempo_reset: float = 30.0):
+        """
+        Args:
+            umbral_fallos: Fallas consecutivas que abren el circuito
+            tiempo_reset: Segundos que el circuito permanece abierto
+        """
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_reset = tiempo_reset
+        self.estado = self.CERRADO
+        self._fallos = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self, operacion: str = "") -> None:
+        """
+        Verifica si se permite una llamada
+
+        Args:
+            operacion: Nombre de la operación (para el mensaje de error)
+
+        Raises:
+            CircuitoAbierto: Si el circuito está abierto
+        """
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return
+
+            restante = self._abierto_desde + self.tiempo_reset - time.monotonic()
+
+            if self.estado == self.ABIERTO and restante <= 0:
+                self.estado = self.SEMIABIERTO
+
+            if self.estado == self.SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return
+
+            raise CircuitoAbierto(
+                "La base de datos no está disponible. "
+                f"Se reintentará en {max(restante, 0):.0f} s",
+                operacion,
+                reintentar_en=max(restante, 0.0)
+            )
+
+    def registrar_exito(self) -> None:
+        """Registra una llamada exitosa y cierra el circuito"""
+        with self._lock:
+            self.estado = self.CERRADO
+            self._fallos = 0
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        """Registra una falla transitoria y abre el circuito si se supera el umbral"""
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+
+            if self.estado == self.SEMIABIERTO or self._fallos >= self.umbral_fallos:
+                self.estado = self.ABIERTO
+                self._abierto_desde = time.monotonic()
+
+
+@dataclass
+class PoliticaReintentos:
+    """
+    Política de reintentos con backoff exponencial y jitter completo
+
+    Attributes:
+        intentos: Número máximo de intentos (incluye el primero)
+        espera_base: Espera base en segundos para el primer reintento
+        espera_maxima: Tope de espera entre intentos en segundos
+    """
+    intentos: int = 3
+    espera_base: float = 0.2
+    espera_maxima: float = 2.0
+
+    def espera(self, intento: int) -> float:
+        """
+        Calcula la espera antes del siguiente intento
+
+        Args:
+            intento: Número de intento fallido (desde 1)
+
+        Returns:
+            float: Segundos a esperar (aleatorio entre 0 y el tope exponencial)
+        """
+        tope = min(self.espera_maxima, self.espera_base * (2 ** (intento - 1)))
+        return random.uniform(0, tope)
+
+
+# Instancias compartidas por el proceso
+circuito_supabase = CircuitBreaker()
+POLITICA_DEFAULT = PoliticaReintentos()
+
+
+def ejecutar(
+    operacion: Callable[[], T],
+    nombre: str,
+    idempotente: bool,
+    plazo: float,
+    politica: PoliticaReintentos = POLITICA_DEFAULT,
+    circuito: CircuitBreaker = circuito_supabase
+) -> T:
+    """
+    Ejecuta una llamada a la base de datos aplicando la política de resiliencia
+
+    Las operaciones idempotentes se reintentan ante fallas transitorias con
+    backoff exponencial con jitter mientras quede plazo. Las no idempotentes
+    se intentan una sola vez.
+
+    Args:
+        operacion: Función sin argumentos que realiza la llamada
+        nombre: Nombre legible de la operación (para mensajes de error)
+        idempotente: True si es seguro repetir la llamada
+        plazo: Segundos máximos para completar la operación (todos los intentos)
+        politica: Política de reintentos
+        circuito: Circuit breaker a consultar y actualizar
+
+    Returns:
+        Resultado de la operación
+
+    Raises:
+        CircuitoAbierto: Si la base de datos se considera caída
+        PlazoAgotado: Si se agotó el plazo reintentando
+        ErrorTransitorio: Si la falla transitoria persistió tras los reintentos
+        ErrorPermanente: Si la falla no es transitoria
+    """
+    limite = time.monotonic() + plazo
+    intentos = politica.intentos if idempotente else 1
+    ultimo_error: Optional[Exception] = None
+
+    for intento in range(1, intentos + 1):
+        circuito.permitir(nombre)
+
+        try:
+            resultado = operacion()
+        except Exception as e:
+            if not es_error_transitorio(e):
+                # La base respondió: no cuenta como caída
+                circuito.registrar_exito()
+                raise ErrorPermanente(f"Error al {nombre}: {str(e)}", nombre, e)
+
+            circuito.registrar_fallo()
+            ultimo_error = e
+
+            if intento == intentos:
+                break
+
+            espera = politica.espera(intento)
+            if time.monotonic() + espera >= limite:
+                raise PlazoAgotado(
+                    f"No se pudo {nombre} dentro del plazo de {plazo:.0f} s: {str(e)}",
+                    nombre,
+                    e
+                )
+
+            time.sleep(espera)
+            continue
+
+        circuito.registrar_exito()
+        return resultado
+
+    raise ErrorTransitorio(
+        f"No se pudo {nombre} tras {intentos} intento(s): {str(ultimo_error)}",
+        nombre,
+        ultimo_error
+    )
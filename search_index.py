@@ -0,0 +1,215 @@
+"""
+Search Index Module for JYE Barcode System
+In-memory sorted index over codigo_barras and tbc_sku for local prefix
+(typeahead) search, kept current incrementally
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from models import CodigoBarras
+
+# Posición de sincronización: (fecha_creacion, id) del último código indexado
+Marca = Tuple[str, str]
+
+# Columnas necesarias para construir el índice
+COLUMNAS_INDICE = ["id", "codigo_barras", "tbc_sku", "comodin_proveedor", "fecha_creacion"]
+
+# Coincidencias devueltas por defecto
+LIMITE_SUGERENCIAS = 10
+
+# Segundos mínimos entre sincronizaciones con la base de datos
+INTERVALO_SINCRONIZACION = 15.0
+
+
+class EntradaIndice(NamedTuple):
+    """Código indexado"""
+    id: str
+    codigo_barras: str
+    tbc_sku: str
+    comodin_proveedor: str
+
+
+class IndicePrefijos:
+    """
+    Índice ordenado para búsqueda por prefijo
+
+    Mantiene dos listas ordenadas: los códigos de barras y los pares
+    (sku, codigo_barras). Un prefijo se resuelve con bisect en O(log n) y
+    las coincidencias son un rango contiguo de la lista, por lo que el
+    top-N se obtiene sin recorrer el resto del índice.
+    """
+
+    def __init__(self):
+        self._codigos: List[str] = []
+        self._skus: List[Tuple[str, str]] = []
+        self._entradas: Dict[str, EntradaIndice] = {}
+        self._lock = threading.RLock()
+        self._lock_construccion = threading.Lock()
+        self._ultima_sincronizacion = 0.0
+
+        # True una vez cargada la tabla completa (ver construir)
+        self.construido = False
+
+        # (fecha_creacion, id) más reciente indexado (marca para sincronizar)
+        self.marca: Optional[Marca] = None
+
+    def __len__(self) -> int:
+        return len(self._codigos)
+
+    def agregar(self, registro: CodigoBarras) -> None:
+        """
+        Agrega (o ignora si ya existe) un código creado en esta instancia
+
+        No mueve la marca de sincronización: los códigos que otras instancias
+        hayan creado antes que este todavía deben llegar por sincronizar.
+
+        Args:
+            registro: Registro devuelto por db.crear_codigo_barras
+        """
+        codigo = registro.codigo_barras
+
+        with self._lock:
+            if codigo not in self._entradas:
+                self._entradas[codigo] = EntradaIndice(
+                    registro.id,
+                    codigo,
+                    registro.tbc_sku,
+                    registro.comodin_proveedor,
+                )
+                bisect.insort(self._codigos, codigo)
+                bisect.insort(self._skus, (registro.tbc_sku, codigo))
+
+    def agregar_muchos(self, registros: Iterable[Dict[str, Any]]) -> None:
+        """
+        Agrega registros en bloque (carga inicial) reordenando una sola vez
+
+        Args:
+            registros: Registros a indexar
+        """
+        with self._lock:
+            for registro in registros:
+                codigo = registro["codigo_barras"]
+                if codigo in self._entradas:
+                    continue
+
+                self._entradas[codigo] = EntradaIndice(
+                    registro["id"],
+                    codigo,
+                    registro["tbc_sku"],
+                    registro["comodin_proveedor"],
+                )
+                self._codigos.append(codigo)
+                self._skus.append((registro["tbc_sku"], codigo))
+
+                fecha = registro.get("fecha_creacion")
+                if fecha and (self.marca is None or (fecha, registro["id"]) > self.marca):
+                    self.marca = (fecha, registro["id"])
+
+            self._codigos.sort()
+            self._skus.sort()
+
+    def construir(self, paginas: Iterable[Iterable[Dict[str, Any]]]) -> None:
+        """
+        Carga la tabla completa una sola vez (las sesiones concurrentes esperan)
+
+        Si la carga falla el índice queda sin construir y se reintenta en el
+        siguiente uso.
+
+        Args:
+            paginas: Páginas de registros (p.ej. exporter.iterar_codigos)
+        """
+        with self._lock_construccion:
+            if self.construido:
+                return
+
+            for pagina in paginas:
+                self.agregar_muchos(pagina)
+
+            self.construido = True
+
+    def buscar(self, prefijo: str, limite: int = LIMITE_SUGERENCIAS) -> List[EntradaIndice]:
+        """
+        Busca códigos cuyo código de barras o SKU empiece con el prefijo
+
+        Las coincidencias por código de barras van primero, luego las de SKU.
+
+        Args:
+            prefijo: Dígitos iniciales del código o del SKU
+            limite: Número máximo de resultados
+
+        Returns:
+            list: Hasta `limite` entradas, sin duplicados
+        """
+        if not prefijo:
+            return []
+
+        resultados: List[EntradaIndice] = []
+        vistos = set()
+
+        with self._lock:
+            # Coincidencias por código de barras
+            inicio = bisect.bisect_left(self._codigos, prefijo)
+            for codigo in self._codigos[inicio:inicio + limite]:
+                if not codigo.startswith(prefijo):
+                    break
+                resultados.append(self._entradas[codigo])
+                vistos.add(codigo)
+
+            # Coincidencias por SKU
+            inicio = bisect.bisect_left(self._skus, (prefijo, ""))
+            indice = inicio
+            while len(resultados) < limite and indice < len(self._skus):
+                sku, codigo = self._skus[indice]
+                if not sku.startswith(prefijo):
+                    break
+                if codigo not in vistos:
+                    resultados.append(self._entradas[codigo])
+                    vistos.add(codigo)
+                indice += 1
+
+        return resultados[:limite]
+
+    def sincronizar(
+        self,
+        obtener_nuevos: Callable[[Optional[Marca]], List[Dict[str, Any]]],
+        intervalo: float = INTERVALO_SINCRONIZACION
+    ) -> int:
+        """
+        Incorpora los códigos creados desde la última marca (p.ej. por otras instancias)
+
+        La marca es el par (fecha_creacion, id), así que los códigos creados
+        en la misma transacción (misma fecha) no se pierden entre páginas.
+
+        Args:
+            obtener_nuevos: Función que recibe la marca y devuelve los registros
+                posteriores a ella en orden (fecha_creacion, id)
+                (db.obtener_codigos_creados_desde)
+            intervalo: Segundos mínimos entre sincronizaciones
+
+        Returns:
+            int: Número de registros incorporados
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora - self._ultima_sincronizacion < intervalo:
+                return 0
+            self._ultima_sincronizacion = ahora
+            marca = self.marca
+
+        total = 0
+        while True:
+            nuevos = obtener_nuevos(marca)
+            if not nuevos:
+                break
+
+            self.agregar_muchos(nuevos)
+            total += len(nuevos)
+
+            if self.marca == marca:
+                break
+            marca = self.marca
+
+        return total
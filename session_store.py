@@ -0,0 +1,216 @@
+"""
+Session Store Module for JYE Barcode System
+Compact columnar storage for filtered results, shared across sessions with the
+same filter and bounded per session by a memory cap
+"""
+
+import sys
+import threading
+import time
+import uuid
+import weakref
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# COLUMNAS_GRID: columnas que necesita la grilla de TAB 2 (proyección del select)
+from models import COLUMNAS_GRID, CodigoBarras
+
+# Límite de memoria de resultados por sesión (configurable desde secrets)
+MAX_MEMORIA_SESION_MB = 8
+
+# Segundos durante los que un resultado se comparte con otras sesiones
+TTL_COMPARTIDO = 30.0
+
+
+class FilaGrid(NamedTuple):
+    """Fila de la grilla de TAB 2"""
+    id: str
+    codigo_barras: str
+    tbc_sku: str
+    comodin_proveedor: str
+
+
+class ResultadoColumnar:
+    """
+    Resultado de un filtro almacenado por columnas
+
+    En lugar de una lista de dicts, cada columna se guarda en su forma más
+    compacta: los UUID como 16 bytes contiguos, los códigos de 8 dígitos como
+    enteros de 32 bits y los SKU/comodines como strings internados (se repiten
+    mucho entre filas).
+    """
+
+    __slots__ = ("_ids", "_codigos", "_skus", "_comodines", "creado", "version", "tamano_bytes", "__weakref__")
+
+    def __init__(self, filas: List[CodigoBarras]):
+        """
+        Args:
+            filas: Registros consultados con al menos las columnas de COLUMNAS_GRID
+        """
+        self._ids = bytearray()
+        self._codigos = array("I")
+        self._skus: List[str] = []
+        self._comodines: List[str] = []
+
+        for fila in filas:
+            self._ids += uuid.UUID(fila.id).bytes
+            self._codigos.append(int(fila.codigo_barras))
+            self._skus.append(sys.intern(fila.tbc_sku))
+            self._comodines.append(sys.intern(fila.comodin_proveedor))
+
+        self.creado = time.monotonic()
+        self.version: Any = None
+        self.tamano_bytes = (
+            sys.getsizeof(self._ids)
+            + sys.getsizeof(self._codigos)
+            + sys.getsizeof(self._skus)
+            + sys.getsizeof(self._comodines)
+        )
+
+    def __len__(self) -> int:
+        return len(self._codigos)
+
+    def fila(self, indice: int) -> FilaGrid:
+        """
+        Reconstruye una fila
+
+        Args:
+            indice: Posición de la fila
+
+        Returns:
+            FilaGrid: Fila con los valores originales
+        """
+        return FilaGrid(
+            id=str(uuid.UUID(bytes=bytes(self._ids[indice * 16:(indice + 1) * 16]))),
+            codigo_barras=f"{self._codigos[indice]:08d}",
+            tbc_sku=self._skus[indice],
+            comodin_proveedor=self._comodines[indice],
+        )
+
+    def filas(self, limite: Optional[int] = None) -> Iterator[FilaGrid]:
+        """
+        Itera las filas sin materializar la lista completa
+
+        Args:
+            limite: Número máximo de filas a devolver
+
+        Yields:
+            FilaGrid: Filas en el orden original
+        """
+        total = len(self) if limite is None else min(limite, len(self))
+        for indice in range(total):
+            yield self.fila(indice)
+
+
+class AlmacenCompartido:
+    """
+    Resultados compartidos entre sesiones por clave de filtro
+
+    Guarda referencias débiles: un resultado vive mientras alguna sesión lo
+    tenga en su ResultadosSesion, así que la memoria total queda acotada por
+    la suma de los límites por sesión.
+    """
+
+    def __init__(self, ttl: float = TTL_COMPARTIDO):
+        """
+        Args:
+            ttl: Segundos durante los que un resultado se reutiliza
+        """
+        self.ttl = ttl
+        self._resultados: "weakref.WeakValueDictionary[Tuple, ResultadoColumnar]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def obtener_o_cargar(
+        self,
+        clave: Tuple,
+        cargar: Callable[[], List[CodigoBarras]],
+        version: Any = None
+    ) -> ResultadoColumnar:
+        """
+        Devuelve el resultado compartido o lo carga si no existe o expiró
+
+        Args:
+            clave: Clave del filtro (ver clave_filtros)
+            cargar: Función que consulta las filas en la base de datos
+            version: Versión de los datos de origen; un resultado creado con
+                otra versión se vuelve a cargar (p.ej. tras una impresión)
+
+        Returns:
+            ResultadoColumnar: Resultado para la clave
+        """
+        with self._lock:
+            resultado = self._resultados.get(clave)
+            if (
+                resultado is not None
+                and resultado.version == version
+                and time.monotonic() - resultado.creado < self.ttl
+            ):
+                return resultado
+
+        resultado = ResultadoColumnar(cargar())
+        resultado.version = version
+
+        with self._lock:
+            self._resultados[clave] = resultado
+
+        return resultado
+
+    def __len__(self) -> int:
+        return len(self._resultados)
+
+
+class ResultadosSesion:
+    """
+    Resultados retenidos por una sesión con límite de memoria
+
+    Al superar el límite se descartan los resultados más antiguos; el más
+    reciente (el que se está mostrando) siempre se conserva.
+    """
+
+    def __init__(self, max_bytes: int = MAX_MEMORIA_SESION_MB * 1024 * 1024):
+        """
+        Args:
+            max_bytes: Memoria máxima de resultados retenidos por la sesión
+        """
+        self.max_bytes = max_bytes
+        self._resultados: "OrderedDict[Tuple, ResultadoColumnar]" = OrderedDict()
+
+    def agregar(self, clave: Tuple, resultado: ResultadoColumnar) -> None:
+        """
+        Registra un resultado como el más reciente y aplica el límite de memoria
+
+        Args:
+            clave: Clave del filtro
+            resultado: Resultado a retener
+        """
+        self._resultados.pop(clave, None)
+        self._resultados[clave] = resultado
+
+        while len(self._resultados) > 1 and self.tamano_bytes > self.max_bytes:
+            self._resultados.popitem(last=False)
+
+    @property
+    def tamano_bytes(self) -> int:
+        """Memoria estimada de los resultados retenidos"""
+        return sum(r.tamano_bytes for r in self._resultados.values())
+
+    def __len__(self) -> int:
+        return len(self._resultados)
+
+
+def clave_filtros(filtros: Dict[str, Any], columnas: str = COLUMNAS_GRID) -> Tuple:
+    """
+    Construye una clave hashable y estable a partir de un diccionario de filtros
+
+    Args:
+        filtros: Filtros de db.obtener_codigos
+        columnas: Proyección solicitada
+
+    Returns:
+        tuple: Clave para AlmacenCompartido y ResultadosSesion
+    """
+    return (columnas,) + tuple(
+        (nombre, valor.isoformat() if hasattr(valor, "isoformat") else valor)
+        for nombre, valor in sorted(filtros.items())
+    )
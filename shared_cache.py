@@ -0,0 +1,335 @@
+"""
+Shared Cache Module for JYE Barcode System
+Process-wide LRU cache with per-entry TTL, size bound, tag-based invalidation
+and hit-rate statistics, shared by every Streamlit session
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+# Peso máximo total del caché (filas de resultados, 1 por valor escalar)
+MAX_PESO = 50000
+
+# Vida por defecto de una entrada en segundos
+TTL_DEFAULT = 60.0
+
+
+def peso_valor(valor: Any) -> int:
+    """
+    Estima el peso de un valor cacheado
+
+    Args:
+        valor: Valor a guardar
+
+    Returns:
+        int: Número de elementos si es una lista/tupla, 1 en otro caso
+    """
+    if isinstance(valor, (list, tuple)):
+        return max(len(valor), 1)
+    return 1
+
+
+class _Entrada:
+    """Entrada del caché"""
+
+    __slots__ = ("valor", "expira", "etiquetas", "peso")
+
+    def __init__(self, valor: Any, expira: float, etiquetas: Set[str], peso: int):
+        self.valor = valor
+        self.expira = expira
+        self.etiquetas = etiquetas
+        self.peso = peso
+
+
+class CacheCompartido:
+    """
+    Caché LRU seguro para hilos
+
+    Cada entrada tiene su propio TTL y un conjunto de etiquetas. Las
+    escrituras invalidan solo las entradas con las etiquetas afectadas; cada
+    invalidación incrementa la versión de la etiqueta para que los consumidores
+    que guardan derivados (p.ej. resultados columnares) detecten el cambio.
+
+    Los valores se comparten entre sesiones: no deben modificarse.
+    """
+
+    def __init__(self, max_peso: int = MAX_PESO, ttl_default: float = TTL_DEFAULT):
+        """
+        Args:
+            max_peso: Peso total máximo antes de desalojar las entradas menos usadas
+            ttl_default: TTL por defecto en segundos
+        """
+        self.max_peso = max_peso
+        self.ttl_default = ttl_default
+        self._entradas: "OrderedDict[Tuple, _Entrada]" = OrderedDict()
+        self._versiones: Dict[str, int] = {}
+        # Número de invalidaciones y en cuál se invalidó cada etiqueta ("" = todas)
+        self._secuencia = 0
+        self._invalidada_en: Dict[str, int] = {}
+        self._peso = 0
+        self._lock = threading.RLock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave: Tuple) -> Tuple[bool, Any]:
+        """
+        Busca una entrada vigente
+
+        Args:
+            clave: Clave de la entrada
+
+        Returns:
+            tuple: (encontrado, valor)
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+
+            if entrada is None or entrada.expira <= time.monotonic():
+                if entrada is not None:
+                    self._eliminar(clave)
+                self.fallos += 1
+                return False, None
+
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return True, entrada.valor
+
+    def guardar(
+        self,
+        clave: Tuple,
+        valor: Any,
+        ttl: Optional[float] = None,
+        etiquetas: Iterable[str] = ()
+    ) -> None:
+        """
+        Guarda una entrada y desaloja las menos usadas si se supera el peso máximo
+
+        Args:
+            clave: Clave de la entrada
+            valor: Valor a guardar
+            ttl: Segundos de vida (default: ttl_default)
+            etiquetas: Etiquetas para invalidación selectiva
+        """
+        peso = peso_valor(valor)
+        if peso > self.max_peso:
+            return
+
+        expira = time.monotonic() + (self.ttl_default if ttl is None else ttl)
+
+        with self._lock:
+            if clave in self._entradas:
+                self._eliminar(clave)
+
+            self._entradas[clave] = _Entrada(valor, expira, set(etiquetas), peso)
+            self._peso += peso
+
+            while self._peso > self.max_peso:
+                self._eliminar(next(iter(self._entradas)))
+
+    def obtener_o_cargar(
+        self,
+        clave: Tuple,
+        cargar: Callable[[], Any],
+        ttl: Optional[float] = None,
+        etiquetas: Iterable[str] = (),
+        etiquetas_valor: Optional[Callable[[Any], Iterable[str]]] = None
+    ) -> Any:
+        """
+        Devuelve la entrada cacheada o la carga y la guarda
+
+        Si una etiqueta se invalida mientras se carga, el valor se devuelve
+        pero no se guarda (podría estar desactualizado). Esto incluye las
+        etiquetas que agrega etiquetas_valor: una escritura sobre el registro
+        encontrado durante la carga también descarta el valor.
+
+        Args:
+            clave: Clave de la entrada
+            cargar: Función que obtiene el valor en caso de fallo
+            ttl: Segundos de vida
+            etiquetas: Etiquetas para invalidación selectiva
+            etiquetas_valor: Función que agrega etiquetas según el valor cargado
+                (p.ej. el id del registro encontrado)
+
+        Returns:
+            Valor cacheado o recién cargado
+        """
+        encontrado, valor = self.obtener(clave)
+        if encontrado:
+            return valor
+
+        etiquetas = tuple(etiquetas)
+        with self._lock:
+            secuencia_antes = self._secuencia
+
+        valor = cargar()
+
+        todas = etiquetas + tuple(etiquetas_valor(valor)) if etiquetas_valor else etiquetas
+
+        with self._lock:
+            if not self._invalidada_desde(secuencia_antes, todas):
+                self.guardar(clave, valor, ttl, todas)
+
+        return valor
+
+    def invalidar(self, *etiquetas: str) -> int:
+        """
+        Elimina las entradas con cualquiera de las etiquetas indicadas
+
+        Args:
+            etiquetas: Etiquetas a invalidar
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        objetivo = set(etiquetas)
+
+        with self._lock:
+            self._secuencia += 1
+            for etiqueta in objetivo:
+                self._versiones[etiqueta] = self._versiones.get(etiqueta, 0) + 1
+                self._invalidada_en[etiqueta] = self._secuencia
+
+            claves = [
+                clave for clave, entrada in self._entradas.items()
+                if entrada.etiquetas & objetivo
+            ]
+            for clave in claves:
+                self._eliminar(clave)
+
+            self.invalidaciones += 1
+            return len(claves)
+
+    def invalidar_todo(self) -> None:
+        """Elimina todas las entradas e incrementa la versión de todas las etiquetas"""
+        with self._lock:
+            # La versión global ("") se suma a la de todas las etiquetas
+            self._versiones[""] = self._versiones.get("", 0) + 1
+            self._secuencia += 1
+            self._invalidada_en[""] = self._secuencia
+
+            self._entradas.clear()
+            self._peso = 0
+            self.invalidaciones += 1
+
+    def version(self, etiqueta: str) -> int:
+        """
+        Versión actual de una etiqueta (cambia con cada invalidación)
+
+        Args:
+            etiqueta: Etiqueta a consultar
+
+        Returns:
+            int: Contador de invalidaciones de la etiqueta y globales
+        """
+        with self._lock:
+            return self._versiones.get(etiqueta, 0) + self._versiones.get("", 0)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """
+        Métricas del caché
+
+        Returns:
+            dict: aciertos, fallos, tasa_aciertos, entradas, peso, invalidaciones
+        """
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "entradas": len(self._entradas),
+                "peso": self._peso,
+                "invalidaciones": self.invalidaciones,
+            }
+
+    def _invalidada_desde(self, secuencia: int, etiquetas: Iterable[str]) -> bool:
+        """True si alguna etiqueta (o todo el caché) se invalidó después de `secuencia` (requiere el lock)"""
+        return any(self._invalidada_en.get(etiqueta, 0) > secuencia for etiqueta in ("",) + tuple(etiquetas))
+
+    def _eliminar(self, clave: Tuple) -> None:
+        """Elimina una entrada (requiere el lock)"""
+        entrada = self._entradas.pop(clave)
+        self._peso -= entrada.peso
+
+
+class VigilanteCambios:
+    """
+    Detecta cambios hechos por otras instancias de la aplicación
+
+    Consulta una marca de agua (p.ej. las fechas máximas de creación e
+    impresión) como máximo cada `intervalo` segundos; si cambió, invalida
+    todo el caché. Las escrituras de esta instancia ya invalidan sus
+    etiquetas, así que cada una incorpora su propia fecha a la marca con
+    registrar_escritura (sin consultar la base de datos) para no invalidar
+    todo otra vez en la siguiente consulta.
+    """
+
+    def __init__(
+        self,
+        cache: CacheCompartido,
+        consultar_marca: Callable[[], Any],
+        intervalo: float = 15.0
+    ):
+        """
+        Args:
+            cache: Caché a invalidar
+            consultar_marca: Función que devuelve la marca de agua actual
+            intervalo: Segundos mínimos entre consultas
+        """
+        self.cache = cache
+        self.consultar_marca = consultar_marca
+        self.intervalo = intervalo
+        self._marca: Any = None
+        self._ultima_consulta = 0.0
+        self._lock = threading.Lock()
+
+    def verificar(self) -> bool:
+        """
+        Consulta la marca de agua si ya pasó el intervalo
+
+        Returns:
+            bool: True si se detectó un cambio y se invalidó el caché
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora - self._ultima_consulta < self.intervalo:
+                return False
+            self._ultima_consulta = ahora
+
+        marca = self.consultar_marca()
+
+        with self._lock:
+            cambio = self._marca is not None and marca != self._marca
+            self._marca = marca
+
+        if cambio:
+            self.cache.invalidar_todo()
+
+        return cambio
+
+    def registrar_escritura(self, marca: Tuple[Optional[Any], ...]) -> None:
+        """
+        Incorpora a la marca de agua conocida una escritura de esta instancia
+
+        La marca es una tupla de valores comparables (p.ej. fechas ISO); cada
+        componente conocido de la escritura reemplaza al actual si es mayor.
+        No consulta la base de datos: si otra instancia escribió algo más
+        reciente, la siguiente consulta programada lo detecta igual. Antes de
+        la primera consulta no hay marca que actualizar.
+
+        Args:
+            marca: Componentes de la marca que cambió la escritura (None en
+                los que no cambió)
+        """
+        with self._lock:
+            if self._marca is None:
+                return
+
+            self._marca = tuple(
+                actual if nuevo is None or (actual is not None and actual >= nuevo) else nuevo
+                for actual, nuevo in zip(self._marca, marca)
+            )
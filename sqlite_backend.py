@@ -0,0 +1,599 @@
+"""
+SQLite Backend Module for JYE Barcode System
+Local SQLite implementation of the data backend (WAL mode, cached prepared
+statements) with optional asynchronous replication to Supabase
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from backends import BackendDatos, COLUMNAS_EVENTOS, COLUMNAS_TABLA
+from resilience import es_error_transitorio
+
+# Ruta por defecto de la base local
+RUTA_DEFAULT = "codigos_barras.db"
+
+# Milisegundos que una conexión espera un lock antes de fallar
+BUSY_TIMEOUT_MS = 5000
+
+# Sentencias preparadas que sqlite3 conserva por conexión
+SENTENCIAS_CACHEADAS = 256
+
+# Operaciones pendientes enviadas a Supabase por ciclo de replicación
+LOTE_REPLICACION = 500
+
+# Códigos por página al importar la tabla existente de Supabase
+PAGINA_IMPORTACION = 1000
+
+# Mismo esquema, restricciones e índices que el DDL de Supabase (README, sección 4.2)
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS codigos_barras (
+  id TEXT PRIMARY KEY,
+  codigo_barras TEXT UNIQUE NOT NULL,
+  comodin_proveedor TEXT NOT NULL,
+  tbc_sku TEXT NOT NULL,
+  fecha_creacion TEXT NOT NULL,
+  impreso INTEGER NOT NULL DEFAULT 0,
+  fecha_impresion TEXT,
+
+  CONSTRAINT unique_comodin_sku UNIQUE (comodin_proveedor, tbc_sku),
+  CONSTRAINT check_codigo_length CHECK (length(codigo_barras) = 8),
+  CONSTRAINT check_codigo_numeric CHECK (codigo_barras GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]'),
+  CONSTRAINT check_comodin_length CHECK (length(comodin_proveedor) <= 3),
+  CONSTRAINT check_sku_length CHECK (length(tbc_sku) <= 5)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tbc_sku ON codigos_barras(tbc_sku);
+CREATE INDEX IF NOT EXISTS idx_comodin ON codigos_barras(comodin_proveedor);
+CREATE INDEX IF NOT EXISTS idx_impreso ON codigos_barras(impreso);
+CREATE INDEX IF NOT EXISTS idx_fecha_creacion ON codigos_barras(fecha_creacion);
+CREATE INDEX IF NOT EXISTS idx_fecha_impresion ON codigos_barras(fecha_impresion);
+
+CREATE TABLE IF NOT EXISTS eventos_impresion (
+  id TEXT PRIMARY KEY,
+  codigo_id TEXT NOT NULL REFERENCES codigos_barras(id),
+  codigo_barras TEXT NOT NULL,
+  tipo TEXT NOT NULL CHECK (tipo IN ('lote', 'reimpresion', 'individual')),
+  cantidad INTEGER NOT NULL CHECK (cantidad > 0),
+  lote_id TEXT,
+  fecha TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_eventos_codigo_fecha ON eventos_impresion(codigo_id, fecha);
+
+CREATE TABLE IF NOT EXISTS replicacion_pendiente (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  operacion TEXT NOT NULL,
+  datos TEXT NOT NULL
+);
+
+-- Operaciones que la réplica rechazó de forma permanente (para revisión manual)
+CREATE TABLE IF NOT EXISTS replicacion_fallida (
+  seq INTEGER PRIMARY KEY,
+  operacion TEXT NOT NULL,
+  datos TEXT NOT NULL,
+  error TEXT NOT NULL,
+  fecha TEXT NOT NULL
+);
+
+-- Ids locales reemplazados por el id que el código ya tenía en la réplica
+CREATE TABLE IF NOT EXISTS alias_ids (
+  id_anterior TEXT PRIMARY KEY,
+  id_actual TEXT NOT NULL
+);
+
+-- Estado de la importación inicial desde la réplica
+CREATE TABLE IF NOT EXISTS estado_replicacion (
+  clave TEXT PRIMARY KEY,
+  valor TEXT NOT NULL
+);
+"""
+
+# codigo_barras ya tiene índice por su restricción UNIQUE (idx_codigo_barras en Postgres)
+
+SQL_INSERTAR = (
+    "INSERT INTO codigos_barras "
+    "(id, codigo_barras, comodin_proveedor, tbc_sku, fecha_creacion, impreso, fecha_impresion) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_EXISTE = "SELECT 1 FROM codigos_barras WHERE codigo_barras = ? LIMIT 1"
+SQL_MARCAR = "UPDATE codigos_barras SET impreso = 1, fecha_impresion = ? WHERE id = ?"
+SQL_COMODINES = "SELECT DISTINCT comodin_proveedor FROM codigos_barras ORDER BY comodin_proveedor"
+SQL_MARCA_AGUA = (
+    "SELECT MAX(fecha_creacion), MAX(fecha_impresion), "
+    "(SELECT MAX(fecha) FROM eventos_impresion) FROM codigos_barras"
+)
+SQL_INSERTAR_EVENTO = (
+    "INSERT OR IGNORE INTO eventos_impresion "
+    "(id, codigo_id, codigo_barras, tipo, cantidad, lote_id, fecha) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_EVENTOS_CODIGO = (
+    "SELECT id, codigo_id, codigo_barras, tipo, cantidad, lote_id, fecha "
+    "FROM eventos_impresion WHERE codigo_id = ? ORDER BY fecha DESC LIMIT ?"
+)
+SQL_PENDIENTE = "INSERT INTO replicacion_pendiente (operacion, datos) VALUES (?, ?)"
+SQL_SIGUIENTE_PENDIENTE = "SELECT seq, operacion, datos FROM replicacion_pendiente ORDER BY seq LIMIT 1"
+SQL_FALLIDA = "INSERT INTO replicacion_fallida (seq, operacion, datos, error, fecha) VALUES (?, ?, ?, ?, ?)"
+SQL_IMPORTAR = (
+    "INSERT OR IGNORE INTO codigos_barras "
+    "(id, codigo_barras, comodin_proveedor, tbc_sku, fecha_creacion, impreso, fecha_impresion) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_ID_POR_CODIGO = "SELECT id FROM codigos_barras WHERE codigo_barras = ?"
+SQL_ALIAS = (
+    "SELECT id_anterior, id_actual FROM alias_ids "
+    "WHERE id_anterior IN (SELECT value FROM json_each(?))"
+)
+SQL_LEER_ESTADO = "SELECT valor FROM estado_replicacion WHERE clave = ?"
+SQL_GUARDAR_ESTADO = "INSERT OR REPLACE INTO estado_replicacion (clave, valor) VALUES (?, ?)"
+SQL_ESTADISTICAS_COMODIN = (
+    "SELECT comodin_proveedor, COUNT(*), SUM(impreso), COUNT(*) - SUM(impreso) "
+    "FROM codigos_barras GROUP BY comodin_proveedor ORDER BY comodin_proveedor"
+)
+SQL_ESTADISTICAS_DIA = (
+    "SELECT substr(fecha_creacion, 1, 10) AS dia, COUNT(*) "
+    "FROM codigos_barras WHERE fecha_creacion >= ? GROUP BY dia ORDER BY dia"
+)
+
+
+def _columnas_sql(columnas: str) -> Tuple[str, List[str]]:
+    """
+    Traduce una proyección estilo PostgREST a columnas SQL
+
+    Args:
+        columnas: "*" o lista separada por comas
+
+    Returns:
+        tuple: (fragmento SQL, nombres de columnas)
+
+    Raises:
+        ValueError: Si alguna columna no existe (evita inyección en el SELECT)
+    """
+    if columnas.strip() == "*":
+        nombres = list(COLUMNAS_TABLA)
+    else:
+        nombres = [c.strip() for c in columnas.split(",") if c.strip()]
+        desconocidas = [c for c in nombres if c not in COLUMNAS_TABLA]
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas: {', '.join(desconocidas)}")
+
+    return ", ".join(nombres), nombres
+
+
+def _a_dict(fila: sqlite3.Row) -> Dict[str, Any]:
+    """Convierte una fila a diccionario con impreso como bool"""
+    registro = dict(fila)
+    if "impreso" in registro:
+        registro["impreso"] = bool(registro["impreso"])
+    return registro
+
+
+class BackendSQLite(BackendDatos):
+    """
+    Backend sobre un archivo SQLite local
+
+    Cada hilo usa su propia conexión; en modo WAL las lecturas no bloquean a
+    la escritura ni entre sí. Las sentencias usan SQL constante con
+    parámetros, por lo que sqlite3 las compila una vez por conexión y las
+    reutiliza desde su caché.
+
+    Con replicación activa, cada escritura se registra en la tabla
+    replicacion_pendiente dentro de la misma transacción, y replicar() la
+    aplica en Supabase en orden. Al iniciar, importar_replica() copia los
+    códigos que ya existían en Supabase para que la base local use sus
+    mismos ids.
+    """
+
+    def __init__(self, ruta: str = RUTA_DEFAULT, replica: Optional[BackendDatos] = None):
+        """
+        Args:
+            ruta: Ruta del archivo SQLite (":memory:" no se comparte entre hilos)
+            replica: Backend destino de la replicación (p.ej. BackendSupabase)
+        """
+        self.ruta = ruta
+        self.replica = replica
+        self._local = threading.local()
+        self._lock_replicacion = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo_replicacion: Optional[threading.Thread] = None
+
+        with self._conexion() as conexion:
+            conexion.executescript(ESQUEMA)
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Devuelve la conexión del hilo actual, creándola si no existe"""
+        conexion = getattr(self._local, "conexion", None)
+
+        if conexion is None:
+            conexion = sqlite3.connect(
+                self.ruta,
+                timeout=BUSY_TIMEOUT_MS / 1000,
+                cached_statements=SENTENCIAS_CACHEADAS,
+                check_same_thread=False,
+            )
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            conexion.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            # SQLite no aplica REFERENCES salvo que se active en cada conexión
+            conexion.execute("PRAGMA foreign_keys=ON")
+            self._local.conexion = conexion
+
+        return conexion
+
+    def _registrar_pendiente(self, conexion: sqlite3.Connection, operacion: str, datos: Dict[str, Any]) -> None:
+        """Encola una operación para replicar (dentro de la transacción en curso)"""
+        if self.replica is not None:
+            conexion.execute(SQL_PENDIENTE, (operacion, json.dumps(datos)))
+
+    def insertar_codigo(self, datos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        registro = {
+            "id": str(uuid.uuid4()),
+            "codigo_barras": datos["codigo_barras"],
+            "comodin_proveedor": datos["comodin_proveedor"],
+            "tbc_sku": datos["tbc_sku"],
+            "fecha_creacion": datetime.now(timezone.utc).isoformat(),
+            "impreso": bool(datos.get("impreso", False)),
+            "fecha_impresion": datos.get("fecha_impresion"),
+        }
+
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(SQL_INSERTAR, tuple(registro[c] for c in COLUMNAS_TABLA))
+            self._registrar_pendiente(conexion, "insertar", registro)
+
+        return registro
+
+    def existe_codigo(self, codigo_barras: str) -> bool:
+        return self._conexion().execute(SQL_EXISTE, (codigo_barras,)).fetchone() is not None
+
+    def consultar_codigos(self, filtros: Optional[Dict[str, Any]], columnas: str) -> List[Dict[str, Any]]:
+        seleccion, _ = _columnas_sql(columnas)
+        condiciones = []
+        parametros: List[Any] = []
+
+        if filtros:
+            if "comodin" in filtros and filtros["comodin"]:
+                condiciones.append("comodin_proveedor = ?")
+                parametros.append(filtros["comodin"])
+
+            if "impreso" in filtros and filtros["impreso"] is not None:
+                condiciones.append("impreso = ?")
+                parametros.append(1 if filtros["impreso"] else 0)
+
+            if "fecha_desde" in filtros and filtros["fecha_desde"]:
+                condiciones.append("fecha_creacion >= ?")
+                parametros.append(filtros["fecha_desde"].isoformat())
+
+            if "fecha_hasta" in filtros and filtros["fecha_hasta"]:
+                condiciones.append("fecha_creacion <= ?")
+                parametros.append(filtros["fecha_hasta"].isoformat())
+
+        sql = f"SELECT {seleccion} FROM codigos_barras"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += " ORDER BY fecha_creacion DESC"
+
+        return [_a_dict(fila) for fila in self._conexion().execute(sql, parametros)]
+
+    def _resolver_ids(self, conexion: sqlite3.Connection, ids: List[str]) -> Dict[str, str]:
+        """Ids locales reemplazados al reconciliar con la réplica (p.ej. aún en el caché de la app)"""
+        return dict(conexion.execute(SQL_ALIAS, (json.dumps(list(ids)),)).fetchall())
+
+    def marcar_impresos(self, codigo_ids: List[str], fecha_impresion: str) -> None:
+        conexion = self._conexion()
+        alias = self._resolver_ids(conexion, codigo_ids)
+        if alias:
+            codigo_ids = [alias.get(codigo_id, codigo_id) for codigo_id in codigo_ids]
+
+        with conexion:
+            conexion.executemany(SQL_MARCAR, [(fecha_impresion, codigo_id) for codigo_id in codigo_ids])
+            self._registrar_pendiente(conexion, "marcar_impresos", {
+                "ids": list(codigo_ids),
+                "fecha_impresion": fecha_impresion,
+            })
+
+    def insertar_eventos(self, eventos: List[Dict[str, Any]]) -> None:
+        conexion = self._conexion()
+        alias = self._resolver_ids(conexion, [evento["codigo_id"] for evento in eventos])
+        if alias:
+            eventos = [
+                dict(evento, codigo_id=alias.get(evento["codigo_id"], evento["codigo_id"])) for evento in eventos
+            ]
+
+        with conexion:
+            conexion.executemany(SQL_INSERTAR_EVENTO, [
+                tuple(evento[c] for c in COLUMNAS_EVENTOS) for evento in eventos
+            ])
+            self._registrar_pendiente(conexion, "eventos", {"eventos": eventos})
+
+    def eventos_codigo(self, codigo_id: str, limite: int) -> List[Dict[str, Any]]:
+        return [dict(fila) for fila in self._conexion().execute(SQL_EVENTOS_CODIGO, (codigo_id, limite))]
+
+    def buscar_por(self, columna: str, valor: str, columnas: str = "*") -> Optional[Dict[str, Any]]:
+        seleccion, _ = _columnas_sql(columnas)
+
+        # Valida también la columna del filtro antes de interpolarla
+        _columnas_sql(columna)
+
+        fila = self._conexion().execute(
+            f"SELECT {seleccion} FROM codigos_barras WHERE {columna} = ? LIMIT 1",
+            (valor,)
+        ).fetchone()
+
+        return _a_dict(fila) if fila else None
+
+    def comodines_unicos(self) -> List[str]:
+        return [fila[0] for fila in self._conexion().execute(SQL_COMODINES)]
+
+    def pagina_codigos(self, despues_de: Optional[str], limite: int, columnas: str) -> List[Dict[str, Any]]:
+        seleccion, _ = _columnas_sql(columnas)
+
+        filas = self._conexion().execute(
+            f"SELECT {seleccion} FROM codigos_barras WHERE codigo_barras > ? ORDER BY codigo_barras LIMIT ?",
+            ("" if despues_de is None else despues_de, limite)
+        )
+
+        return [_a_dict(fila) for fila in filas]
+
+    def creados_desde(self, desde: Optional[Tuple[str, str]], columnas: str, limite: int) -> List[Dict[str, Any]]:
+        seleccion, _ = _columnas_sql(columnas)
+        fecha_desde, id_desde = desde if desde is not None else ("", "")
+
+        filas = self._conexion().execute(
+            f"SELECT {seleccion} FROM codigos_barras WHERE (fecha_creacion, id) > (?, ?) "
+            "ORDER BY fecha_creacion, id LIMIT ?",
+            (fecha_desde, id_desde, limite)
+        )
+
+        return [_a_dict(fila) for fila in filas]
+
+    def estadisticas(self, dias: int) -> Dict[str, Any]:
+        conexion = self._conexion()
+        desde = (datetime.now(timezone.utc) - timedelta(days=dias)).date().isoformat()
+
+        por_comodin = [
+            {"comodin_proveedor": comodin, "total": total, "impresos": impresos, "no_impresos": no_impresos}
+            for comodin, total, impresos, no_impresos in conexion.execute(SQL_ESTADISTICAS_COMODIN)
+        ]
+        por_dia = [
+            {"dia": dia, "creados": creados}
+            for dia, creados in conexion.execute(SQL_ESTADISTICAS_DIA, (desde,))
+        ]
+
+        return {"por_comodin": por_comodin, "por_dia": por_dia}
+
+    def marca_agua(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        fecha_creacion, fecha_impresion, fecha_evento = self._conexion().execute(SQL_MARCA_AGUA).fetchone()
+        return fecha_creacion, fecha_impresion, fecha_evento
+
+    def pendientes_replicacion(self) -> int:
+        """
+        Cuenta las operaciones aún no replicadas
+
+        Returns:
+            int: Operaciones en cola
+        """
+        return self._conexion().execute("SELECT COUNT(*) FROM replicacion_pendiente").fetchone()[0]
+
+    def fallidas_replicacion(self) -> int:
+        """
+        Cuenta las operaciones que la réplica rechazó de forma permanente
+
+        Returns:
+            int: Operaciones en replicacion_fallida
+        """
+        return self._conexion().execute("SELECT COUNT(*) FROM replicacion_fallida").fetchone()[0]
+
+    def importacion_completa(self) -> bool:
+        """True si ya se importaron los códigos existentes de la réplica"""
+        return self._conexion().execute(SQL_LEER_ESTADO, ("importacion",)).fetchone() is not None
+
+    def importar_replica(self, tamano_pagina: int = PAGINA_IMPORTACION) -> int:
+        """
+        Copia a la base local los códigos que ya existen en la réplica
+
+        Se ejecuta una sola vez (la primera vez que se activa la replicación)
+        y es reanudable: el avance se guarda después de cada página. Un código
+        que ya existe localmente con otro id (creado antes de importar) pasa a
+        usar el id de la réplica.
+
+        Args:
+            tamano_pagina: Códigos por página
+
+        Returns:
+            int: Códigos nuevos en la base local
+
+        Raises:
+            Exception: La excepción de la réplica si una página falló
+        """
+        if self.replica is None or self.importacion_completa():
+            return 0
+
+        with self._lock_replicacion:
+            conexion = self._conexion()
+            fila = conexion.execute(SQL_LEER_ESTADO, ("importacion_desde",)).fetchone()
+            despues_de = fila[0] if fila else None
+            importados = 0
+
+            while True:
+                pagina = self.replica.pagina_codigos(despues_de, tamano_pagina, ",".join(COLUMNAS_TABLA))
+                if not pagina:
+                    break
+
+                with conexion:
+                    for registro in pagina:
+                        cursor = conexion.execute(SQL_IMPORTAR, tuple(registro[c] for c in COLUMNAS_TABLA))
+                        if cursor.rowcount:
+                            importados += 1
+                            continue
+
+                        local = conexion.execute(SQL_ID_POR_CODIGO, (registro["codigo_barras"],)).fetchone()
+                        if local is not None and local[0] != registro["id"]:
+                            self._reemplazar_id(conexion, local[0], registro["id"])
+
+                    despues_de = pagina[-1]["codigo_barras"]
+                    conexion.execute(SQL_GUARDAR_ESTADO, ("importacion_desde", despues_de))
+
+            with conexion:
+                conexion.execute(SQL_GUARDAR_ESTADO, ("importacion", datetime.now(timezone.utc).isoformat()))
+
+            return importados
+
+    def _reemplazar_id(self, conexion: sqlite3.Connection, anterior: str, actual: str) -> None:
+        """
+        Cambia el id local de un código por el que tiene en la réplica (dentro de la transacción en curso)
+
+        Actualiza el código, sus eventos y las operaciones aún en cola, y
+        guarda el alias para las escrituras que todavía lleguen con el id anterior.
+        Las claves foráneas de los eventos se verifican al confirmar la
+        transacción, cuando el código y sus eventos ya usan el id nuevo.
+        """
+        conexion.execute("PRAGMA defer_foreign_keys=ON")
+        conexion.execute("UPDATE codigos_barras SET id = ? WHERE id = ?", (actual, anterior))
+        conexion.execute("UPDATE eventos_impresion SET codigo_id = ? WHERE codigo_id = ?", (actual, anterior))
+        conexion.execute("UPDATE alias_ids SET id_actual = ? WHERE id_actual = ?", (actual, anterior))
+        conexion.execute("INSERT OR REPLACE INTO alias_ids (id_anterior, id_actual) VALUES (?, ?)", (anterior, actual))
+
+        # El id es un uuid: buscarlo como texto no da falsos positivos
+        pendientes = conexion.execute(
+            "SELECT seq, operacion, datos FROM replicacion_pendiente WHERE instr(datos, ?) > 0",
+            (anterior,)
+        ).fetchall()
+
+        for seq, operacion, datos in pendientes:
+            datos = json.loads(datos)
+
+            if operacion == "insertar":
+                datos["id"] = actual
+            elif operacion == "marcar_impresos":
+                datos["ids"] = [actual if codigo_id == anterior else codigo_id for codigo_id in datos["ids"]]
+            elif operacion == "eventos":
+                for evento in datos["eventos"]:
+                    if evento["codigo_id"] == anterior:
+                        evento["codigo_id"] = actual
+
+            conexion.execute("UPDATE replicacion_pendiente SET datos = ? WHERE seq = ?", (json.dumps(datos), seq))
+
+    def _aplicar(self, conexion: sqlite3.Connection, operacion: str, datos: Dict[str, Any]) -> None:
+        """Aplica una operación pendiente en la réplica"""
+        if operacion == "insertar":
+            existente = self.replica.buscar_por("codigo_barras", datos["codigo_barras"], "id")
+
+            if existente is None:
+                try:
+                    self.replica.insertar_codigo(datos)
+                    return
+                except Exception as e:
+                    # Otra instancia pudo crearlo entre la búsqueda y la inserción
+                    existente = None if es_error_transitorio(e) else \
+                        self.replica.buscar_por("codigo_barras", datos["codigo_barras"], "id")
+                    if existente is None:
+                        raise
+
+            # El código ya existía en la réplica: adoptar su id
+            if existente["id"] != datos["id"]:
+                with conexion:
+                    self._reemplazar_id(conexion, datos["id"], existente["id"])
+
+        elif operacion == "marcar_impresos":
+            self.replica.marcar_impresos(datos["ids"], datos["fecha_impresion"])
+        elif operacion == "eventos":
+            self.replica.insertar_eventos(datos["eventos"])
+        else:
+            raise ValueError(f"Operación de replicación desconocida: {operacion}")
+
+    def replicar(self, limite: int = LOTE_REPLICACION) -> int:
+        """
+        Aplica en la réplica las operaciones pendientes, en orden
+
+        Una falla transitoria (red, timeouts) detiene el ciclo y la operación
+        queda en cola para el siguiente. Una falla permanente (4xx,
+        restricciones) no se resuelve reintentando: la operación se mueve a
+        replicacion_fallida para que no bloquee al resto de la cola.
+
+        Un código que ya existe en la réplica se considera replicado; si allí
+        tiene otro id, la base local adopta ese id (ver _reemplazar_id).
+
+        Args:
+            limite: Máximo de operaciones a procesar
+
+        Returns:
+            int: Operaciones procesadas (replicadas o apartadas)
+
+        Raises:
+            Exception: La excepción de la réplica si hubo una falla transitoria
+        """
+        if self.replica is None:
+            return 0
+
+        with self._lock_replicacion:
+            conexion = self._conexion()
+            procesadas = 0
+
+            # Se lee la cabeza de la cola en cada paso: reconciliar un id reescribe las siguientes
+            while procesadas < limite:
+                fila = conexion.execute(SQL_SIGUIENTE_PENDIENTE).fetchone()
+                if fila is None:
+                    break
+
+                seq, operacion, datos = fila
+
+                try:
+                    self._aplicar(conexion, operacion, json.loads(datos))
+                except Exception as e:
+                    if es_error_transitorio(e):
+                        raise
+
+                    with conexion:
+                        conexion.execute(SQL_FALLIDA, (
+                            seq, operacion, datos, f"{type(e).__name__}: {e}", datetime.now(timezone.utc).isoformat()
+                        ))
+                        conexion.execute("DELETE FROM replicacion_pendiente WHERE seq = ?", (seq,))
+                else:
+                    with conexion:
+                        conexion.execute("DELETE FROM replicacion_pendiente WHERE seq = ?", (seq,))
+
+                procesadas += 1
+
+            return procesadas
+
+    def iniciar_replicacion(self, intervalo: float = 10.0) -> None:
+        """
+        Inicia un hilo que importa los códigos existentes de la réplica (si
+        falta) y replica las operaciones pendientes cada `intervalo` segundos
+
+        Args:
+            intervalo: Segundos entre ciclos de replicación
+        """
+        if self.replica is None or self._hilo_replicacion is not None:
+            return
+
+        def ciclo():
+            # El primer ciclo corre de inmediato para importar los códigos existentes
+            while True:
+                try:
+                    self.importar_replica()
+                    while self.replicar() == LOTE_REPLICACION:
+                        pass
+                except Exception:
+                    # Sin conexión con la réplica: se reintenta en el siguiente ciclo
+                    pass
+
+                if self._detener.wait(intervalo):
+                    return
+
+        self._hilo_replicacion = threading.Thread(target=ciclo, name="replicacion-supabase", daemon=True)
+        self._hilo_replicacion.start()
+
+    def detener_replicacion(self) -> None:
+        """Detiene el hilo de replicación"""
+        self._detener.set()
+        if self._hilo_replicacion is not None:
+            self._hilo_replicacion.join()
+            self._hilo_replicacion = None
@@ -0,0 +1,119 @@
+"""
+Tests del pipeline paralelo contra los generadores secuenciales de epl_generator
+"""
+
+import random
+import re
+from collections import Counter
+
+import pytest
+
+import epl_generator as epl
+import label_pipeline as lp
+from quantity_policy import PoliticaCantidades
+
+SIN_LIMITES = PoliticaCantidades(max_por_item=None)
+
+PATRON_BARRAS = re.compile(r"^B\d+,\d+,0,\w+,\d+,\d+,\d+,N,(\d{8})$", re.MULTILINE)
+PATRON_COPIAS = re.compile(r"^P(\d+)$", re.MULTILINE)
+
+
+class DestinoMemoria(lp.Destino):
+    """Acumula las partes en memoria"""
+
+    def __init__(self):
+        self.partes = []
+        self.cerrado = False
+
+    def escribir(self, parte: str) -> None:
+        self.partes.append(parte)
+
+    def cerrar(self, resumen: lp.ResumenPipeline) -> None:
+        self.cerrado = True
+
+    @property
+    def contenido(self) -> str:
+        return "".join(self.partes)
+
+
+def _items(cantidad: int, semilla: int = 7):
+    """Ítems con comodines y cantidades variadas (incluye códigos repetidos)"""
+    aleatorio = random.Random(semilla)
+    return [
+        (f"{aleatorio.randint(100, 120):03d}{aleatorio.randint(0, 300):05d}", aleatorio.randint(1, 9))
+        for _ in range(cantidad)
+    ]
+
+
+def _generar(items, columnas, tamano_bloque, procesos):
+    destino = DestinoMemoria()
+    resumen = lp.generar_en_destinos(
+        items, [destino], columnas=columnas, tamano_bloque=tamano_bloque, procesos=procesos, politica=SIN_LIMITES
+    )
+    assert destino.cerrado
+    return destino.contenido, resumen
+
+
+def _etiquetas_y_filas(contenido: str, columnas: int):
+    """(etiquetas por código, filas impresas, posiciones en blanco) de un EPL"""
+    etiquetas = Counter()
+    filas = 0
+    blancos = 0
+
+    for formato in contenido.split("\n\n"):
+        codigos = PATRON_BARRAS.findall(formato)
+        if not codigos:
+            continue
+        copias = int(PATRON_COPIAS.search(formato).group(1))
+        for codigo in codigos:
+            etiquetas[codigo] += copias
+        filas += copias
+        blancos += (columnas - len(codigos)) * copias
+
+    return etiquetas, filas, blancos
+
+
+@pytest.mark.parametrize("tamano_bloque, procesos", [(5000, 1), (97, 1), (97, 2)])
+def test_una_columna_identica_a_generar_epl_batch(tamano_bloque, procesos):
+    items = _items(600)
+
+    contenido, resumen = _generar(items, 1, tamano_bloque, procesos)
+
+    assert contenido == epl.generar_epl_batch(items, SIN_LIMITES)
+    assert resumen.etiquetas == sum(cantidad for _, cantidad in items)
+    assert resumen.errores == []
+
+
+def test_dos_columnas_un_bloque_identico_a_generar_epl_multiple():
+    items = _items(300)
+
+    contenido, _ = _generar(items, 2, 5000, 1)
+
+    assert contenido == epl.generar_epl_multiple(items, columnas=2, politica=SIN_LIMITES)
+
+
+@pytest.mark.parametrize("procesos", [1, 2])
+def test_dos_columnas_por_bloques_mismas_etiquetas_y_filas(procesos):
+    # Con varios bloques cada uno se optimiza por separado: el texto puede
+    # diferir, pero no las etiquetas por código ni las posiciones del rollo
+    items = _items(600) + [("10000001", 1)]
+
+    contenido, resumen = _generar(items, 2, 97, procesos)
+    secuencial = epl.generar_epl_multiple(items, columnas=2, politica=SIN_LIMITES)
+
+    assert resumen.bloques > 1
+    assert _etiquetas_y_filas(contenido, 2) == _etiquetas_y_filas(secuencial, 2)
+
+
+def test_errores_conservan_la_posicion_en_el_lote():
+    items = _items(300)
+    items[5] = ("abc", 3)
+    items[250] = ("10000001", 0)
+
+    contenido, resumen = _generar(items, 2, 97, 1)
+    validos = [item for posicion, item in enumerate(items) if posicion not in (5, 250)]
+
+    assert [error.posicion for error in resumen.errores] == [5, 250]
+    assert _etiquetas_y_filas(contenido, 2) == _etiquetas_y_filas(
+        epl.generar_epl_multiple(validos, columnas=2, politica=SIN_LIMITES), 2
+    )
@@ -0,0 +1,56 @@
+"""
+Tests del buffer de eventos de impresión
+"""
+
+from print_events import BufferEventos, LOTE, crear_eventos
+from resilience import ErrorPermanente, ErrorTransitorio
+
+
+class EscritorFalso:
+    """Escritor que rechaza siempre los códigos indicados y puede fallar transitoriamente"""
+
+    def __init__(self, invalidos=(), fallas_transitorias=0):
+        self.invalidos = set(invalidos)
+        self.fallas_transitorias = fallas_transitorias
+        self.escritos = []
+
+    def __call__(self, eventos):
+        if self.fallas_transitorias:
+            self.fallas_transitorias -= 1
+            raise ErrorTransitorio("Sin conexión", "registrar eventos de impresión")
+
+        if any(evento["codigo_id"] in self.invalidos for evento in eventos):
+            raise ErrorPermanente("violates foreign key constraint", "registrar eventos de impresión")
+
+        self.escritos.extend(eventos)
+
+
+def _eventos(cantidad):
+    return crear_eventos([(f"id{numero}", f"{numero:08d}", 1) for numero in range(cantidad)], LOTE)
+
+
+def test_evento_rechazado_no_bloquea_los_siguientes():
+    escritor = EscritorFalso(invalidos={"id7"})
+    buffer = BufferEventos(escritor, tamano_lote=10)
+    eventos = _eventos(25)
+    buffer._pendientes.extend(eventos)
+
+    assert buffer.vaciar() == 24
+    assert [evento["id"] for evento in escritor.escritos] == [e["id"] for e in eventos if e["codigo_id"] != "id7"]
+    assert buffer.pendientes() == []
+    assert buffer.total_rechazados == 1
+    assert buffer.rechazados[0][0]["codigo_id"] == "id7"
+
+
+def test_falla_transitoria_reencola_el_bloque():
+    escritor = EscritorFalso(fallas_transitorias=1)
+    buffer = BufferEventos(escritor, tamano_lote=10)
+    eventos = _eventos(15)
+    buffer._pendientes.extend(eventos)
+
+    assert buffer.vaciar() == 0
+    assert buffer.pendientes() == eventos
+
+    assert buffer.vaciar() == 15
+    assert escritor.escritos == eventos
+    assert buffer.total_rechazados == 0
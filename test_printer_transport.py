@@ -0,0 +1,59 @@
+"""
+Tests del transporte de impresora contra el simulador
+"""
+
+import threading
+
+import pytest
+
+from epl_generator import generar_epl_batch
+from printer_simulator import SimuladorImpresora
+from printer_transport import EstadoImpresora, TransporteImpresora, dividir_formatos
+
+
+def _trabajo(formatos: int) -> str:
+    """Trabajo EPL con un formato de una copia por código"""
+    return generar_epl_batch([(f"{numero:08d}", 1) for numero in range(formatos)])
+
+
+@pytest.mark.parametrize("capacidad, ventana", [(4, None), (2, 2)])
+def test_envio_mayor_que_buffer_imprime_cada_formato_una_vez(capacidad, ventana):
+    contenido = _trabajo(40)
+    opciones = {"intervalo_sondeo": 0.01}
+    if ventana is not None:
+        opciones["max_formatos_buffer"] = ventana
+
+    with SimuladorImpresora(capacidad_formatos=capacidad, etiquetas_por_segundo=1000) as simulador:
+        with TransporteImpresora("127.0.0.1", simulador.puerto, **opciones) as transporte:
+            enviados = transporte.enviar_trabajo(contenido)
+
+        assert simulador.esperar_vacio()
+        assert enviados == 40
+        assert simulador.formatos_perdidos == 0
+        assert simulador.formatos_impresos == dividir_formatos(contenido)
+
+
+def test_envio_se_detiene_sin_papel_y_se_reanuda():
+    contenido = _trabajo(12)
+    estados = []
+
+    with SimuladorImpresora(capacidad_formatos=2, etiquetas_por_segundo=1000) as simulador:
+        simulador.sin_papel = True
+        reanudar = threading.Timer(0.2, setattr, (simulador, "sin_papel", False))
+        reanudar.start()
+
+        with TransporteImpresora(
+            "127.0.0.1", simulador.puerto, intervalo_sondeo=0.01, max_formatos_buffer=2, on_estado=estados.append
+        ) as transporte:
+            transporte.enviar_trabajo(contenido)
+
+        assert simulador.esperar_vacio()
+        assert not estados[0].operativa
+        assert simulador.formatos_perdidos == 0
+        assert simulador.formatos_impresos == dividir_formatos(contenido)
+
+
+def test_credito_cero_con_buffer_lleno():
+    assert EstadoImpresora(buffer_lleno=True, formatos_en_buffer=1).credito(4) == 0
+    assert EstadoImpresora(formatos_en_buffer=1).credito(4) == 3
+    assert EstadoImpresora(sin_papel=True).credito(4) == 0
@@ -0,0 +1,28 @@
+"""
+Tests de la política de cantidades
+"""
+
+import pytest
+
+import quantity_policy as qp
+
+
+def test_evaluar_usa_la_primera_parte_con_capacidad_para_el_comodin():
+    # La primera parte se llena para 10000001 por el límite por ítem, pero
+    # aún tiene capacidad para otros códigos del comodín 100
+    politica = qp.PoliticaCantidades(max_por_item=10, max_por_comodin=40)
+    items = [("10000001", 25), ("10000002", 5)]
+
+    evaluacion = qp.evaluar(items, politica)
+
+    assert evaluacion.partes == [[(0, 10), (1, 5)], [(0, 10)], [(0, 5)]]
+
+
+@pytest.mark.parametrize("valor, esperado", [(None, qp.MAX_POR_ITEM), ("", qp.MAX_POR_ITEM), ("25", 25)])
+def test_desde_config_solo_usa_el_defecto_si_falta_el_valor(valor, esperado):
+    assert qp.PoliticaCantidades.desde_config({"max_por_item": valor}).max_por_item == esperado
+
+
+def test_desde_config_rechaza_limite_cero():
+    with pytest.raises(ValueError):
+        qp.PoliticaCantidades.desde_config({"max_por_item": 0})